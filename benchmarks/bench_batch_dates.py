@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+批量计算的日期检查
+开始或结束日期缺失（None/NaT）时，check_arbitrage_batch 与标量版本一样报错，
+不能把缺失日期当成某个持有天数继续计算（datetime64[s] 曾得到0天，datetime64[D]
+曾得到 -9223372036854775808 天）。分别用 datetime64[s]、datetime64[D] 和日期对象列
+检查，并报告缺失日期检查在100万行上的耗时；另按逐行调用 check_arbitrage 的抽样耗时
+估算标量版本处理同样行数所需的时间，检查批量版本的加速倍数。
+
+运行: python benchmarks/bench_batch_dates.py [行数]
+"""
+
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tin_delivery_cost_calculator import TinDeliveryCostCalculator
+
+# 缺失日期检查在整个批量计算中的耗时占比上限
+OVERHEAD_LIMIT = 0.1
+# 批量版本相对逐行标量版本的最低加速倍数（计时有波动，留出余量；实测约80-90倍）
+SPEEDUP_LIMIT = 50
+# 标量版本抽样计时的行数
+SCALAR_SAMPLE = 2000
+
+
+def main() -> int:
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    calculator = TinDeliveryCostCalculator()
+    failed = False
+
+    start = np.datetime64("2026-03-02") + np.arange(3)
+    end = np.array(["2026-07-15", "NaT", "2026-07-15"], dtype="datetime64[D]")
+    cases = {
+        "datetime64[D] 结束日期缺失": (start, end),
+        "datetime64[s] 结束日期缺失": (start.astype("datetime64[s]"), end.astype("datetime64[s]")),
+        "datetime64[s] 开始日期缺失": (end.astype("datetime64[s]"), start.astype("datetime64[s]")),
+        "日期对象结束日期缺失": (
+            np.array([datetime(2026, 3, 2), datetime(2026, 3, 3)], dtype=object),
+            np.array([datetime(2026, 7, 15), None], dtype=object),
+        ),
+    }
+    for name, (start_date, end_date) in cases.items():
+        try:
+            result = calculator.check_arbitrage_batch(
+                spot_price=250000.0, futures_price=252000.0, quantity_ton=2.0,
+                start_date=start_date, end_date=end_date
+            )
+        except ValueError as e:
+            print(f"{name}: 报错 ({e})")
+        else:
+            print(f"{name}: 没有报错，holding_days = {result['holding_days'].tolist()}")
+            failed = True
+
+    rng = np.random.default_rng(2026)
+    start_date = np.datetime64("2026-01-05") + rng.integers(0, 120, rows)
+    end_date = np.datetime64("2026-07-15") + np.zeros(rows, dtype=np.int64)
+    spot_price = rng.uniform(230000, 270000, rows)
+
+    started = time.perf_counter()
+    calculator.check_arbitrage_batch(
+        spot_price=spot_price, futures_price=252000.0, quantity_ton=2.0,
+        start_date=start_date, end_date=end_date
+    )
+    batch_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    (np.isnat(start_date) | np.isnat(end_date)).any()
+    check_seconds = time.perf_counter() - started
+    print(f"{rows:,} 行: 批量计算 {batch_seconds * 1e3:.1f} ms，其中缺失日期检查 {check_seconds * 1e3:.2f} ms")
+    if check_seconds > OVERHEAD_LIMIT * batch_seconds:
+        print(f"  缺失日期检查超过批量计算耗时的 {OVERHEAD_LIMIT:.0%}")
+        failed = True
+
+    sample = min(rows, SCALAR_SAMPLE)
+    start_dates = [datetime(2026, 1, 5) + timedelta(days=int(day)) for day in rng.integers(0, 120, sample)]
+    started = time.perf_counter()
+    for price, day in zip(spot_price[:sample].tolist(), start_dates):
+        calculator.check_arbitrage(
+            spot_price=price, futures_price=252000.0, quantity_ton=2.0,
+            start_date=day, end_date=datetime(2026, 7, 15)
+        )
+    scalar_seconds = (time.perf_counter() - started) / sample * rows
+    speedup = scalar_seconds / batch_seconds
+    print(f"逐行标量计算（按 {sample:,} 行估算）{scalar_seconds:.2f} 秒，批量版本快 {speedup:.0f} 倍")
+    if speedup < SPEEDUP_LIMIT:
+        print(f"  加速不足 {SPEEDUP_LIMIT} 倍")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
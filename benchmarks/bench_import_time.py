@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+核心计算模块的导入耗时检查
+在新的解释器中用 python -X importtime 导入 tin_delivery_cost_calculator，
+要求累计导入耗时低于固定预算，且导入后没有加载 NumPy、pandas（核心计算只依赖标准库，
+二者只在批量计算等需要时才导入）。先编译 .pyc，避免把编译时间计入导入耗时。
+
+运行: python benchmarks/bench_import_time.py [预算毫秒数]
+"""
+
+import compileall
+import os
+import re
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULE = "tin_delivery_cost_calculator"
+# 导入耗时预算（毫秒）
+BUDGET_MS = 50.0
+# 导入核心模块后不应加载的模块
+FORBIDDEN_MODULES = ("numpy", "pandas", "plotly")
+# 取多次运行中最快的一次（首次运行还受磁盘缓存影响）
+RUNS = 5
+
+# -X importtime 的输出行: "import time:      self [us] | cumulative | imported package"
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|\s+(\S.*)$")
+
+
+def import_once() -> tuple:
+    """
+    在新的解释器中导入一次 MODULE
+
+    返回:
+        (累计导入耗时（毫秒）, 导入后已加载的 FORBIDDEN_MODULES)
+    """
+    env = dict(os.environ)
+    # 允许使用、写入 .pyc
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    code = (
+        f"import sys, {MODULE}; "
+        f"print(','.join(name for name in {FORBIDDEN_MODULES!r} if name in sys.modules))"
+    )
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    cumulative_us = None
+    for line in completed.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match and match.group(3).strip() == MODULE:
+            cumulative_us = int(match.group(2))
+    if cumulative_us is None:
+        raise RuntimeError(f"-X importtime 输出中没有 {MODULE}:\n{completed.stderr}")
+    loaded = [name for name in completed.stdout.strip().split(",") if name]
+    return cumulative_us / 1000, loaded
+
+
+def main() -> int:
+    budget = float(sys.argv[1]) if len(sys.argv) > 1 else BUDGET_MS
+    compileall.compile_dir(ROOT, maxlevels=0, quiet=1)
+
+    results = [import_once() for _ in range(RUNS)]
+    best = min(milliseconds for milliseconds, _ in results)
+    loaded = sorted({name for _, modules in results for name in modules})
+
+    print(f"import {MODULE}: {best:.1f} ms（{RUNS} 次中最快，预算 {budget:.0f} ms）")
+    failed = False
+    if best > budget:
+        print(f"  导入耗时超过预算 {budget:.0f} ms")
+        failed = True
+    if loaded:
+        print(f"  导入时加载了: {', '.join(loaded)}")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
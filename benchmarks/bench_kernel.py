@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+融合内核的耗时与正确性检查
+对随机场景分别调用 check_arbitrage（加上 MarginSchedule.average_rate）和
+tin_kernel.fast_check_arbitrage，要求结果逐位相同，并比较单次调用耗时；
+另检查内核的保证金阶梯和默认费率缓存不会随临时对象无限增长。
+
+运行: python benchmarks/bench_kernel.py [场景数]
+      TIN_DISABLE_JIT=1 python benchmarks/bench_kernel.py   # 检查纯 Python 版本
+"""
+
+import gc
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tin_kernel
+from tin_contract_registry import get_registry
+from tin_delivery_cost_calculator import DEFAULT_PARAMS, MarginSchedule, check_arbitrage
+from tin_kernel import BACKEND, fast_check_arbitrage
+
+CONTRACT = "sn2607"
+TIMING_CALLS = 50_000
+
+# 逐字段比较的 (KernelResult 字段, CostBreakdown 取值)
+FIELDS = (
+    ("holding_days", lambda ref: ref.holding_days),
+    ("margin_rate", lambda ref: ref.margin_rate),
+    ("vat_amount", lambda ref: ref.total.vat_amount),
+    ("total_misc_fees", lambda ref: ref.total.total_misc_fees),
+    ("storage_cost", lambda ref: ref.total.storage_cost),
+    ("capital_cost", lambda ref: ref.total.capital_cost),
+    ("total_cost", lambda ref: ref.total.total_cost),
+    ("break_even_price", lambda ref: ref.break_even_price),
+    ("profit", lambda ref: ref.profit),
+    ("profit_rate", lambda ref: ref.profit_rate),
+)
+
+
+def random_case(rng: random.Random, listing: datetime, delivery: datetime) -> tuple:
+    """(公共参数, 费用参数, 企业保证金加收)"""
+    start = listing + timedelta(days=rng.randint(0, (delivery - listing).days))
+    if rng.random() < 0.3:
+        # 带时刻的开始时间：持有天数向下取整，保证金阶梯从次日算起
+        start += timedelta(hours=rng.randint(1, 23), minutes=rng.randint(0, 59))
+    kwargs = dict(
+        spot_price=rng.uniform(200000, 300000),
+        futures_price=rng.uniform(200000, 300000),
+        quantity_ton=rng.choice([1, 2, 10.5]),
+        start_date=start,
+        end_date=delivery,
+        interest_rate=rng.choice([None, 0.03, 0.05]),
+        delivery_price=rng.choice([None, 251000.0]),
+    )
+    fees = rng.choice([{}, {"inbound_fee_per_ton": 0}, {"transport_fee_per_ton": 5.5, "packing_fee_per_ton": 12}])
+    return kwargs, fees, rng.choice([0.0, 0.02])
+
+
+def main() -> int:
+    cases = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    info = get_registry()[CONTRACT]
+    schedule = info.margin_schedule()
+    listing = datetime.combine(info.listing_date, datetime.min.time())
+    delivery = datetime.combine(info.delivery_date, datetime.min.time())
+
+    rng = random.Random(2026)
+    mismatches = 0
+    for _ in range(cases):
+        kwargs, fees, addon = random_case(rng, listing, delivery)
+        ref = check_arbitrage(
+            DEFAULT_PARAMS, margin_rate=schedule.average_rate(kwargs["start_date"]) + addon, **kwargs, **fees
+        )
+        got = fast_check_arbitrage(
+            DEFAULT_PARAMS, margin_schedule=schedule, enterprise_margin_addon=addon, **kwargs, **fees
+        )
+        if any(getattr(got, name) != value(ref) for name, value in FIELDS):
+            mismatches += 1
+
+    kwargs = dict(
+        spot_price=250000.0, futures_price=252000.0, quantity_ton=10.0,
+        start_date=delivery - timedelta(days=120), end_date=delivery
+    )
+    timings = {}
+    for name, call in (
+        ("check_arbitrage", lambda: check_arbitrage(
+            DEFAULT_PARAMS, margin_rate=schedule.average_rate(kwargs["start_date"]), **kwargs
+        )),
+        ("fast_check_arbitrage", lambda: fast_check_arbitrage(DEFAULT_PARAMS, margin_schedule=schedule, **kwargs)),
+    ):
+        call()
+        start = time.perf_counter()
+        for _ in range(TIMING_CALLS):
+            call()
+        timings[name] = (time.perf_counter() - start) / TIMING_CALLS * 1e6
+
+    print(f"内核实现: {BACKEND}")
+    for name, micros in timings.items():
+        print(f"  {name:<22}{micros:6.2f} µs/次")
+    print(f"  加速比 {timings['check_arbitrage'] / timings['fast_check_arbitrage']:.1f}x")
+    print(f"{cases:,} 个随机场景，与 check_arbitrage 结果不一致 {mismatches} 个")
+
+    # 临时的参数集和保证金阶梯用完后，缓存不应继续持有它们
+    for i in range(1000):
+        params = DEFAULT_PARAMS.replace(storage_fee_per_ton_per_day=1.0 + i / 1000)
+        temporary = MarginSchedule(delivery, *schedule.breakpoints[:3], listing_date=listing)
+        fast_check_arbitrage(params, margin_schedule=temporary, **kwargs)
+    del params, temporary
+    gc.collect()
+    schedules = len(tin_kernel._schedule_terms_cache)
+    fee_sets = tin_kernel._default_fees.cache_info().currsize
+    print(f"1000 个临时参数集和保证金阶梯之后: 缓存阶梯 {schedules} 个，默认费率 {fee_sets} 组")
+    leaked = schedules > 1 or fee_sets > tin_kernel._default_fees.cache_info().maxsize
+    return 1 if mismatches or leaked else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
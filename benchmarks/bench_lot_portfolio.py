@@ -0,0 +1,186 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+仓单组合的耗时与正确性检查
+随机生成若干笔仓单（不同合约、买入日期和价格）：
+- 一次加入全部仓单的耗时；
+- 分批加入、随机移出、按合约更新期货价格后，增量维护的合计和每笔结果与用最终仓单
+  一次重建的组合一致；
+- 抽样仓单的结果与逐笔 check_arbitrage 一致；
+- 组合很大时加入、移出一笔仓单或更新一个合约的价格，耗时远低于整个组合重算；
+- 买入日期缺失、现货价格缺失或不为正数的仓单被拒绝，组合保持不变；
+- remove_lots 传入单个编号（字符串）时只移出这一笔，不按字符拆开。
+
+运行: python benchmarks/bench_lot_portfolio.py [仓单笔数]
+"""
+
+import os
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tin_contract_registry import get_registry
+from tin_lot_portfolio import LOT_RESULT_COLUMNS, TOTAL_COLUMNS, LotPortfolio
+
+CONTRACTS = ("sn2606", "sn2607", "sn2608", "sn2609", "sn2610", "sn2611", "sn2612")
+SETTINGS = dict(
+    interest_rate=0.04,
+    enterprise_margin_addon=0.02,
+    fee_kwargs={"inbound_fee_per_ton": 35.0, "outbound_fee_per_ton": 25.0}
+)
+# 增量操作（一笔仓单）的耗时应低于整个组合重算耗时的比例
+INCREMENTAL_LIMIT = 0.2
+# 逐笔核对的抽样笔数
+SAMPLE = 200
+
+
+def make_lots(count: int, seed: int = 2026, first_id: int = 1) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "lot_id": [f"WR{number:07d}" for number in range(first_id, first_id + count)],
+        "contract_code": rng.choice(CONTRACTS, count),
+        "purchase_date": np.datetime64("2026-01-05") + rng.integers(0, 120, count),
+        "spot_price": rng.uniform(230000, 270000, count).round(-1),
+        "quantity_ton": 2.0 * rng.integers(1, 6, count),
+        "futures_price": rng.uniform(230000, 275000, count).round(-1),
+    })
+
+
+def best_of(function, repeat: int = 5) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main() -> int:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    lots = make_lots(count)
+    failed = False
+
+    def build():
+        portfolio = LotPortfolio(**SETTINGS)
+        portfolio.add_lots(lots)
+        return portfolio
+
+    full_seconds = best_of(build)
+    print(f"一次加入 {count:,} 笔仓单: {full_seconds * 1e3:.1f} ms")
+
+    # 增量维护：分批加入、移出约十分之一、更新两个合约的期货价格
+    rng = np.random.default_rng(7)
+    portfolio = LotPortfolio(**SETTINGS)
+    for start in range(0, count, count // 8 or 1):
+        portfolio.add_lots(lots.iloc[start:start + (count // 8 or 1)])
+    removed = rng.choice(lots["lot_id"].to_numpy(), count // 10, replace=False)
+    portfolio.remove_lots(removed)
+    marks = {"sn2607": 252500.0, "sn2610": 249000.0}
+    portfolio.mark_to_market(marks)
+
+    final = lots[~lots["lot_id"].isin(removed)].copy()
+    final["futures_price"] = final["contract_code"].map(marks).fillna(final["futures_price"])
+    rebuilt = LotPortfolio(**SETTINGS)
+    rebuilt.add_lots(final)
+
+    incremental_totals = np.array(portfolio.totals()[1:])
+    rebuilt_totals = np.array(rebuilt.totals()[1:])
+    if portfolio.totals().lots != rebuilt.totals().lots or not np.allclose(
+        incremental_totals, rebuilt_totals, rtol=1e-9, atol=1e-6
+    ):
+        print("  增量维护的合计与重建组合不一致:")
+        for name, a, b in zip(TOTAL_COLUMNS, incremental_totals, rebuilt_totals):
+            print(f"    {name}: {a:,.6f} vs {b:,.6f}")
+        failed = True
+    incremental_lots = portfolio.lots().set_index("lot_id").sort_index()
+    rebuilt_lots = rebuilt.lots().set_index("lot_id").sort_index()
+    for name in LOT_RESULT_COLUMNS:
+        if not np.array_equal(incremental_lots[name].to_numpy(), rebuilt_lots[name].to_numpy()):
+            print(f"  增量维护的每笔结果与重建组合不一致: {name}")
+            failed = True
+    print(f"增量维护与重建一致（{len(portfolio):,} 笔）: {'否' if failed else '是'}")
+
+    # 抽样逐笔核对
+    registry = get_registry()
+    calculator = rebuilt.calculator
+    sample = rebuilt_lots.sample(min(SAMPLE, len(rebuilt_lots)), random_state=1)
+    worst = 0.0
+    for row in sample.itertuples():
+        start = datetime.combine(pd.Timestamp(row.purchase_date).date(), datetime.min.time())
+        schedule = registry[row.contract_code].margin_schedule()
+        result = calculator.check_arbitrage(
+            spot_price=row.spot_price,
+            futures_price=row.futures_price,
+            quantity_ton=row.quantity_ton,
+            start_date=start,
+            end_date=datetime.combine(pd.Timestamp(row.delivery_date).date(), datetime.min.time()),
+            interest_rate=SETTINGS["interest_rate"],
+            margin_rate=schedule.average_rate(start) + SETTINGS["enterprise_margin_addon"],
+            **SETTINGS["fee_kwargs"]
+        )
+        worst = max(worst, abs(result["arbitrage"]["profit"] - row.profit))
+    print(f"抽样 {len(sample)} 笔与 check_arbitrage 的最大利润差: {worst:.2e} 元")
+    if worst > 1e-6:
+        failed = True
+
+    # 大组合上的单笔增量操作
+    extra = make_lots(1, seed=99, first_id=count + 1)
+    book = build()
+
+    def add_remove():
+        book.add_lots(extra)
+        book.remove_lots(extra["lot_id"])
+
+    # 无效仓单整批拒绝
+    for name, column, value in (
+        ("买入日期缺失", "purchase_date", pd.NaT),
+        ("现货价格缺失", "spot_price", np.nan),
+        ("现货价格为0", "spot_price", 0.0),
+        ("现货价格为负", "spot_price", -250000.0),
+    ):
+        bad = make_lots(3, seed=5, first_id=count + 10)
+        bad[column] = bad[column].astype(object)
+        bad.loc[1, column] = value
+        before = book.totals()
+        try:
+            book.add_lots(bad)
+        except ValueError as e:
+            print(f"{name}: 报错 ({e})")
+            if book.totals() != before:
+                print("  报错后组合合计发生变化")
+                failed = True
+        else:
+            print(f"{name}: 没有报错")
+            failed = True
+
+    # 单个编号：自动编号的 "12" 不能被当成 "1" 和 "2"
+    numbered = LotPortfolio(**SETTINGS)
+    numbered.add_lots(make_lots(20).drop(columns="lot_id"))
+    removed_count = numbered.remove_lots("12")
+    remaining = set(numbered.column("lot_id"))
+    print(f"remove_lots(\"12\"): 移出 {removed_count} 笔，剩余编号含 1、2: {'1' in remaining and '2' in remaining}")
+    if removed_count != 1 or "12" in remaining or not {"1", "2"} <= remaining:
+        failed = True
+    if numbered.remove_lots(13) != 1 or "13" in set(numbered.column("lot_id")):
+        print("  remove_lots(13) 没有只移出编号 13")
+        failed = True
+
+    add_remove_seconds = best_of(add_remove, repeat=20) / 2
+    mark_seconds = best_of(lambda: book.mark_to_market({"sn2606": 251000.0}), repeat=20)
+    share = len(book.column("contract_code")[book.column("contract_code") == "sn2606"]) / len(book)
+    print(f"加入/移出一笔仓单: {add_remove_seconds * 1e3:.2f} ms"
+          f"（整个组合重算的 {add_remove_seconds / full_seconds:.1%}）")
+    print(f"更新一个合约（{share:.0%} 的仓单）的期货价格: {mark_seconds * 1e3:.2f} ms")
+    if add_remove_seconds > INCREMENTAL_LIMIT * full_seconds:
+        print(f"  单笔增量操作超过整个组合重算耗时的 {INCREMENTAL_LIMIT:.0%}")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+蒙特卡洛损益模拟的耗时检查
+10万条路径 × 约120天（sn2607，2026-03-16 开始）在单进程和进程池两种方式下的耗时，
+并确认两种方式在相同种子下结果一致；另检查结束日期不等于交割日时，
+保证金阶梯的天数与持有天数一致（波动率为0时期货资金成本可直接算出），
+以及路径数、批大小不为正时报错。
+
+运行: python benchmarks/bench_monte_carlo.py [进程数]
+"""
+
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tin_contract_registry import get_registry
+from tin_delivery_cost_calculator import DEFAULT_PARAMS
+from tin_monte_carlo import DEFAULT_PATHS, simulate_pnl
+
+# 单进程模拟的耗时上限（秒）
+TIME_LIMIT = 10.0
+
+
+def main() -> int:
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else os.cpu_count() or 1
+    info = get_registry()["sn2607"]
+    start_date = datetime(2026, 3, 16)
+    end_date = datetime.combine(info.delivery_date, datetime.min.time())
+    kwargs = dict(
+        spot_price=250000.0,
+        futures_price=252000.0,
+        quantity_ton=10.0,
+        start_date=start_date,
+        end_date=end_date,
+        margin_schedule=info.margin_schedule(),
+        seed=2026
+    )
+
+    start = time.perf_counter()
+    single = simulate_pnl(**kwargs)
+    single_seconds = time.perf_counter() - start
+    print(f"单进程: {DEFAULT_PATHS} 条路径 × {(end_date - start_date).days} 天  {single_seconds:6.2f} 秒")
+
+    start = time.perf_counter()
+    pooled = simulate_pnl(workers=workers, **kwargs)
+    print(f"{workers} 个进程: {time.perf_counter() - start:6.2f} 秒")
+
+    summary = single.summary()
+    print(f"平均利润 {summary['mean_profit']:,.2f} 元  VaR(95%) {summary['var_95']:,.2f} 元  "
+          f"亏损概率 {summary['probability_of_loss']:.2%}")
+
+    if not np.array_equal(single.profit, pooled.profit):
+        print("单进程与进程池的模拟结果不一致")
+        return 1
+
+    schedule = info.margin_schedule()
+    rates = schedule.daily_rates(start_date)
+    for days in (30, len(rates) + 20):
+        flat = simulate_pnl(
+            **dict(kwargs, end_date=start_date + timedelta(days=days), paths=1, volatility=0.0)
+        )
+        held = np.concatenate([rates, np.zeros(days)])[:days]
+        expected = held.sum() * 252000.0 * 10.0 * DEFAULT_PARAMS.default_interest_rate / 365
+        actual = flat.futures_capital_cost[0]
+        print(f"持有 {days} 天: 期货资金成本 {actual:,.2f} 元（按阶梯逐日计算 {expected:,.2f} 元）")
+        if not np.isclose(actual, expected, rtol=1e-12):
+            print("  保证金阶梯的天数与持有天数不一致")
+            return 1
+    for invalid in (dict(paths=0), dict(paths=-5), dict(batch_size=0)):
+        try:
+            simulate_pnl(**dict(kwargs, **invalid))
+        except ValueError:
+            continue
+        print(f"{invalid} 应报 ValueError")
+        return 1
+    if single_seconds > TIME_LIMIT:
+        print(f"单进程模拟超过 {TIME_LIMIT:g} 秒")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+多进程批量计算的耗时检查
+随机生成场景表（现货价格 × 期货价格 × 开始日期 × 资金利率 × 入库费），
+分别用 check_arbitrage_batch（单进程）和 check_arbitrage_parallel（1, 2, 4, ... 个进程）
+计算，报告耗时、加速比，并确认结果与单进程逐位相同。
+
+运行: python benchmarks/bench_parallel.py [行数] [最大进程数]
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tin_delivery_cost_calculator import TinDeliveryCostCalculator
+from tin_parallel import check_arbitrage_parallel
+
+# 默认场景行数
+DEFAULT_ROWS = 2_000_000
+
+
+def make_scenarios(rows: int, seed: int = 2026) -> pd.DataFrame:
+    """随机场景表（sn2607，开始日期在交割日前约半年内）"""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "spot_price": rng.uniform(200000, 300000, rows).round(-1),
+        "futures_price": rng.uniform(200000, 300000, rows).round(-1),
+        "quantity_ton": 10.0,
+        "start_date": np.datetime64("2026-01-05") + rng.integers(0, 150, rows).astype("timedelta64[D]"),
+        "end_date": np.datetime64("2026-07-15"),
+        "interest_rate": rng.uniform(0.02, 0.06, rows).round(4),
+        "inbound_fee_per_ton": rng.choice([0.0, 10.0, 20.0], rows),
+    })
+
+
+def main() -> int:
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ROWS
+    max_workers = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count() or 1
+    scenarios = make_scenarios(rows)
+
+    start = time.perf_counter()
+    expected = TinDeliveryCostCalculator().check_arbitrage_batch(scenarios)
+    single_seconds = time.perf_counter() - start
+    print(f"{rows:,} 行  单进程 {single_seconds:6.2f} 秒")
+
+    workers = 1
+    failed = False
+    while workers <= max_workers:
+        # 分片数取进程数的整数倍，各进程负载均衡
+        shard_rows = max(-(-rows // (workers * 4)), 1)
+        start = time.perf_counter()
+        result = check_arbitrage_parallel(scenarios, workers=workers, shard_rows=shard_rows)
+        seconds = time.perf_counter() - start
+        same = result.equals(expected)
+        failed = failed or not same
+        print(f"{workers:3d} 个进程  {seconds:6.2f} 秒  加速比 {single_seconds / seconds:5.2f}"
+              f"{'' if same else '  结果与单进程不一致'}")
+        workers *= 2
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
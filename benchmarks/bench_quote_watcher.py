@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+盘中报价监控的延迟检查
+20 个合约、20万笔随机报价（每5笔一笔现货报价，现货报价要重算全部合约）经
+QuoteWatcher.run 在事件循环中处理，报告从收到报价到产生信号的延迟分布，
+p99 超过 1 毫秒时失败。
+
+运行: python benchmarks/bench_quote_watcher.py [报价笔数]
+"""
+
+import asyncio
+import os
+import random
+import sys
+import time
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tin_quote_watcher import QuoteWatcher
+
+# p99 延迟上限（微秒）
+P99_LIMIT_US = 1000.0
+
+TRADE_DATE = date(2026, 3, 16)
+CONTRACTS = [f"sn{year % 100:02d}{month:02d}" for year in (2026, 2027) for month in range(1, 13)][3:23]
+
+
+def make_quotes(ticks: int, seed: int = 2026) -> list:
+    """随机报价行：现货围绕 250000，期货围绕盈亏平衡点附近波动，会频繁触发信号"""
+    rng = random.Random(seed)
+    lines = []
+    for tick in range(ticks):
+        if tick % 5 == 0:
+            lines.append(f"spot,{250000 + rng.uniform(-2000, 2000):.0f}\n".encode())
+        else:
+            lines.append(f"{rng.choice(CONTRACTS)},{254000 + rng.uniform(-4000, 4000):.0f}\n".encode())
+    return lines
+
+
+async def replay(lines):
+    for number, line in enumerate(lines, 1):
+        yield line
+        if number % 1000 == 0:
+            await asyncio.sleep(0)
+
+
+def main() -> int:
+    ticks = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    watcher = QuoteWatcher(TRADE_DATE, contracts=CONTRACTS)
+    lines = make_quotes(ticks)
+    signals = []
+
+    start = time.perf_counter()
+    processed = asyncio.run(watcher.run(replay(lines), on_signal=signals.append))
+    seconds = time.perf_counter() - start
+
+    summary = watcher.latency.summary()
+    print(f"{len(CONTRACTS)} 个合约  {processed:,} 笔报价  {len(signals):,} 个信号  "
+          f"{processed / seconds:,.0f} 笔/秒")
+    print(f"延迟（微秒）: 平均 {summary['mean_us']:.1f}  p50 {summary['p50_us']:.1f}  "
+          f"p90 {summary['p90_us']:.1f}  p99 {summary['p99_us']:.1f}  "
+          f"p99.9 {summary['p999_us']:.1f}  最大 {summary['max_us']:.1f}")
+    if summary["p99_us"] > P99_LIMIT_US:
+        print(f"p99 延迟超过 {P99_LIMIT_US:g} 微秒")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
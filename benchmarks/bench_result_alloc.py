@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+测算结果的内存占用检查（tracemalloc）
+比较 check_arbitrage 返回的 CostBreakdown 与等价的嵌套字典（to_dict()，即原来的
+返回形式）每条结果占用的内存，结果记录应明显更小。
+
+运行: python benchmarks/bench_result_alloc.py
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tin_delivery_cost_calculator import DEFAULT_PARAMS, check_arbitrage
+
+# 每种结果形式测量的调用次数
+CALLS = 5000
+
+ARGS = (DEFAULT_PARAMS, 250000.0, 252000.0, 10.0, datetime(2026, 3, 2), datetime(2026, 6, 15))
+
+
+def bytes_per_result(build, calls: int = CALLS) -> float:
+    """保留 calls 条结果后，平均每条结果占用的字节数"""
+    results = []
+    tracemalloc.start()
+    try:
+        for _ in range(calls):
+            results.append(build())
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return current / calls
+
+
+def seconds_per_call(build, calls: int = CALLS) -> float:
+    """平均每次调用耗时（秒）"""
+    start = time.perf_counter()
+    for _ in range(calls):
+        build()
+    return (time.perf_counter() - start) / calls
+
+
+def main() -> int:
+    as_record = lambda: check_arbitrage(*ARGS)
+    as_dict = lambda: check_arbitrage(*ARGS).to_dict()
+
+    record_bytes = bytes_per_result(as_record)
+    dict_bytes = bytes_per_result(as_dict)
+    print(f"CostBreakdown: {record_bytes:8.0f} 字节/条  {seconds_per_call(as_record) * 1e6:6.2f} µs/次")
+    print(f"嵌套字典:      {dict_bytes:8.0f} 字节/条  {seconds_per_call(as_dict) * 1e6:6.2f} µs/次")
+
+    if record_bytes >= dict_bytes * 0.75:
+        print("结果记录的内存占用没有明显低于嵌套字典")
+        return 1
+    print(f"结果记录的内存占用为嵌套字典的 {record_bytes / dict_bytes:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
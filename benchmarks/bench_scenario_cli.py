@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+场景表命令行的吞吐量与分块写出检查
+生成一个场景 CSV，其中某一块的 quantity_ton 有空白单元格（read_csv 对该块推断为浮点、
+其余块为整数）、另有几行结束日期为空，按小块逐块写出 Parquet：
+- 各块结构不一致时仍能写完整个文件，行数和结果与一次性 check_arbitrage_batch 一致；
+- 结束日期为空的行被跳过，退出码为1；
+- 报告每秒处理的行数。
+
+运行: python benchmarks/bench_scenario_cli.py [行数]
+"""
+
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tin_delivery_cost_calculator import TinDeliveryCostCalculator
+from tin_scenario_cli import main as cli_main
+
+# 每块行数（小块才能让空白单元格只落在其中一块）
+CHUNK_ROWS = 10_000
+
+
+def make_scenarios(rows: int, seed: int = 2026) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "spot_price": rng.integers(230000, 270000, rows),
+        "futures_price": rng.integers(230000, 275000, rows),
+        "quantity_ton": rng.integers(1, 6, rows) * 2,
+        "start_date": (np.datetime64("2026-01-05") + rng.integers(0, 120, rows)).astype(str),
+        "end_date": np.full(rows, "2026-07-15", dtype=object),
+    })
+
+
+def main() -> int:
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    scenarios = make_scenarios(rows)
+    # 第二块：数量有空白（该块按浮点读入）；第三块：两行结束日期为空
+    scenarios["quantity_ton"] = scenarios["quantity_ton"].astype(object)
+    scenarios.loc[CHUNK_ROWS + 5, "quantity_ton"] = None
+    undated = [2 * CHUNK_ROWS + 1, 2 * CHUNK_ROWS + 7]
+    scenarios.loc[undated, "end_date"] = None
+    failed = False
+
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, "scenarios.csv")
+        target = os.path.join(directory, "result.parquet")
+        scenarios.to_csv(source, index=False)
+
+        stderr = io.StringIO()
+        start = time.perf_counter()
+        with contextlib.redirect_stderr(stderr):
+            status = cli_main([source, "-o", target, "--chunksize", str(CHUNK_ROWS), "-q"])
+        seconds = time.perf_counter() - start
+        print(f"{rows:,} 行 / 每块 {CHUNK_ROWS:,} 行写出 Parquet: {seconds:.2f} 秒  {rows / seconds:,.0f} 行/秒")
+        print(f"退出码 {status}  {stderr.getvalue().strip()}")
+        if status != 1:
+            print("  结束日期为空的行应使退出码为1")
+            failed = True
+        if not os.path.exists(target):
+            print("  没有写出 Parquet 文件")
+            return 1
+        written = pd.read_parquet(target)
+
+    valid = scenarios.drop(index=undated).reset_index(drop=True)
+    if len(written) != len(valid):
+        print(f"  写出 {len(written):,} 行，应为 {len(valid):,} 行")
+        return 1
+    expected = TinDeliveryCostCalculator().check_arbitrage_batch(
+        spot_price=valid["spot_price"].to_numpy(dtype=np.float64),
+        futures_price=valid["futures_price"].to_numpy(dtype=np.float64),
+        quantity_ton=pd.to_numeric(valid["quantity_ton"]).to_numpy(dtype=np.float64),
+        start_date=pd.to_datetime(valid["start_date"]).to_numpy(dtype="datetime64[s]"),
+        end_date=pd.to_datetime(valid["end_date"]).to_numpy(dtype="datetime64[s]"),
+    )
+    if not np.array_equal(written["profit"].to_numpy(), expected["profit"], equal_nan=True):
+        print("  写出的利润与一次性批量计算不一致")
+        failed = True
+    print(f"分块写出与一次性批量计算一致: {'否' if failed else '是'}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+利润敏感度的耗时与正确性检查
+100万个随机场景：check_arbitrage_batch(sensitivities=True) 一次算出全部敏感度，
+与对每个输入上下浮动一个单位、重算 2 × 5 次的中心差分比较耗时和结果；
+另在期货价格等于现货价格（增值税的分段点）的场景上，与只向上浮动一个单位的差分比较，
+检查分段点上取的是右导数。
+
+运行: python benchmarks/bench_sensitivities.py [场景数]
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tin_delivery_cost_calculator import SENSITIVITY_COLUMNS, TinDeliveryCostCalculator
+
+# 一次算出敏感度的耗时不应超过不算敏感度时的倍数
+OVERHEAD_LIMIT = 2.0
+
+
+def make_scenarios(rows: int, seed: int = 2026) -> dict:
+    rng = np.random.default_rng(seed)
+    return {
+        "spot_price": rng.uniform(200000, 300000, rows).round(-1),
+        "futures_price": rng.uniform(200000, 300000, rows).round(-1),
+        "quantity_ton": rng.choice([1.0, 2.0, 10.0], rows),
+        "start_date": np.datetime64("2026-01-05") + rng.integers(0, 150, rows).astype("timedelta64[D]"),
+        "end_date": np.datetime64("2026-07-15"),
+        "interest_rate": rng.uniform(0.02, 0.06, rows),
+        "margin_rate": rng.uniform(0.05, 0.20, rows),
+    }
+
+
+def bumped(scenarios: dict, name: str, sign: int) -> dict:
+    """把某个输入加（减）一个单位变动后的场景"""
+    column = name[len("profit_delta_"):]
+    _, unit = SENSITIVITY_COLUMNS[name]
+    if column == "holding_days":
+        return {**scenarios, "end_date": scenarios["end_date"] + np.timedelta64(sign, "D")}
+    return {**scenarios, column: scenarios[column] + sign * unit}
+
+
+def main() -> int:
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    calculator = TinDeliveryCostCalculator()
+    scenarios = make_scenarios(rows)
+
+    start = time.perf_counter()
+    calculator.check_arbitrage_batch(**scenarios)
+    plain_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = calculator.check_arbitrage_batch(**scenarios, sensitivities=True)
+    analytic_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    differences = {}
+    for name in SENSITIVITY_COLUMNS:
+        up = calculator.check_arbitrage_batch(**bumped(scenarios, name, 1))["profit"]
+        down = calculator.check_arbitrage_batch(**bumped(scenarios, name, -1))["profit"]
+        differences[name] = (up - down) / 2
+    bump_seconds = time.perf_counter() - start
+
+    print(f"{rows:,} 个场景")
+    print(f"  不算敏感度        {plain_seconds:6.2f} 秒")
+    print(f"  同时算出敏感度    {analytic_seconds:6.2f} 秒")
+    print(f"  上下浮动重算      {bump_seconds:6.2f} 秒（{2 * len(SENSITIVITY_COLUMNS)} 次）")
+
+    failed = False
+    for name, (description, _) in SENSITIVITY_COLUMNS.items():
+        # 中心差分跨越增值税等分段点的场景会有差异，只统计比例
+        mismatch = np.mean(~np.isclose(result[name], differences[name], rtol=1e-6, atol=1e-6))
+        print(f"  {description}：与差分不一致的比例 {mismatch:.4%}")
+        failed = failed or mismatch > 0.01
+
+    # 交割价格随期货价格变化、期货价格等于现货价格：向上浮动时增值税从0开始增加
+    boundary = {name: np.asarray(value)[:1000] if np.ndim(value) else value for name, value in scenarios.items()}
+    boundary["futures_price"] = boundary["spot_price"].copy()
+    at_boundary = calculator.check_arbitrage_batch(**boundary, sensitivities=True)
+    for name in ("profit_delta_spot_price", "profit_delta_futures_price"):
+        forward = calculator.check_arbitrage_batch(**bumped(boundary, name, 1))["profit"] - at_boundary["profit"]
+        mismatch = np.mean(~np.isclose(at_boundary[name], forward, rtol=1e-6, atol=1e-6))
+        print(f"  {SENSITIVITY_COLUMNS[name][0]}（期货价格等于现货价格）：与向上差分不一致的比例 {mismatch:.2%}")
+        failed = failed or mismatch > 0
+    if analytic_seconds > OVERHEAD_LIMIT * plain_seconds:
+        print(f"算出敏感度的耗时超过不算敏感度时的 {OVERHEAD_LIMIT:g} 倍")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
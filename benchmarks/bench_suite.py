@@ -0,0 +1,320 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+基准测试套件：各计算入口的单次耗时、单次内存峰值和吞吐量
+
+覆盖三类入口：
+    scalar.*  逐笔计算（calculate_margin_rate、calculate_total_cost、check_arbitrage、
+              calculate_breakdown、tin_kernel.fast_check_arbitrage）
+    batch.*   check_arbitrage_batch，行数 1 ~ 1000万（按10倍递增）
+    web.*     用 streamlit.testing 的 AppTest 无界面运行 web_app.py：清空缓存后的首次运行、
+              不改输入的重新运行、只改资金利率滑块或合约代码后的（局部）重新运行
+
+全部离线运行。结果保存为 JSON 基线，之后用 compare 比较两次结果，耗时或内存超过阈值
+即视为性能回退（退出码 1）：
+
+运行: python benchmarks/bench_suite.py run -o baseline.json [--max-rows 1000000] [--only batch]
+      python benchmarks/bench_suite.py run -o current.json --compare baseline.json
+      python benchmarks/bench_suite.py compare baseline.json current.json [--threshold 0.2]
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, Iterator, Tuple
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from tin_contract_registry import get_registry
+from tin_delivery_cost_calculator import DEFAULT_PARAMS, TinDeliveryCostCalculator
+
+WEB_APP = os.path.join(ROOT, "web_app.py")
+CONTRACT = "sn2607"
+START_DATE = datetime(2026, 3, 2)
+END_DATE = datetime(2026, 7, 15)
+
+# 批量计算的最大行数（按10倍递增，从1行开始）
+MAX_ROWS = 10_000_000
+# 每轮计时至少持续的秒数，以及计时轮数（取最快一轮）
+MIN_ROUND_SECONDS = 0.2
+ROUNDS = 5
+# 单次调用超过该秒数时只计时一轮
+SLOW_CALL_SECONDS = 1.0
+# compare 默认的回退阈值（相对基线增加的比例）
+DEFAULT_THRESHOLD = 0.20
+# 比较的指标：(字段, 名称)
+METRICS = (
+    ("seconds_per_call", "耗时"),
+    ("peak_bytes_per_call", "内存峰值"),
+)
+
+
+def measure_seconds(func: Callable[[], object]) -> Tuple[float, int]:
+    """
+    单次调用耗时（秒）
+
+    与 timeit.autorange 相同，先确定每轮调用次数使一轮至少持续 MIN_ROUND_SECONDS，
+    再计时 ROUNDS 轮取最快一轮；单次调用很慢时只计时一轮。
+
+    返回:
+        (每次调用秒数, 计时的调用总次数)
+    """
+    func()
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= MIN_ROUND_SECONDS:
+            break
+        number *= 10 if elapsed < MIN_ROUND_SECONDS / 10 else 2
+    best = elapsed / number
+    rounds = 1 if best > SLOW_CALL_SECONDS else ROUNDS - 1
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best, number * (rounds + 1)
+
+
+def measure_peak_bytes(func: Callable[[], object]) -> int:
+    """单次调用期间 tracemalloc 记录的内存峰值增量（字节，含 NumPy 数组）"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        base, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak - base
+
+
+def scalar_cases() -> Iterator[Tuple[str, Callable[[], object], int]]:
+    """(名称, 调用, 每次调用的行数)"""
+    from tin_kernel import fast_check_arbitrage
+
+    calculator = TinDeliveryCostCalculator()
+    info = get_registry()[CONTRACT]
+    delivery = datetime.combine(info.delivery_date, datetime.min.time())
+    schedule = info.margin_schedule()
+    args = dict(spot_price=250000.0, quantity_ton=10.0, start_date=START_DATE, end_date=END_DATE)
+
+    yield "scalar.calculate_margin_rate", lambda: calculator.calculate_margin_rate(START_DATE, delivery), 1
+    yield "scalar.calculate_total_cost", lambda: calculator.calculate_total_cost(**args, margin_rate=0.12), 1
+    yield "scalar.check_arbitrage", lambda: calculator.check_arbitrage(
+        futures_price=252000.0, **args, margin_rate=0.12
+    ), 1
+    yield "scalar.calculate_breakdown", lambda: calculator.calculate_breakdown(
+        futures_price=252000.0, **args, margin_rate=0.12
+    ), 1
+    yield "scalar.fast_check_arbitrage", lambda: fast_check_arbitrage(
+        DEFAULT_PARAMS, futures_price=252000.0, **args, margin_schedule=schedule
+    ), 1
+
+
+def make_scenarios(rows: int, seed: int = 2026) -> Dict[str, np.ndarray]:
+    """随机场景（列同 check_arbitrage_batch 的参数）"""
+    rng = np.random.default_rng(seed)
+    return {
+        "spot_price": rng.uniform(200000, 300000, rows).round(-1),
+        "futures_price": rng.uniform(200000, 300000, rows).round(-1),
+        "quantity_ton": rng.choice([1.0, 2.0, 10.0], rows),
+        "start_date": np.datetime64("2026-01-05") + rng.integers(0, 150, rows).astype("timedelta64[D]"),
+        "end_date": np.full(rows, np.datetime64("2026-07-15")),
+        "interest_rate": rng.uniform(0.02, 0.06, rows),
+        "margin_rate": rng.uniform(0.05, 0.20, rows),
+    }
+
+
+def batch_cases(max_rows: int) -> Iterator[Tuple[str, Callable[[], object], int]]:
+    calculator = TinDeliveryCostCalculator()
+    rows = 1
+    while rows <= max_rows:
+        scenarios = make_scenarios(rows)
+        yield f"batch.check_arbitrage_batch[{rows}]", lambda s=scenarios: calculator.check_arbitrage_batch(**s), rows
+        rows *= 10
+
+
+def web_cases() -> Iterator[Tuple[str, Callable[[], object], int]]:
+    import logging
+
+    import streamlit as st
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1 import AppTest, local_script_runner
+
+    # AppTest 每次运行都会打印弃用提示等警告，基准测试时只保留错误日志
+    for logger in (
+        "streamlit.deprecation_util",
+        "streamlit.runtime.caching.cache_data_api",
+        "streamlit.runtime.scriptrunner_utils.script_run_context",
+    ):
+        logging.getLogger(logger).addFilter(lambda record: record.levelno >= logging.ERROR)
+
+    def run(target) -> "AppTest":
+        """运行 AppTest 或其中的控件（控件所在元素树的全部控件状态随运行提交）"""
+        app = target.run()
+        if app.exception:
+            raise RuntimeError(f"web_app.py 运行出错: {app.exception[0].message}")
+        return app
+
+    # AppTest 每次运行都新建 ScriptCache、重新编译整个脚本；服务器上脚本只在首次运行时编译，
+    # 之后的重新运行复用字节码。各次运行共用一个 ScriptCache，使重新运行的耗时与服务器一致
+    script_cache = ScriptCache()
+    local_script_runner.ScriptCache = lambda: script_cache
+
+    def first_run():
+        st.cache_data.clear()
+        st.cache_resource.clear()
+        script_cache.clear()
+        return run(AppTest.from_file(WEB_APP, default_timeout=120))
+
+    # 修改侧边栏输入时页面只重新运行依赖它的部分，之后 app 的元素树只含这些部分；
+    # 因此从整页运行的元素树上取控件来修改
+    app = first_run()
+    slider = app.sidebar.slider[0]
+    contract_code = app.sidebar.text_input(key="contract_code")
+    rates = iter(np.tile([3.0, 4.0], 1_000_000))
+    codes = iter(["sn2609", "sn2607"] * 1_000_000)
+
+    yield "web.first_run", first_run, 1
+    yield "web.rerun", lambda: run(app), 1
+    yield "web.interest_rate_change", lambda: run(slider.set_value(float(next(rates)))), 1
+    yield "web.contract_code_change", lambda: run(contract_code.set_value(next(codes))), 1
+
+
+GROUPS = {
+    "scalar": lambda args: scalar_cases(),
+    "batch": lambda args: batch_cases(args.max_rows),
+    "web": lambda args: web_cases(),
+}
+
+
+def run_suite(args) -> dict:
+    results = {}
+    print(f"{'入口':<42}{'耗时/次':>12}{'内存峰值/次':>12}{'吞吐量':>18}")
+    for group, cases in GROUPS.items():
+        if args.only and group not in args.only:
+            continue
+        for name, func, rows in cases(args):
+            seconds, calls = measure_seconds(func)
+            peak = measure_peak_bytes(func)
+            results[name] = {
+                "rows": rows,
+                "calls": calls,
+                "seconds_per_call": seconds,
+                "calls_per_second": 1 / seconds,
+                "rows_per_second": rows / seconds,
+                "peak_bytes_per_call": peak,
+            }
+            throughput = f"{rows / seconds:,.0f} 行/秒" if group == "batch" else f"{1 / seconds:,.0f} 次/秒"
+            print(f"{name:<42}{format_seconds(seconds):>12}{format_bytes(peak):>12}{throughput:>18}", flush=True)
+    return {
+        "meta": {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "machine": platform.node(),
+            "cpu_count": os.cpu_count(),
+        },
+        "results": results,
+    }
+
+
+def format_seconds(seconds: float) -> str:
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("µs", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f} {unit}"
+    return f"{seconds / 1e-9:.0f} ns"
+
+
+def format_bytes(size: float) -> str:
+    for unit, scale in (("GB", 1 << 30), ("MB", 1 << 20), ("KB", 1 << 10)):
+        if size >= scale:
+            return f"{size / scale:.1f} {unit}"
+    return f"{size:.0f} B"
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> int:
+    """
+    逐项比较两次结果，打印变化比例
+
+    返回:
+        相对基线增加超过 threshold 的指标数
+    """
+    regressions = 0
+    print(f"{'入口':<42}{'指标':<8}{'基线':>12}{'当前':>12}{'变化':>9}")
+    for name, base in baseline["results"].items():
+        now = current["results"].get(name)
+        if now is None:
+            continue
+        for field, label in METRICS:
+            old, new = base[field], now[field]
+            formatter = format_seconds if field == "seconds_per_call" else format_bytes
+            change = (new - old) / old if old > 0 else 0.0
+            flag = ""
+            if change > threshold:
+                flag = "  回退"
+                regressions += 1
+            print(f"{name:<42}{label:<8}{formatter(old):>12}{formatter(new):>12}{change:>+9.1%}{flag}")
+    missing = sorted(set(baseline["results"]) - set(current["results"]))
+    if missing:
+        print(f"当前结果中没有的入口: {', '.join(missing)}")
+    return regressions
+
+
+def load(path: str) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="计算入口的基准测试与性能回退检查")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="运行基准测试")
+    run_parser.add_argument("-o", "--output", help="结果保存为 JSON（作为基线或与基线比较）")
+    run_parser.add_argument("--max-rows", type=int, default=MAX_ROWS, help=f"批量计算的最大行数，默认 {MAX_ROWS:,}")
+    run_parser.add_argument("--only", nargs="+", choices=sorted(GROUPS), help="只运行指定的几组")
+    run_parser.add_argument("--compare", metavar="BASELINE", help="运行后与该基线比较")
+    run_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="回退阈值，默认 0.2（增加20%%）")
+
+    compare_parser = commands.add_parser("compare", help="比较两次结果")
+    compare_parser.add_argument("baseline", help="基线 JSON")
+    compare_parser.add_argument("current", help="当前结果 JSON")
+    compare_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="回退阈值，默认 0.2（增加20%%）")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        current = run_suite(args)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(current, f, ensure_ascii=False, indent=2)
+        if not args.compare:
+            return 0
+        baseline = load(args.compare)
+    else:
+        baseline, current = load(args.baseline), load(args.current)
+
+    regressions = compare(baseline, current, args.threshold)
+    if regressions:
+        print(f"{regressions} 项指标比基线增加超过 {args.threshold:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
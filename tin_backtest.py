@@ -0,0 +1,304 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+历史回测
+按块读取现货/期货价格历史（CSV 或 Parquet），按合约代码查出交割日期和动态保证金，
+整块批量计算每个交易日、每个合约的套利结果；内存占用只与块大小有关，
+历史文件大于内存时也可以回测
+"""
+
+import os
+from typing import Dict, Iterable, Iterator, Optional
+
+import numpy as np
+import pandas as pd
+
+from tin_contract_registry import DEFAULT_MARGIN_RATES, ContractRegistry, get_registry
+from tin_delivery_cost_calculator import (
+    DEFAULT_PARAMS,
+    TinDeliveryCostCalculator,
+    TinDeliveryParams
+)
+
+# 每块读取的行数
+DEFAULT_CHUNK_ROWS = 200_000
+
+# 价格历史需要的列（标准列名）；文件列名不同时通过 column_map 指定
+PRICE_COLUMNS = ("date", "contract_code", "spot_price", "futures_price")
+
+# 回测结果的列
+BACKTEST_COLUMNS = (
+    "date",
+    "contract_code",
+    "delivery_date",
+    "holding_days",
+    "spot_price",
+    "futures_price",
+    "margin_rate",
+    "total_cost",
+    "cost_per_ton",
+    "profit",
+    "profit_per_ton",
+    "profit_rate",
+    "can_arbitrage",
+    "break_even_futures_price",
+)
+
+
+def _normalize_chunk(chunk: pd.DataFrame, column_map: Optional[Dict[str, str]]) -> pd.DataFrame:
+    """文件列名 -> 标准列名，并统一日期、合约代码和价格的类型"""
+    if column_map:
+        chunk = chunk.rename(columns={source: name for name, source in column_map.items()})
+    missing = [name for name in PRICE_COLUMNS if name not in chunk]
+    if missing:
+        raise ValueError(f"价格历史缺少列: {', '.join(missing)}")
+    return pd.DataFrame({
+        "date": pd.to_datetime(chunk["date"]).to_numpy(dtype="datetime64[s]"),
+        "contract_code": chunk["contract_code"].astype(str).to_numpy(dtype=object),
+        "spot_price": pd.to_numeric(chunk["spot_price"], errors="coerce").to_numpy(dtype=np.float64),
+        "futures_price": pd.to_numeric(chunk["futures_price"], errors="coerce").to_numpy(dtype=np.float64),
+    })
+
+
+def iter_price_history(
+    path: str,
+    chunksize: int = DEFAULT_CHUNK_ROWS,
+    column_map: Optional[Dict[str, str]] = None
+) -> Iterator[pd.DataFrame]:
+    """
+    按块读取价格历史
+
+    参数:
+        path: CSV 或 Parquet（.parquet/.pq，需要 pyarrow）文件路径
+        chunksize: 每块行数
+        column_map: 标准列名 -> 文件列名，如 {"date": "交易日期", "spot_price": "SMM现货价"}
+
+    返回:
+        DataFrame 迭代器，列为 PRICE_COLUMNS
+    """
+    file_columns = [(column_map or {}).get(name, name) for name in PRICE_COLUMNS]
+    suffix = os.path.splitext(path)[1].lower()
+    if suffix in (".parquet", ".pq"):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("读取 Parquet 文件需要安装 pyarrow") from None
+        parquet_file = pq.ParquetFile(path)
+        for batch in parquet_file.iter_batches(batch_size=chunksize, columns=file_columns):
+            yield _normalize_chunk(batch.to_pandas(), column_map)
+    else:
+        for chunk in pd.read_csv(path, chunksize=chunksize, usecols=file_columns):
+            yield _normalize_chunk(chunk, column_map)
+
+
+def backtest_chunk(
+    prices: pd.DataFrame,
+    params: TinDeliveryParams = DEFAULT_PARAMS,
+    quantity_ton: float = 1.0,
+    interest_rate: Optional[float] = None,
+    enterprise_margin_addon: float = 0.0,
+    margin_rates: Iterable[float] = DEFAULT_MARGIN_RATES,
+    fee_kwargs: Optional[Dict[str, float]] = None,
+    registry: Optional[ContractRegistry] = None,
+    calculator: Optional[TinDeliveryCostCalculator] = None
+) -> pd.DataFrame:
+    """
+    回测一块价格数据：每行视为当天买入现货、持有到合约交割日
+
+    未知合约、价格缺失以及交易日晚于交割日的行会被跳过。
+
+    参数:
+        prices: 价格数据，列为 PRICE_COLUMNS
+        params: 交割参数
+        quantity_ton: 每笔数量（吨），默认按1吨计算
+        interest_rate: 资金利率（年化），默认使用params.default_interest_rate
+        enterprise_margin_addon: 企业保证金加收比例
+        margin_rates: 四档保证金比例
+        fee_kwargs: 交割杂费参数，见 calculate_delivery_fees
+        registry: 合约信息表，默认使用 get_registry()
+        calculator: 计算器，默认新建一个
+
+    返回:
+        DataFrame，列为 BACKTEST_COLUMNS
+    """
+    if registry is None:
+        registry = get_registry()
+    if calculator is None:
+        calculator = TinDeliveryCostCalculator(params)
+    margin_rates = tuple(margin_rates)
+
+    contract_dates = registry.lookup(prices["contract_code"].to_numpy())
+    delivery_date = contract_dates["delivery_date"].to_numpy()
+    dates = prices["date"].to_numpy()
+    valid = (
+        ~np.isnat(delivery_date)
+        & (dates <= delivery_date)
+        & ~np.isnan(prices["spot_price"].to_numpy())
+        & ~np.isnan(prices["futures_price"].to_numpy())
+    )
+    prices = prices[valid]
+    delivery_date = delivery_date[valid]
+    dates = dates[valid]
+
+    # 动态保证金：按合约分组，每个合约的保证金阶梯对整组开始日期一次算出
+    codes, uniques = pd.factorize(prices["contract_code"])
+    margin_rate = np.empty(len(prices))
+    for position, info in enumerate(registry.get_many(uniques)):
+        rows = codes == position
+        schedule = info.margin_schedule(*margin_rates)
+        margin_rate[rows] = schedule.average_rates(dates[rows], enterprise_margin_addon)
+
+    result = calculator.check_arbitrage_batch(
+        spot_price=prices["spot_price"].to_numpy(),
+        futures_price=prices["futures_price"].to_numpy(),
+        quantity_ton=quantity_ton,
+        start_date=dates,
+        end_date=delivery_date,
+        interest_rate=interest_rate,
+        margin_rate=margin_rate,
+        params=params,
+        **(fee_kwargs or {})
+    )
+    columns = {
+        "date": dates,
+        "contract_code": prices["contract_code"].to_numpy(),
+        "delivery_date": delivery_date,
+    }
+    for name in BACKTEST_COLUMNS[3:]:
+        columns[name] = result[name]
+    return pd.DataFrame(columns)
+
+
+def iter_backtest(
+    path: str,
+    chunksize: int = DEFAULT_CHUNK_ROWS,
+    column_map: Optional[Dict[str, str]] = None,
+    **backtest_kwargs
+) -> Iterator[pd.DataFrame]:
+    """
+    逐块回测价格历史文件
+
+    参数:
+        path: 价格历史文件，见 iter_price_history
+        chunksize: 每块行数
+        column_map: 标准列名 -> 文件列名
+        **backtest_kwargs: 回测参数，见 backtest_chunk
+
+    返回:
+        每块的回测结果（DataFrame 迭代器）
+    """
+    backtest_kwargs.setdefault("registry", get_registry())
+    backtest_kwargs.setdefault(
+        "calculator", TinDeliveryCostCalculator(backtest_kwargs.get("params", DEFAULT_PARAMS))
+    )
+    for prices in iter_price_history(path, chunksize, column_map):
+        yield backtest_chunk(prices, **backtest_kwargs)
+
+
+class BacktestSummary:
+    """
+    按合约增量汇总回测结果（只保存每个合约的几个累计量，内存与行数无关）
+    """
+
+    def __init__(self):
+        self._totals: Optional[pd.DataFrame] = None
+
+    def update(self, result: pd.DataFrame):
+        """累加一块回测结果"""
+        if result.empty:
+            return
+        grouped = result.groupby("contract_code", sort=False)
+        totals = pd.DataFrame({
+            "days": grouped.size(),
+            "profitable_days": grouped["can_arbitrage"].sum(),
+            "profit_per_ton_sum": grouped["profit_per_ton"].sum(),
+            "profit_per_ton_min": grouped["profit_per_ton"].min(),
+            "profit_per_ton_max": grouped["profit_per_ton"].max(),
+            "first_date": grouped["date"].min(),
+            "last_date": grouped["date"].max(),
+        })
+        if self._totals is None:
+            self._totals = totals
+            return
+        combined = self._totals.reindex(self._totals.index.union(totals.index))
+        new = totals.reindex(combined.index)
+        for column in ("days", "profitable_days", "profit_per_ton_sum"):
+            combined[column] = combined[column].fillna(0) + new[column].fillna(0)
+        # 只在一侧出现的合约另一侧为缺失值，min/max 会跳过缺失值
+        for column in ("profit_per_ton_min", "first_date"):
+            combined[column] = pd.concat([combined[column], new[column]], axis=1).min(axis=1)
+        for column in ("profit_per_ton_max", "last_date"):
+            combined[column] = pd.concat([combined[column], new[column]], axis=1).max(axis=1)
+        self._totals = combined
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        汇总表（按合约代码排序）
+
+        列：交易日数、可套利日数、可套利比例、每吨利润的均值/最小值/最大值、首末交易日
+        """
+        if self._totals is None:
+            return pd.DataFrame(columns=[
+                "days", "profitable_days", "profitable_ratio", "mean_profit_per_ton",
+                "min_profit_per_ton", "max_profit_per_ton", "first_date", "last_date"
+            ])
+        totals = self._totals.sort_index()
+        return pd.DataFrame({
+            "days": totals["days"].astype(np.int64),
+            "profitable_days": totals["profitable_days"].astype(np.int64),
+            "profitable_ratio": totals["profitable_days"] / totals["days"],
+            "mean_profit_per_ton": totals["profit_per_ton_sum"] / totals["days"],
+            "min_profit_per_ton": totals["profit_per_ton_min"],
+            "max_profit_per_ton": totals["profit_per_ton_max"],
+            "first_date": totals["first_date"],
+            "last_date": totals["last_date"],
+        })
+
+
+def _write_chunk(result: pd.DataFrame, output_path: str, writer, first: bool):
+    """追加写入一块结果：CSV 直接追加，Parquet 使用同一个 ParquetWriter"""
+    if output_path.lower().endswith((".parquet", ".pq")):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        table = pa.Table.from_pandas(result, preserve_index=False)
+        if writer is None:
+            writer = pq.ParquetWriter(output_path, table.schema)
+        writer.write_table(table)
+        return writer
+    result.to_csv(output_path, mode="w" if first else "a", header=first, index=False)
+    return writer
+
+
+def run_backtest(
+    path: str,
+    output_path: Optional[str] = None,
+    chunksize: int = DEFAULT_CHUNK_ROWS,
+    column_map: Optional[Dict[str, str]] = None,
+    **backtest_kwargs
+) -> pd.DataFrame:
+    """
+    回测整个价格历史文件，逐块写出明细并返回按合约的汇总
+
+    参数:
+        path: 价格历史文件（CSV/Parquet）
+        output_path: 逐日逐合约明细的输出文件（.csv 或 .parquet），为None时不输出明细
+        chunksize: 每块行数
+        column_map: 标准列名 -> 文件列名
+        **backtest_kwargs: 回测参数，见 backtest_chunk
+
+    返回:
+        按合约汇总的 DataFrame，见 BacktestSummary.to_frame
+    """
+    summary = BacktestSummary()
+    writer = None
+    first = True
+    try:
+        for result in iter_backtest(path, chunksize, column_map, **backtest_kwargs):
+            summary.update(result)
+            if output_path is not None:
+                writer = _write_chunk(result, output_path, writer, first)
+                first = False
+    finally:
+        if writer is not None:
+            writer.close()
+    return summary.to_frame()
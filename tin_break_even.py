@@ -0,0 +1,218 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+盈亏平衡与反向求解
+套利模型对现货价格、期货价格和交割价格是分段线性的（分段点来自增值税的 max(0, …)），
+因此盈亏平衡期货价格、最高可套利现货价格和最低所需升水都有解析解。
+所有函数按 NumPy 广播规则支持标量与数组混合输入，例如传入 spot_price[:, None]
+与 holding_days[None, :] 即可一次得到整张盈亏平衡曲面。
+
+每吨口径下数量会被约去，因此这里的求解结果与数量无关。
+"""
+
+import numpy as np
+
+from tin_delivery_cost_calculator import (
+    _BATCH_FEE_FIELDS,
+    TinDeliveryParams,
+    _fill_missing,
+    _holding_days_array
+)
+
+
+def _per_ton_terms(
+    params: TinDeliveryParams,
+    holding_days=None,
+    start_date=None,
+    end_date=None,
+    interest_rate=None,
+    margin_rate=None,
+    **fee_kwargs
+):
+    """
+    每吨成本中与价格无关的部分和各项系数
+
+    返回:
+        (fixed, rate_days, futures_factor)
+        fixed: 每吨交割杂费 + 每吨仓储费（仓储费按未截断的持有天数）
+        rate_days: 日利率 × 计息天数（计息天数不为负）
+        futures_factor: 期货保证金利息系数 max(0, 保证金比例 × rate_days)
+    """
+    unknown = set(fee_kwargs) - {name for name, _, _ in _BATCH_FEE_FIELDS}
+    if unknown:
+        raise TypeError(f"未知的费用参数: {', '.join(sorted(unknown))}")
+    if holding_days is None:
+        if start_date is None or end_date is None:
+            raise ValueError("需要提供 holding_days，或同时提供 start_date 和 end_date")
+        raw_days = _holding_days_array(start_date, end_date)
+    else:
+        raw_days = np.asarray(holding_days, dtype=np.float64)
+
+    # 与 calculate_delivery_fees 一致：未提供或为0的费率使用默认值
+    misc_per_ton = 0.0
+    for name, default_attr, _ in _BATCH_FEE_FIELDS:
+        default = getattr(params, default_attr) if default_attr else 0.0
+        fee = _fill_missing(fee_kwargs.get(name), default)
+        if default_attr:
+            fee = np.where(fee == 0, default, fee)
+        misc_per_ton = misc_per_ton + fee
+    fixed = misc_per_ton + params.storage_fee_per_ton_per_day * raw_days
+
+    interest_rate = _fill_missing(interest_rate, params.default_interest_rate)
+    rate_days = interest_rate / 365 * np.maximum(raw_days, 0)
+
+    if margin_rate is None:
+        used_margin_rate = np.float64(params.futures_margin_rate)
+    else:
+        margin_rate = np.asarray(margin_rate, dtype=np.float64)
+        used_margin_rate = np.where(
+            np.isnan(margin_rate), params.futures_margin_rate, np.maximum(0, margin_rate)
+        )
+    # 期货利息 max(0, 现货价格 × 保证金比例 × rate_days)，现货价格非负时可提出价格
+    futures_factor = np.maximum(0, used_margin_rate * rate_days)
+    return fixed, rate_days, futures_factor
+
+
+def _delivery_price_array(delivery_price):
+    """交割价格数组；未提供（None/NaN）时返回 None，表示交割价格等于期货价格"""
+    if delivery_price is None:
+        return None
+    return np.asarray(delivery_price, dtype=np.float64)
+
+
+def break_even_futures_price(
+    params: TinDeliveryParams,
+    spot_price,
+    holding_days=None,
+    start_date=None,
+    end_date=None,
+    interest_rate=None,
+    margin_rate=None,
+    delivery_price=None,
+    **fee_kwargs
+) -> np.ndarray:
+    """
+    盈亏平衡期货价格：期货价格高于它时 check_arbitrage 判断可以套利
+
+    交割价格固定时即 check_arbitrage 的 break_even_futures_price；未提供交割价格时
+    交割价格随期货价格变化，增值税 max(0, (期货价格 - 现货价格) × 税率) 及其利息
+    也随之变化，这里按分段线性方程直接求解。
+
+    参数:
+        params: 交割参数（TinDeliveryParams）
+        spot_price: 现货价格（元/吨）
+        holding_days: 持有天数；不提供时由 start_date、end_date 计算
+        start_date: 开始日期
+        end_date: 结束日期
+        interest_rate: 资金利率（年化），默认使用params.default_interest_rate
+        margin_rate: 期货保证金比例，默认使用params.futures_margin_rate
+        delivery_price: 交割价格（元/吨），为None/NaN时等于期货价格
+        其他费用参数：**fee_kwargs，见 calculate_delivery_fees（按吨费率）
+
+    返回:
+        盈亏平衡期货价格（元/吨）；交割价格随期货价格变化且 增值税率 × rate_days ≥ 1
+        时不存在，为 NaN
+    """
+    spot_price = np.asarray(spot_price, dtype=np.float64)
+    fixed, rate_days, futures_factor = _per_ton_terms(
+        params, holding_days, start_date, end_date, interest_rate, margin_rate, **fee_kwargs
+    )
+    # 不含增值税部分的每吨成本（增值税为0时的盈亏平衡价格）
+    base = spot_price * (1 + rate_days + futures_factor) + fixed
+    vat_rate_days = params.vat_rate * rate_days
+
+    # 交割价格等于期货价格：期货价格高于现货价格的部分要交增值税并占用资金
+    with np.errstate(divide="ignore", invalid="ignore"):
+        floating = np.where(
+            base <= spot_price,
+            base,
+            np.where(
+                vat_rate_days < 1,
+                (base - spot_price * vat_rate_days) / (1 - vat_rate_days),
+                np.nan
+            )
+        )
+
+    delivery_price = _delivery_price_array(delivery_price)
+    if delivery_price is None:
+        return floating
+    vat_per_ton = np.maximum(0, (delivery_price - spot_price) * params.vat_rate)
+    fixed_delivery = base + vat_per_ton * rate_days
+    return np.where(np.isnan(delivery_price), floating, fixed_delivery)
+
+
+def max_spot_price(
+    params: TinDeliveryParams,
+    futures_price,
+    holding_days=None,
+    start_date=None,
+    end_date=None,
+    interest_rate=None,
+    margin_rate=None,
+    delivery_price=None,
+    **fee_kwargs
+) -> np.ndarray:
+    """
+    最高可套利现货价格：现货价格低于它时 check_arbitrage 判断可以套利
+
+    参数:
+        params: 交割参数（TinDeliveryParams）
+        futures_price: 期货价格（元/吨）
+        holding_days: 持有天数；不提供时由 start_date、end_date 计算
+        start_date: 开始日期
+        end_date: 结束日期
+        interest_rate: 资金利率（年化），默认使用params.default_interest_rate
+        margin_rate: 期货保证金比例，默认使用params.futures_margin_rate
+        delivery_price: 交割价格（元/吨），为None/NaN时等于期货价格
+        其他费用参数：**fee_kwargs，见 calculate_delivery_fees（按吨费率）
+
+    返回:
+        现货价格上限（元/吨）；任何非负现货价格都无法套利时为 NaN
+    """
+    futures_price = np.asarray(futures_price, dtype=np.float64)
+    fixed, rate_days, futures_factor = _per_ton_terms(
+        params, holding_days, start_date, end_date, interest_rate, margin_rate, **fee_kwargs
+    )
+    delivery_price = _delivery_price_array(delivery_price)
+    if delivery_price is None:
+        delivery_price = futures_price
+    else:
+        delivery_price = np.where(np.isnan(delivery_price), futures_price, delivery_price)
+
+    # 每吨利润 = 期货价格 - 现货价格 × (1 + rate_days + futures_factor) - fixed
+    #           - max(0, (交割价格 - 现货价格) × 税率) × rate_days
+    slope = 1 + rate_days + futures_factor
+    vat_rate_days = params.vat_rate * rate_days
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # 现货价格低于交割价格：需要缴纳增值税
+        below = (futures_price - fixed - delivery_price * vat_rate_days) / (slope - vat_rate_days)
+        # 现货价格不低于交割价格：增值税为0
+        above = (futures_price - fixed) / slope
+    result = np.where(below < delivery_price, below, above)
+    return np.where(result >= 0, result, np.nan)
+
+
+def min_premium(
+    params: TinDeliveryParams,
+    spot_price,
+    holding_days=None,
+    start_date=None,
+    end_date=None,
+    interest_rate=None,
+    margin_rate=None,
+    delivery_price=None,
+    **fee_kwargs
+) -> np.ndarray:
+    """
+    持有期内最低所需升水：期货价格需高出现货价格多少才能保本
+
+    参数同 break_even_futures_price
+
+    返回:
+        最低升水（元/吨）= 盈亏平衡期货价格 - 现货价格
+    """
+    break_even = break_even_futures_price(
+        params, spot_price, holding_days, start_date, end_date,
+        interest_rate, margin_rate, delivery_price, **fee_kwargs
+    )
+    return break_even - np.asarray(spot_price, dtype=np.float64)
@@ -0,0 +1,302 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+盈亏平衡查找表
+交割参数、资金利率、保证金和交割杂费固定后，对每个 (合约, 开始日期)，交割价格等于
+期货价格时的盈亏平衡期货价格是现货价格的仿射函数：
+    盈亏平衡期货价格 = slope × 现货价格 + intercept
+    slope = (spot_factor - 增值税率 × rate_days) / (1 - 增值税率 × rate_days)
+    intercept = fixed / (1 - 增值税率 × rate_days)
+（spot_factor、fixed、rate_days 见 tin_break_even._per_ton_terms；现货价格为正、
+每吨固定费用为正时成立，即 tin_break_even.break_even_futures_price 的一般情形）。
+
+预先为每个合约、每个交易日（挂牌日到交割日前一个交易日）算好 slope 和 intercept，
+存成两列连续的 float64 数组，可保存为 .npz 文件。之后判断一笔报价能否套利只需一次
+字典查询和一次乘加，不需要再调用完整的成本模型。
+"""
+
+import json
+from datetime import date
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+from tin_break_even import _per_ton_terms
+from tin_contract_registry import DEFAULT_MARGIN_RATES, ContractRegistry, get_registry
+from tin_delivery_cost_calculator import DEFAULT_PARAMS, TinDeliveryParams, _epoch_day
+from tin_trading_calendar import TradingCalendar, get_calendar
+
+
+def _day_number(value) -> int:
+    """date/datetime/datetime64/字符串 -> 纪元日"""
+    if isinstance(value, date):
+        return _epoch_day(value)
+    return int(np.datetime64(value, "D").astype(np.int64))
+
+
+class BreakEvenTable:
+    """
+    按 (合约, 开始日期) 预先计算的盈亏平衡系数表
+
+    数据布局：全部系数按合约依次存放在 slope / intercept 两个数组中，
+    合约 c 的第 i 个交易日在第 offsets[c] + i 行；trade_days 为所有合约共用的交易日
+    （纪元日）数组。查询时合约代码和日期各查一次字典，得到行号，O(1)。
+    """
+
+    def __init__(
+        self,
+        codes: Tuple[str, ...],
+        first_positions: np.ndarray,
+        counts: np.ndarray,
+        offsets: np.ndarray,
+        trade_days: np.ndarray,
+        slope: np.ndarray,
+        intercept: np.ndarray,
+        settings: Dict[str, object]
+    ):
+        """
+        一般通过 build() 或 load() 创建
+
+        参数:
+            codes: 合约代码
+            first_positions: 每个合约第一个交易日在 trade_days 中的位置
+            counts: 每个合约的交易日数
+            offsets: 每个合约在系数数组中的起始行
+            trade_days: 交易日（纪元日，升序）
+            slope / intercept: 系数
+            settings: 构建时使用的参数（交割参数、利率、保证金等），随表一起保存
+        """
+        self.codes = tuple(codes)
+        self.first_positions = np.asarray(first_positions, dtype=np.int64)
+        self.counts = np.asarray(counts, dtype=np.int64)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.trade_days = np.asarray(trade_days, dtype=np.int64)
+        self.slope = np.asarray(slope, dtype=np.float64)
+        self.intercept = np.asarray(intercept, dtype=np.float64)
+        self.settings = settings
+        self._code_positions = {code: i for i, code in enumerate(self.codes)}
+        self._day_positions = {int(day): i for i, day in enumerate(self.trade_days)}
+        # 标量查询直接用 Python 列表，避免 NumPy 标量的开销
+        self._first_list = self.first_positions.tolist()
+        self._count_list = self.counts.tolist()
+        self._offset_list = self.offsets.tolist()
+        self._slope_list = self.slope.tolist()
+        self._intercept_list = self.intercept.tolist()
+
+    @classmethod
+    def build(
+        cls,
+        params: TinDeliveryParams = DEFAULT_PARAMS,
+        interest_rate: Optional[float] = None,
+        enterprise_margin_addon: float = 0.0,
+        margin_rates: Iterable[float] = DEFAULT_MARGIN_RATES,
+        fee_kwargs: Optional[Dict[str, float]] = None,
+        contracts: Optional[Iterable[str]] = None,
+        registry: Optional[ContractRegistry] = None,
+        calendar: Optional[TradingCalendar] = None
+    ) -> "BreakEvenTable":
+        """
+        计算系数表
+
+        参数:
+            params: 交割参数
+            interest_rate: 资金利率（年化），默认使用params.default_interest_rate
+            enterprise_margin_addon: 企业保证金加收比例
+            margin_rates: 四档保证金比例
+            fee_kwargs: 交割杂费参数，见 calculate_delivery_fees
+            contracts: 合约代码，默认为合约信息表中的全部合约
+            registry: 合约信息表，默认使用 get_registry()
+            calendar: 交易日历，默认使用 get_calendar()
+
+        返回:
+            BreakEvenTable
+        """
+        if registry is None:
+            registry = get_registry()
+        if calendar is None:
+            calendar = get_calendar()
+        margin_rates = tuple(margin_rates)
+        fee_kwargs = dict(fee_kwargs or {})
+        # get_many 把各合约的休市安排警告合并为一条
+        codes = list(registry.codes() if contracts is None else contracts)
+        infos = registry.get_many(codes)
+        unknown = [code for code, info in zip(codes, infos) if info is None]
+        if unknown:
+            raise KeyError(", ".join(map(str, unknown)))
+
+        trade_days = np.array(calendar.trading_days, dtype="datetime64[D]").astype(np.int64)
+        codes, first_positions, counts = [], [], []
+        slope_parts, intercept_parts = [], []
+        for info in infos:
+            # 开始日期为挂牌日到交割日前一个交易日
+            lo = int(np.searchsorted(trade_days, _day_number(info.listing_date), side="left"))
+            hi = int(np.searchsorted(trade_days, _day_number(info.delivery_date), side="left"))
+            days = trade_days[lo:hi]
+            margin_rate = info.margin_schedule(*margin_rates).average_rates(
+                days.astype("datetime64[D]"), enterprise_margin_addon
+            )
+            fixed, rate_days, futures_factor = _per_ton_terms(
+                params,
+                holding_days=_day_number(info.delivery_date) - days,
+                interest_rate=interest_rate,
+                margin_rate=margin_rate,
+                **fee_kwargs
+            )
+            vat_rate_days = params.vat_rate * rate_days
+            with np.errstate(divide="ignore", invalid="ignore"):
+                # 增值税率 × rate_days ≥ 1 时不存在盈亏平衡点
+                denominator = np.where(vat_rate_days < 1, 1 - vat_rate_days, np.nan)
+                slope = (1 + rate_days + futures_factor - vat_rate_days) / denominator
+                intercept = fixed / denominator
+            slope_parts.append(np.broadcast_to(slope, days.shape))
+            intercept_parts.append(np.broadcast_to(intercept, days.shape))
+            codes.append(info.code)
+            first_positions.append(lo)
+            counts.append(hi - lo)
+
+        counts = np.array(counts, dtype=np.int64)
+        offsets = np.concatenate(([0], np.cumsum(counts)[:-1])) if len(counts) else counts
+        settings = {
+            "params": params.to_dict(),
+            "interest_rate": interest_rate,
+            "enterprise_margin_addon": enterprise_margin_addon,
+            "margin_rates": list(margin_rates),
+            "fee_kwargs": fee_kwargs,
+        }
+        return cls(
+            codes,
+            np.array(first_positions, dtype=np.int64),
+            counts,
+            offsets,
+            trade_days,
+            np.concatenate(slope_parts) if slope_parts else np.empty(0),
+            np.concatenate(intercept_parts) if intercept_parts else np.empty(0),
+            settings
+        )
+
+    @property
+    def params(self) -> TinDeliveryParams:
+        """构建时使用的交割参数"""
+        return TinDeliveryParams(**self.settings["params"])
+
+    def __len__(self) -> int:
+        """系数行数（合约 × 交易日）"""
+        return len(self.slope)
+
+    @property
+    def nbytes(self) -> int:
+        """系数和索引数组占用的字节数"""
+        return sum(
+            array.nbytes for array in (
+                self.first_positions, self.counts, self.offsets,
+                self.trade_days, self.slope, self.intercept
+            )
+        )
+
+    def _row(self, contract_code: str, trade_date) -> int:
+        position = self._code_positions.get(contract_code)
+        if position is None:
+            raise KeyError(contract_code)
+        day_position = self._day_positions.get(_day_number(trade_date))
+        index = -1 if day_position is None else day_position - self._first_list[position]
+        if not 0 <= index < self._count_list[position]:
+            raise KeyError(f"{contract_code} 在 {trade_date} 不是可查询的交易日")
+        return self._offset_list[position] + index
+
+    def coefficients(self, contract_code: str, trade_date) -> Tuple[float, float]:
+        """
+        (slope, intercept)
+
+        参数:
+            contract_code: 合约代码（规范形式，如 "sn2607"）
+            trade_date: 开始日期（交易日）
+
+        异常:
+            KeyError: 未知合约，或该日期不是该合约挂牌日到交割日前的交易日
+        """
+        row = self._row(contract_code, trade_date)
+        return self._slope_list[row], self._intercept_list[row]
+
+    def break_even(self, contract_code: str, trade_date, spot_price: float) -> float:
+        """盈亏平衡期货价格（元/吨）"""
+        row = self._row(contract_code, trade_date)
+        return self._slope_list[row] * spot_price + self._intercept_list[row]
+
+    def is_arbitrage(self, contract_code: str, trade_date, spot_price: float, futures_price: float) -> bool:
+        """期货价格高于盈亏平衡期货价格时可以套利（与 check_arbitrage 的 can_arbitrage 一致）"""
+        row = self._row(contract_code, trade_date)
+        return futures_price > self._slope_list[row] * spot_price + self._intercept_list[row]
+
+    def break_even_batch(self, contract_codes, trade_dates, spot_prices) -> np.ndarray:
+        """
+        批量查询盈亏平衡期货价格（按 NumPy 广播）
+
+        参数:
+            contract_codes: 合约代码数组
+            trade_dates: 开始日期数组（datetime64 或可转换的序列）
+            spot_prices: 现货价格
+
+        返回:
+            盈亏平衡期货价格数组；未知合约或不可查询的日期为 NaN
+        """
+        codes = np.asarray(contract_codes, dtype=object)
+        days = np.asarray(trade_dates, dtype="datetime64[D]").astype(np.int64)
+        codes, days = np.broadcast_arrays(codes, days)
+        unique_codes, code_index = np.unique(codes, return_inverse=True)
+        positions = np.array(
+            [self._code_positions.get(code, -1) for code in unique_codes], dtype=np.int64
+        )[code_index.reshape(codes.shape)]
+        known = positions >= 0
+        safe = np.where(known, positions, 0)
+        day_positions = np.searchsorted(self.trade_days, days)
+        is_trade_day = self.trade_days[np.minimum(day_positions, len(self.trade_days) - 1)] == days
+        index = day_positions - self.first_positions[safe]
+        valid = known & is_trade_day & (index >= 0) & (index < self.counts[safe])
+        rows = np.where(valid, self.offsets[safe] + index, 0)
+        result = self.slope[rows] * np.asarray(spot_prices, dtype=np.float64) + self.intercept[rows]
+        return np.where(valid, result, np.nan)
+
+    def save(self, path: str):
+        """保存为 .npz 文件（系数为 float64，参数以 JSON 保存）"""
+        np.savez_compressed(
+            path,
+            codes=np.array(self.codes),
+            first_positions=self.first_positions,
+            counts=self.counts,
+            offsets=self.offsets,
+            trade_days=self.trade_days,
+            slope=self.slope,
+            intercept=self.intercept,
+            settings=np.array(json.dumps(self.settings, ensure_ascii=False))
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "BreakEvenTable":
+        """读取 save() 保存的文件"""
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                tuple(str(code) for code in data["codes"]),
+                data["first_positions"],
+                data["counts"],
+                data["offsets"],
+                data["trade_days"],
+                data["slope"],
+                data["intercept"],
+                json.loads(str(data["settings"]))
+            )
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="预先计算全部合约、全部交易日的盈亏平衡系数表并保存为 .npz")
+    parser.add_argument("output", help="输出文件（.npz）")
+    parser.add_argument("--interest-rate", type=float, help="资金利率（年化）")
+    parser.add_argument("--margin-addon", type=float, default=0.0, help="企业保证金加收比例")
+    args = parser.parse_args()
+
+    table = BreakEvenTable.build(
+        interest_rate=args.interest_rate, enterprise_margin_addon=args.margin_addon
+    )
+    table.save(args.output)
+    print(f"{len(table.codes)} 个合约，{len(table):,} 行，{table.nbytes / 1024:,.0f} KB -> {args.output}")
@@ -0,0 +1,206 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+计算结果缓存层
+对 TinDeliveryCostCalculator 的计算结果按规范化后的输入做有界 LRU 缓存，
+记录命中/未命中次数；网页端通过 st.cache_resource 在所有会话间共享同一个缓存
+"""
+
+import inspect
+import threading
+from collections import OrderedDict
+from datetime import date, datetime
+from numbers import Number
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from tin_delivery_cost_calculator import TinDeliveryCostCalculator
+
+# 每个计算方法默认缓存的结果条数
+DEFAULT_CACHE_SIZE = 1024
+
+_MISSING = object()
+
+# NaN 与自身不相等，作为缓存键时统一替换为这个哨兵，NaN 输入才能命中缓存
+_NAN = object()
+
+
+class LRUCache:
+    """
+    线程安全的有界 LRU 缓存
+
+    超过 maxsize 时淘汰最久未使用的条目，并统计命中、未命中和淘汰次数。
+    计算过程不持锁，多个线程同时未命中同一个键时可能重复计算，结果一致。
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_CACHE_SIZE):
+        """
+        参数:
+            maxsize: 最多缓存的条目数
+        """
+        if maxsize <= 0:
+            raise ValueError("maxsize 必须为正数")
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """查询缓存，命中时把条目移到最近使用的位置"""
+        with self._lock:
+            value = self._data.get(key, _MISSING)
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any):
+        """写入缓存，超出容量时淘汰最久未使用的条目"""
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """命中则直接返回，否则调用 compute() 计算并写入缓存"""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        """清空缓存和统计"""
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, float]:
+        """缓存统计：条目数、容量、命中、未命中、淘汰次数和命中率"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+
+def normalize_value(value: Any) -> Hashable:
+    """
+    把单个输入规范化为可哈希的缓存键
+
+    数值统一为 float（numpy 标量、int 与 float 视为同一输入，NaN 统一为同一个哨兵），
+    pandas Timestamp 转为 datetime，带时区的 datetime 保留当地时间和 UTC 偏移
+    （同一时刻不同时区的输入不会共用缓存），列表/字典转为元组；
+    其余可哈希对象（如 TinDeliveryParams）原样使用。
+    """
+    if value is None or isinstance(value, (bool, str)):
+        return value
+    if hasattr(value, "to_pydatetime"):
+        value = value.to_pydatetime()
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            return (value.replace(tzinfo=None), value.utcoffset())
+        return value
+    if isinstance(value, date):
+        return value
+    if isinstance(value, Number):
+        value = float(value)
+        return _NAN if value != value else value
+    if isinstance(value, (list, tuple)):
+        return tuple(normalize_value(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((key, normalize_value(item)) for key, item in value.items()))
+    return value
+
+
+class CachedCalculator:
+    """
+    带缓存的计算器
+
+    与 TinDeliveryCostCalculator 的接口相同；calculate_margin_rate、
+    calculate_total_cost、check_arbitrage 和 calculate_breakdown 的结果按 (方法, 交割参数, 规范化后的
+    全部参数) 缓存，位置参数和关键字参数写法不同也会命中同一条缓存。
+    其他属性和方法直接转发给被包装的计算器。
+
+    注意：命中时返回的是缓存中的同一个结果对象，调用方不应修改它。
+    """
+
+    _CACHED_METHODS = (
+        "calculate_margin_rate",
+        "calculate_total_cost",
+        "check_arbitrage",
+        "calculate_breakdown",
+    )
+
+    def __init__(
+        self,
+        calculator: Optional[TinDeliveryCostCalculator] = None,
+        maxsize: int = DEFAULT_CACHE_SIZE
+    ):
+        """
+        参数:
+            calculator: 被包装的计算器，默认新建一个
+            maxsize: 每个方法最多缓存的结果条数
+        """
+        self.calculator = calculator if calculator is not None else TinDeliveryCostCalculator()
+        self.caches = {name: LRUCache(maxsize) for name in self._CACHED_METHODS}
+        self._signatures = {
+            name: inspect.signature(getattr(self.calculator, name))
+            for name in self._CACHED_METHODS
+        }
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.calculator, name)
+
+    def _make_key(self, method: str, args: tuple, kwargs: dict) -> Hashable:
+        """按方法签名绑定参数并补齐默认值，生成规范化的缓存键"""
+        bound = self._signatures[method].bind(*args, **kwargs)
+        bound.apply_defaults()
+        arguments = bound.arguments
+        if arguments.get("params", _MISSING) is None:
+            arguments["params"] = self.calculator.params
+        return tuple((name, normalize_value(value)) for name, value in arguments.items())
+
+    def _cached_call(self, method: str, args: tuple, kwargs: dict) -> Any:
+        key = self._make_key(method, args, kwargs)
+        return self.caches[method].get_or_compute(
+            key, lambda: getattr(self.calculator, method)(*args, **kwargs)
+        )
+
+    def calculate_margin_rate(self, *args, **kwargs):
+        """带缓存的 TinDeliveryCostCalculator.calculate_margin_rate"""
+        return self._cached_call("calculate_margin_rate", args, kwargs)
+
+    def calculate_total_cost(self, *args, **kwargs):
+        """带缓存的 TinDeliveryCostCalculator.calculate_total_cost"""
+        return self._cached_call("calculate_total_cost", args, kwargs)
+
+    def check_arbitrage(self, *args, **kwargs):
+        """带缓存的 TinDeliveryCostCalculator.check_arbitrage"""
+        return self._cached_call("check_arbitrage", args, kwargs)
+
+    def calculate_breakdown(self, *args, **kwargs):
+        """带缓存的 TinDeliveryCostCalculator.calculate_breakdown"""
+        return self._cached_call("calculate_breakdown", args, kwargs)
+
+    def cache_stats(self) -> Dict[str, Dict[str, float]]:
+        """各方法的缓存统计"""
+        return {name: cache.stats() for name, cache in self.caches.items()}
+
+    def clear_cache(self):
+        """清空全部缓存"""
+        for cache in self.caches.values():
+            cache.clear()
@@ -0,0 +1,383 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+锡（sn）合约信息表
+一次性预先计算配置年份范围内每个 snYYMM 合约的挂牌日期、保证金时间点、
+最后交易日和交割日期，按合约代码 O(1) 查询，并支持整列合约代码的批量查询
+"""
+
+from __future__ import annotations
+
+import re
+import warnings
+from datetime import date, datetime
+from functools import lru_cache
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Dict, Iterable, NamedTuple, Optional
+
+from tin_delivery_cost_calculator import MarginSchedule
+from tin_trading_calendar import HolidayCoverageWarning, TradingCalendar, get_calendar
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# 导入参数配置
+try:
+    from tin_params_config import CONTRACT_FIRST_YEAR, CONTRACT_LAST_YEAR
+except ImportError:
+    # 如果配置文件不存在，使用默认值
+    CONTRACT_FIRST_YEAR = 2020
+    CONTRACT_LAST_YEAR = 2035
+
+_CONTRACT_CODE_PATTERN = re.compile(r'sn(\d{2})(\d{2})')
+
+# 批量查询返回的日期列（顺序即 DataFrame 列顺序）
+DATE_FIELDS = (
+    "listing_date",
+    "month_before_delivery_date",
+    "delivery_month_start_date",
+    "two_days_before_last_date",
+    "last_trading_date",
+    "delivery_date",
+)
+
+# 默认的四档保证金比例（合约挂牌、交割月前一月、交割月、最后交易日前二日）
+DEFAULT_MARGIN_RATES = (0.05, 0.10, 0.15, 0.20)
+
+
+class ContractInfo(NamedTuple):
+    """单个合约的日期信息（不可变）"""
+    code: str
+    year: int
+    month: int
+    listing_date: date                  # 合约挂牌日期
+    month_before_delivery_date: date    # 交割月前第一月的第一个交易日
+    delivery_month_start_date: date     # 交割月份第一个交易日
+    two_days_before_last_date: date     # 最后交易日前二个交易日
+    last_trading_date: date             # 最后交易日（合约月15日，非交易日顺延）
+    delivery_date: date                 # 交割日期（与最后交易日相同）
+
+    def margin_schedule(
+        self,
+        rate_5_percent: float = 0.05,
+        rate_10_percent: float = 0.10,
+        rate_15_percent: float = 0.15,
+        rate_20_percent: float = 0.20
+    ) -> MarginSchedule:
+        """该合约的动态保证金阶梯（按合约和比例缓存）"""
+        return _margin_schedule(
+            self, (rate_5_percent, rate_10_percent, rate_15_percent, rate_20_percent)
+        )
+
+
+@lru_cache(maxsize=1024)
+def _margin_schedule(info: ContractInfo, rates: tuple) -> MarginSchedule:
+    return MarginSchedule(
+        info.delivery_date,
+        info.month_before_delivery_date,
+        info.delivery_month_start_date,
+        info.two_days_before_last_date,
+        *rates,
+        listing_date=info.listing_date
+    )
+
+
+def normalize_contract_code(contract_code: str) -> Optional[str]:
+    """
+    规范化合约代码：去空格、转小写，取形如 snYYMM 的部分
+
+    返回:
+        规范化后的合约代码；格式不正确时返回 None
+    """
+    if not contract_code:
+        return None
+    match = _CONTRACT_CODE_PATTERN.match(contract_code.strip().lower())
+    if not match:
+        return None
+    year_str, month_str = match.groups()
+    if not (1 <= int(month_str) <= 12):
+        return None
+    return f"sn{year_str}{month_str}"
+
+
+def build_contract_info(year: int, month: int, calendar: TradingCalendar) -> ContractInfo:
+    """
+    按交易日历计算单个合约的日期信息
+
+    参数:
+        year: 交割年份（四位）
+        month: 交割月份
+        calendar: 交易日历
+
+    返回:
+        ContractInfo
+    """
+    # 最后交易日/交割日期：合约月15日，法定假日顺延至下一个交易日
+    delivery_date = calendar.roll_forward(date(year, month, 15))
+
+    # 合约挂牌日期：通常为交割月前一年左右，简化处理为交割月前11个月的22日（非交易日顺延）
+    # 例如：sn2612 (2026年12月) -> 2026年1月22日左右
+    listing_year = year
+    listing_month = month - 11
+    if listing_month <= 0:
+        listing_month += 12
+        listing_year -= 1
+    listing_date = calendar.roll_forward(date(listing_year, listing_month, 22))
+
+    # 交割月前第一月的第一个交易日
+    month_before_year = year
+    month_before_month = month - 1
+    if month_before_month <= 0:
+        month_before_month = 12
+        month_before_year -= 1
+    month_before_delivery_date = calendar.first_trading_day_of_month(
+        month_before_year, month_before_month
+    )
+
+    return ContractInfo(
+        code=f"sn{year % 100:02d}{month:02d}",
+        year=year,
+        month=month,
+        listing_date=listing_date,
+        month_before_delivery_date=month_before_delivery_date,
+        delivery_month_start_date=calendar.first_trading_day_of_month(year, month),
+        two_days_before_last_date=calendar.offset(delivery_date, -2),
+        last_trading_date=delivery_date,
+        delivery_date=delivery_date
+    )
+
+
+class ContractRegistry:
+    """
+    合约信息表
+
+    构建时按交易日历为 [first_year, last_year] 内每个月的合约生成 ContractInfo，
+    之后只读：
+        - get / [] ：按合约代码 O(1) 查询
+        - lookup   ：整列合约代码的批量查询，返回列式结果
+
+    挂牌到交割期间跨越交易日历未覆盖年份的合约（estimated_codes）按不完整的节假日推算日期，
+    查询到这些合约时发出 HolidayCoverageWarning（同一进程内每个合约只提示一次，
+    一次查询涉及多个合约时合并为一条），构建时不逐年告警
+    """
+
+    def __init__(
+        self,
+        first_year: int = CONTRACT_FIRST_YEAR,
+        last_year: int = CONTRACT_LAST_YEAR,
+        calendar: Optional[TradingCalendar] = None
+    ):
+        """
+        参数:
+            first_year: 第一个合约的交割年份
+            last_year: 最后一个合约的交割年份（含）
+            calendar: 交易日历，默认使用 get_calendar()
+        """
+        if calendar is None:
+            calendar = get_calendar()
+        contracts = {}
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", HolidayCoverageWarning)
+            for year in range(first_year, last_year + 1):
+                for month in range(1, 13):
+                    info = build_contract_info(year, month, calendar)
+                    contracts[info.code] = info
+        self.estimated_codes = frozenset(
+            code for code, info in contracts.items()
+            if any(
+                year not in calendar.covered_years
+                for year in range(info.listing_date.year, info.delivery_date.year + 1)
+            )
+        )
+        self.first_year = first_year
+        self.last_year = last_year
+        self._contracts = MappingProxyType(contracts)
+        self._positions: Dict[str, int] = {code: i for i, code in enumerate(contracts)}
+        self._infos = tuple(contracts.values())
+        self._date_columns_cache = None
+
+    @property
+    def _date_columns(self) -> dict:
+        """
+        批量查询用的日期列（首次批量查询时构建），末尾追加一行 NaT 对应未知合约；
+        直接存为 pandas 支持的 datetime64[s]，构建 DataFrame 时无需再转换单位
+        """
+        if self._date_columns_cache is None:
+            import numpy as np
+
+            self._date_columns_cache = {
+                field: np.array(
+                    [getattr(info, field) for info in self._infos] + [None],
+                    dtype="datetime64[D]"
+                ).astype("datetime64[s]")
+                for field in DATE_FIELDS
+            }
+        return self._date_columns_cache
+
+    @property
+    def contracts(self) -> MappingProxyType:
+        """合约代码 -> ContractInfo 的只读映射"""
+        return self._contracts
+
+    def codes(self) -> Iterable[str]:
+        """全部合约代码（按交割月份排序）"""
+        return self._contracts.keys()
+
+    def get(self, contract_code: str) -> Optional[ContractInfo]:
+        """
+        按合约代码查询（大小写、首尾空格不敏感）
+
+        返回:
+            ContractInfo；代码格式不正确或超出范围时返回 None
+        """
+        info = self._find(contract_code)
+        if info is not None and info.code in self.estimated_codes:
+            warn_estimated((info.code,))
+        return info
+
+    def get_many(self, contract_codes: Iterable[str]) -> list:
+        """
+        按合约代码逐个查询（同 get），涉及未公布休市安排年份的合约合并为一条警告
+
+        返回:
+            与输入顺序对应的 ContractInfo 列表，未知合约为 None
+        """
+        infos = [self._find(code) for code in contract_codes]
+        warn_estimated(
+            info.code for info in infos if info is not None and info.code in self.estimated_codes
+        )
+        return infos
+
+    def _find(self, contract_code: str) -> Optional[ContractInfo]:
+        """同 get，但不发出 HolidayCoverageWarning（供批量查询汇总后统一告警）"""
+        info = self._contracts.get(contract_code)
+        if info is None:
+            code = normalize_contract_code(contract_code)
+            info = self._contracts.get(code) if code else None
+        return info
+
+    def __getitem__(self, contract_code: str) -> ContractInfo:
+        info = self._find(contract_code)
+        if info is None:
+            raise KeyError(contract_code)
+        if info.code in self.estimated_codes:
+            warn_estimated((info.code,))
+        return info
+
+    def __contains__(self, contract_code: str) -> bool:
+        return self._find(contract_code) is not None
+
+    def __len__(self) -> int:
+        return len(self._contracts)
+
+    def listed_contracts(self, trade_date) -> list:
+        """
+        某个交易日正在交易的合约（已挂牌、未过最后交易日），按交割月份排序
+
+        参数:
+            trade_date: 交易日期（date/datetime/datetime64）
+
+        返回:
+            ContractInfo 列表
+        """
+        if isinstance(trade_date, datetime):
+            day = trade_date.date()
+        elif isinstance(trade_date, date):
+            day = trade_date
+        else:
+            import numpy as np
+
+            day = np.datetime64(trade_date, "D").astype(date)
+        listed = [info for info in self._infos if info.listing_date <= day <= info.last_trading_date]
+        warn_estimated(info.code for info in listed if info.code in self.estimated_codes)
+        return listed
+
+    def lookup(self, contract_codes) -> pd.DataFrame:
+        """
+        批量查询一整列合约代码
+
+        先对代码去重（哈希分解），每个不同的代码只查一次字典，再按位置取出
+        预先计算好的日期列，适合数百万行、只有几十个不同合约的场景表。
+
+        参数:
+            contract_codes: 合约代码序列/数组/Series
+
+        返回:
+            DataFrame，列为 DATE_FIELDS（datetime64），未知合约为 NaT；
+            输入为 Series 时沿用其索引
+        """
+        import numpy as np
+        import pandas as pd
+
+        if isinstance(contract_codes, pd.Series):
+            index = contract_codes.index
+        else:
+            index = None
+            contract_codes = np.asarray(contract_codes, dtype=object)
+        factor, uniques = pd.factorize(contract_codes)
+        missing = len(self._contracts)
+        unique_positions = np.array(
+            [self._position(code) for code in uniques] + [missing], dtype=np.int64
+        )
+        warn_estimated(
+            self._infos[position].code for position in unique_positions[:-1]
+            if position < missing and self._infos[position].code in self.estimated_codes
+        )
+        # factorize 对缺失值返回 -1，正好取到末尾的"未知合约"位置
+        positions = unique_positions[factor]
+        return pd.DataFrame(
+            {field: column[positions] for field, column in self._date_columns.items()},
+            index=index
+        )
+
+    def _position(self, contract_code) -> int:
+        """合约代码 -> 日期列中的行号，未知合约返回末尾的 NaT 行"""
+        if isinstance(contract_code, str):
+            info = self._find(contract_code)
+            if info is not None:
+                return self._positions[info.code]
+        return len(self._contracts)
+
+
+# 已发出过 HolidayCoverageWarning 的合约，同一进程内每个合约只提示一次
+_warned_codes = set()
+
+
+def warn_estimated(contract_codes: Iterable[str], stacklevel: int = 3):
+    """
+    对日期涉及未公布休市安排年份的合约发出一条汇总的 HolidayCoverageWarning
+
+    已提示过的合约不再提示；一次调用涉及多个合约时合并为一条警告。
+
+    参数:
+        contract_codes: 合约代码（应已属于 ContractRegistry.estimated_codes）
+        stacklevel: 传给 warnings.warn，默认指向调用查询方法的代码
+    """
+    codes = sorted(set(contract_codes) - _warned_codes)
+    if not codes:
+        return
+    _warned_codes.update(codes)
+    shown = "、".join(codes[:5]) + (f" 等 {len(codes)} 个合约" if len(codes) > 5 else " ")
+    warnings.warn(
+        f"合约 {shown}的日期涉及尚未公布休市安排的年份，节假日不完整，日期可能不准确",
+        HolidayCoverageWarning,
+        stacklevel=stacklevel
+    )
+
+
+@lru_cache(maxsize=None)
+def get_registry(
+    first_year: int = CONTRACT_FIRST_YEAR,
+    last_year: int = CONTRACT_LAST_YEAR
+) -> ContractRegistry:
+    """
+    获取（并缓存）合约信息表，同一进程内只构建一次
+
+    参数:
+        first_year: 第一个合约的交割年份
+        last_year: 最后一个合约的交割年份（含）
+
+    返回:
+        ContractRegistry
+    """
+    return ContractRegistry(first_year, last_year)
@@ -0,0 +1,253 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+成本组件依赖图（增量重算）
+把 check_arbitrage 的成本模型拆成增值税、交割杂费、仓储费、保证金、现货利息、
+期货利息和汇总几个组件；每个组件缓存上一次的输入，输入变化时只重算受影响的
+下游组件，适合行情逐笔更新、滑块拖动等频繁重算的场景
+"""
+
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from tin_delivery_cost_calculator import (
+    DEFAULT_PARAMS,
+    MISC_FEE_ITEMS,
+    CostAmounts,
+    CostBreakdown,
+    MarginSchedule,
+    TinDeliveryParams,
+    calculate_delivery_fees,
+    calculate_storage_cost
+)
+
+# 图的输入及默认值
+GRAPH_INPUTS: Dict[str, Any] = {
+    "params": DEFAULT_PARAMS,
+    "spot_price": None,
+    "futures_price": None,
+    "delivery_price": None,          # 为None时使用期货价格
+    "quantity_ton": None,
+    "start_date": None,
+    "end_date": None,
+    "interest_rate": None,           # 为None时使用 params.default_interest_rate
+    "margin_rate": None,             # 直接指定保证金比例；为None时按保证金阶梯计算
+    "margin_schedule": None,         # MarginSchedule；为None且未指定比例时使用 params.futures_margin_rate
+    "enterprise_margin_addon": 0.0,
+    "fees": {},                      # 交割杂费参数，同 calculate_delivery_fees 的关键字参数
+}
+
+_MISSING = object()
+
+
+def _holding_days(start_date: datetime, end_date: datetime) -> int:
+    return (end_date - start_date).days
+
+
+def _effective_delivery_price(delivery_price, futures_price):
+    # 与 check_arbitrage 一致：未提供交割价格时使用期货价格
+    return futures_price if delivery_price is None else delivery_price
+
+
+def _vat(params: TinDeliveryParams, spot_price, delivery_price, quantity_ton):
+    """增值税组件：(现货基价, 增值税, 含税现货成本)"""
+    spot_cost_base = spot_price * quantity_ton
+    vat_amount = max(0, (delivery_price - spot_price) * quantity_ton * params.vat_rate)
+    return spot_cost_base, vat_amount, spot_cost_base + vat_amount
+
+
+def _misc_fees(params: TinDeliveryParams, quantity_ton, fees: dict):
+    """交割杂费组件"""
+    return calculate_delivery_fees(params, quantity_ton, **fees)
+
+
+def _storage(params: TinDeliveryParams, quantity_ton, holding_days):
+    """仓储费组件"""
+    return calculate_storage_cost(params, quantity_ton, holding_days)["storage_cost"]
+
+
+def _margin(
+    params: TinDeliveryParams,
+    margin_rate: Optional[float],
+    margin_schedule: Optional[MarginSchedule],
+    enterprise_margin_addon: float,
+    start_date: datetime
+) -> float:
+    """保证金组件：实际使用的期货保证金比例"""
+    if margin_rate is None and margin_schedule is not None:
+        margin_rate = margin_schedule.average_rate(start_date) + enterprise_margin_addon
+    if margin_rate is None:
+        return params.futures_margin_rate
+    return max(0, margin_rate)
+
+
+def _interest_inputs(params: TinDeliveryParams, interest_rate, holding_days):
+    """利率与计息天数：(年化利率, 日利率, 计息天数)"""
+    if interest_rate is None:
+        interest_rate = params.default_interest_rate
+    return interest_rate, interest_rate / 365, max(0, holding_days)
+
+
+def _spot_interest(vat, interest):
+    """现货资金利息组件（资金占用为含税现货成本）"""
+    _, daily_rate, days = interest
+    return vat[2] * daily_rate * days
+
+
+def _futures_interest(spot_price, quantity_ton, margin_rate, interest):
+    """期货保证金利息组件：(保证金占用, 利息)"""
+    _, daily_rate, days = interest
+    futures_capital_amount = spot_price * quantity_ton * margin_rate
+    return futures_capital_amount, max(0, futures_capital_amount * daily_rate * days)
+
+
+def _summary(
+    spot_price, futures_price, delivery_price, quantity_ton, start_date, end_date,
+    holding_days, margin_rate, interest, vat, misc_fees, storage_cost,
+    spot_interest_cost, futures_interest
+) -> CostBreakdown:
+    """汇总组件：与 check_arbitrage 的返回值相同"""
+    spot_cost_base, vat_amount, spot_cost = vat
+    futures_capital_amount, futures_interest_cost = futures_interest
+    total_interest_cost = spot_interest_cost + futures_interest_cost
+
+    total_cost = spot_cost + misc_fees["total_misc_fees"] + storage_cost + total_interest_cost
+    break_even_price = spot_price + (total_cost - spot_cost) / quantity_ton
+
+    futures_revenue = futures_price * quantity_ton
+    total_cost_excl_vat = total_cost - vat_amount
+    profit = futures_revenue - total_cost_excl_vat
+    return CostBreakdown(
+        spot_price=spot_price,
+        futures_price=futures_price,
+        delivery_price=delivery_price,
+        quantity_ton=quantity_ton,
+        start_date=start_date,
+        end_date=end_date,
+        holding_days=holding_days,
+        interest_rate=interest[0],
+        margin_rate=margin_rate,
+        total=CostAmounts(
+            spot_cost_base,
+            vat_amount,
+            spot_cost,
+            *(misc_fees[name] for name in MISC_FEE_ITEMS),
+            storage_cost,
+            spot_cost,
+            futures_capital_amount,
+            spot_interest_cost,
+            futures_interest_cost,
+            total_interest_cost,
+            total_cost
+        ),
+        break_even_price=break_even_price,
+        futures_revenue=futures_revenue,
+        total_cost_excl_vat=total_cost_excl_vat,
+        profit=profit,
+        profit_rate=(profit / (spot_price * quantity_ton)) * 100 if spot_price > 0 else 0
+    )
+
+
+# 组件定义：(组件名, 依赖的输入/组件, 计算函数)，按拓扑顺序排列
+COST_NODES: Tuple[Tuple[str, Tuple[str, ...], Callable], ...] = (
+    ("holding_days", ("start_date", "end_date"), _holding_days),
+    ("effective_delivery_price", ("delivery_price", "futures_price"), _effective_delivery_price),
+    ("vat", ("params", "spot_price", "effective_delivery_price", "quantity_ton"), _vat),
+    ("misc_fees", ("params", "quantity_ton", "fees"), _misc_fees),
+    ("storage", ("params", "quantity_ton", "holding_days"), _storage),
+    ("margin", ("params", "margin_rate", "margin_schedule", "enterprise_margin_addon", "start_date"), _margin),
+    ("interest", ("params", "interest_rate", "holding_days"), _interest_inputs),
+    ("spot_interest", ("vat", "interest"), _spot_interest),
+    ("futures_interest", ("spot_price", "quantity_ton", "margin", "interest"), _futures_interest),
+    ("summary", (
+        "spot_price", "futures_price", "effective_delivery_price", "quantity_ton",
+        "start_date", "end_date", "holding_days", "margin", "interest", "vat",
+        "misc_fees", "storage", "spot_interest", "futures_interest"
+    ), _summary),
+)
+
+
+class CostGraph:
+    """
+    成本组件依赖图
+
+    update() 修改部分输入后，只有依赖这些输入的下游组件会被检查；组件的输入
+    与上一次相同（例如期货价格变化但已指定交割价格时的增值税）则直接沿用上次
+    的结果。recomputed 记录最近一次 update 实际重算的组件，recompute_counts
+    累计每个组件的重算次数。
+
+    用法:
+        graph = CostGraph(spot_price=..., futures_price=..., quantity_ton=...,
+                          start_date=..., end_date=...)
+        result = graph.result()                      # 与 check_arbitrage 相同结构
+        result = graph.update(futures_price=410000)  # 只重算依赖期货价格的组件
+    """
+
+    def __init__(self, **inputs):
+        """
+        参数:
+            **inputs: 图的输入，见 GRAPH_INPUTS
+        """
+        self._values: Dict[str, Any] = dict(GRAPH_INPUTS)
+        self._last_args: Dict[str, tuple] = {}
+        self._dependents: Dict[str, set] = {name: set() for name in GRAPH_INPUTS}
+        for name, deps, _ in COST_NODES:
+            self._dependents[name] = set()
+            for dep in deps:
+                self._dependents[dep].add(name)
+        self._dirty = {name for name, _, _ in COST_NODES}
+        self.recomputed: Tuple[str, ...] = ()
+        self.recompute_counts: Dict[str, int] = {name: 0 for name, _, _ in COST_NODES}
+        self.update(**inputs)
+
+    def _mark_dirty(self, name: str):
+        for dependent in self._dependents[name]:
+            if dependent not in self._dirty:
+                self._dirty.add(dependent)
+                self._mark_dirty(dependent)
+
+    def update(self, **inputs) -> Optional[CostBreakdown]:
+        """
+        修改输入并增量重算
+
+        参数:
+            **inputs: 要修改的输入
+
+        返回:
+            最新的汇总结果；必需输入尚未齐全时返回 None
+        """
+        for name, value in inputs.items():
+            if name not in GRAPH_INPUTS:
+                raise TypeError(f"未知的输入: {name}")
+            if name == "fees":
+                value = dict(value)
+            if self._values[name] is not value:
+                self._values[name] = value
+                self._mark_dirty(name)
+
+        required = ("spot_price", "futures_price", "quantity_ton", "start_date", "end_date")
+        if any(self._values[name] is None for name in required):
+            self.recomputed = ()
+            return None
+
+        recomputed = []
+        for name, deps, func in COST_NODES:
+            if name not in self._dirty:
+                continue
+            args = tuple(self._values[dep] for dep in deps)
+            if self._last_args.get(name, _MISSING) != args or name not in self._values:
+                self._values[name] = func(*args)
+                self._last_args[name] = args
+                self.recompute_counts[name] += 1
+                recomputed.append(name)
+            self._dirty.discard(name)
+        self.recomputed = tuple(recomputed)
+        return self._values["summary"]
+
+    def result(self) -> Optional[CostBreakdown]:
+        """最新的汇总结果（与 check_arbitrage 的返回值相同）"""
+        return self._values.get("summary")
+
+    def component(self, name: str) -> Any:
+        """某个组件的当前值"""
+        return self._values[name]
@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+全曲线扫描
+给定交易日的现货价格和各合约的期货价格，一次批量计算当天所有在交易的 sn 合约
+（持有期、动态保证金、交割成本各不相同）的套利结果，按年化收益率排序，
+便于每天比较应该用哪个合约做期现套利
+"""
+
+from datetime import date, datetime
+from typing import Dict, Iterable, Mapping, Optional
+
+import numpy as np
+import pandas as pd
+
+from tin_contract_registry import DEFAULT_MARGIN_RATES, ContractRegistry, get_registry
+from tin_delivery_cost_calculator import (
+    DEFAULT_PARAMS,
+    TinDeliveryCostCalculator,
+    TinDeliveryParams
+)
+
+# 扫描结果的列
+SCAN_COLUMNS = (
+    "contract_code",
+    "delivery_date",
+    "holding_days",
+    "futures_price",
+    "premium",
+    "margin_rate",
+    "cost_per_ton",
+    "break_even_futures_price",
+    "profit",
+    "profit_per_ton",
+    "profit_rate",
+    "annualized_return",
+    "can_arbitrage",
+)
+
+
+def _as_date(value) -> date:
+    """date/datetime/datetime64/字符串 -> date"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return pd.Timestamp(value).date()
+
+
+def scan_curve(
+    spot_price: float,
+    futures_prices: Mapping[str, float],
+    trade_date,
+    params: TinDeliveryParams = DEFAULT_PARAMS,
+    quantity_ton: float = 1.0,
+    interest_rate: Optional[float] = None,
+    enterprise_margin_addon: float = 0.0,
+    margin_rates: Iterable[float] = DEFAULT_MARGIN_RATES,
+    fee_kwargs: Optional[Dict[str, float]] = None,
+    registry: Optional[ContractRegistry] = None,
+    calculator: Optional[TinDeliveryCostCalculator] = None
+) -> pd.DataFrame:
+    """
+    扫描交易日所有在交易合约的期现套利结果，按年化收益率从高到低排序
+
+    每个合约视为当天买入现货、持有到该合约交割日（交割价格等于期货价格），
+    动态保证金按合约自己的保证金阶梯计算。没有报价（或报价为空）的合约、
+    交易日当天已到交割日的合约不参与排序；不认识的合约代码被忽略。
+
+    参数:
+        spot_price: 现货价格（元/吨）
+        futures_prices: 合约代码 -> 期货价格（字典或 Series）
+        trade_date: 交易日期
+        params: 交割参数
+        quantity_ton: 数量（吨），默认按1吨计算
+        interest_rate: 资金利率（年化），默认使用params.default_interest_rate
+        enterprise_margin_addon: 企业保证金加收比例
+        margin_rates: 四档保证金比例
+        fee_kwargs: 交割杂费参数，见 calculate_delivery_fees
+        registry: 合约信息表，默认使用 get_registry()
+        calculator: 计算器，默认新建一个
+
+    返回:
+        DataFrame，列为 SCAN_COLUMNS，每行一个合约：
+        premium 为期货升水（期货价格 - 现货价格），profit_rate 为利润 / 现货基价 × 100，
+        annualized_return 为利润 / 占用资金（含税现货 + 期货保证金）按持有天数
+        年化后的百分比
+    """
+    if registry is None:
+        registry = get_registry()
+    if calculator is None:
+        calculator = TinDeliveryCostCalculator(params)
+    margin_rates = tuple(margin_rates)
+    trade_day = _as_date(trade_date)
+
+    # 报价按规范化后的合约代码对齐
+    quotes = {}
+    futures_prices = dict(futures_prices)
+    for info, price in zip(registry.get_many(futures_prices), futures_prices.values()):
+        if info is not None and price is not None and not np.isnan(price):
+            quotes[info.code] = float(price)
+    contracts = [
+        info for info in registry.listed_contracts(trade_day)
+        if info.code in quotes and info.delivery_date > trade_day
+    ]
+    if not contracts:
+        return pd.DataFrame({name: [] for name in SCAN_COLUMNS})
+
+    # 各合约的保证金阶梯按合约缓存，这里每个合约只做一次二分查询
+    margin_rate = np.array([
+        info.margin_schedule(*margin_rates).average_rate(trade_day) for info in contracts
+    ]) + enterprise_margin_addon
+    futures_price = np.array([quotes[info.code] for info in contracts])
+    delivery_date = np.array([info.delivery_date for info in contracts], dtype="datetime64[D]")
+
+    result = calculator.check_arbitrage_batch(
+        spot_price=spot_price,
+        futures_price=futures_price,
+        quantity_ton=quantity_ton,
+        start_date=np.datetime64(trade_day, "D"),
+        end_date=delivery_date,
+        interest_rate=interest_rate,
+        margin_rate=margin_rate,
+        params=params,
+        **(fee_kwargs or {})
+    )
+    capital = result["spot_capital_amount"] + result["futures_capital_amount"]
+    annualized_return = np.full(len(contracts), np.nan)
+    np.divide(
+        result["profit"] * 365 * 100,
+        capital * result["holding_days"],
+        out=annualized_return,
+        where=capital > 0
+    )
+
+    scan = pd.DataFrame({
+        "contract_code": [info.code for info in contracts],
+        "delivery_date": delivery_date,
+        "holding_days": result["holding_days"],
+        "futures_price": futures_price,
+        "premium": futures_price - spot_price,
+        "margin_rate": result["margin_rate"],
+        "cost_per_ton": result["cost_per_ton"],
+        "break_even_futures_price": result["break_even_futures_price"],
+        "profit": result["profit"],
+        "profit_per_ton": result["profit_per_ton"],
+        "profit_rate": result["profit_rate"],
+        "annualized_return": annualized_return,
+        "can_arbitrage": result["can_arbitrage"],
+    })
+    return scan.sort_values(
+        "annualized_return", ascending=False, na_position="last", kind="stable"
+    ).reset_index(drop=True)
@@ -3,11 +3,24 @@
 """
 锡（Sn）期现交割成本测算模型
 基于多晶硅套利表的逻辑，适配锡的交割规则
+
+模块本身只依赖标准库：NumPy 在批量/向量化计算时才导入，pandas 只在传入或返回
+DataFrame 时使用，逐笔计算（网页、报价监控、命令行启动）不加载这两个库。
 """
 
-import pandas as pd
+from __future__ import annotations
+
+import sys
+from bisect import bisect_right
+from collections.abc import Mapping
 from datetime import datetime, timedelta
-from typing import Dict, Optional, Tuple
+from typing import TYPE_CHECKING, Dict, NamedTuple, Optional, Tuple, Union
+
+from tin_trading_calendar import get_calendar, match_date_type
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
 
 # 导入参数配置
 try:
@@ -39,24 +52,1424 @@ except ImportError:
     FUTURES_MARGIN_RATE = 0.10
 
 
+# 分阶段计时器（见 tin_profiling.profile_stages）。未开启时为 None，
+# 各计算路径只多一次判断；开启后按阶段累计耗时和调用次数
+_stage_timer = None
+
+
+def _set_stage_timer(timer):
+    """设置分阶段计时器，返回原来的计时器"""
+    global _stage_timer
+    previous, _stage_timer = _stage_timer, timer
+    return previous
+
+
+# 交割参数字段（顺序即构造参数顺序）
+PARAM_FIELDS = (
+    "storage_fee_per_ton_per_day",
+    "delivery_unit_ton",
+    "trading_unit_ton",
+    "inbound_fee_per_ton",
+    "outbound_fee_per_ton",
+    "packing_fee_per_ton",
+    "transfer_fee_per_ton",
+    "delivery_fee_per_ton",
+    "vat_rate",
+    "default_interest_rate",
+    "futures_margin_rate",
+)
+
+
+class TinDeliveryParams:
+    """
+    锡的交割参数（不可变、可哈希）
+
+    默认值来自 tin_params_config。计算函数只读取参数、不修改参数，需要调整
+    个别费用时用 replace() 生成新的参数集，原对象保持不变，因此同一个参数集
+    可以在多个会话和线程之间共享，也可以与输入一起作为缓存的键。
+    """
+
+    __slots__ = PARAM_FIELDS
+
+    def __init__(
+        self,
+        storage_fee_per_ton_per_day: float = STORAGE_FEE_PER_TON_PER_DAY,
+        delivery_unit_ton: float = DELIVERY_UNIT_TON,
+        trading_unit_ton: float = TRADING_UNIT_TON,
+        inbound_fee_per_ton: float = INBOUND_FEE_PER_TON,
+        outbound_fee_per_ton: float = OUTBOUND_FEE_PER_TON,
+        packing_fee_per_ton: float = PACKING_FEE_PER_TON,
+        transfer_fee_per_ton: float = TRANSFER_FEE_PER_TON,
+        delivery_fee_per_ton: float = DELIVERY_FEE_PER_TON,
+        vat_rate: float = VAT_RATE,
+        default_interest_rate: float = DEFAULT_INTEREST_RATE,
+        futures_margin_rate: float = FUTURES_MARGIN_RATE
+    ):
+        values = (
+            storage_fee_per_ton_per_day,
+            delivery_unit_ton,
+            trading_unit_ton,
+            inbound_fee_per_ton,
+            outbound_fee_per_ton,
+            packing_fee_per_ton,
+            transfer_fee_per_ton,
+            delivery_fee_per_ton,
+            vat_rate,
+            default_interest_rate,
+            futures_margin_rate
+        )
+        for name, value in zip(PARAM_FIELDS, values):
+            object.__setattr__(self, name, float(value))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("TinDeliveryParams 不可修改，请使用 replace() 生成新的参数集")
+
+    def __delattr__(self, name):
+        raise AttributeError("TinDeliveryParams 不可修改，请使用 replace() 生成新的参数集")
+
+    def astuple(self) -> Tuple[float, ...]:
+        """按 PARAM_FIELDS 顺序返回全部参数值"""
+        return tuple(getattr(self, name) for name in PARAM_FIELDS)
+
+    def to_dict(self) -> Dict[str, float]:
+        """参数名 -> 参数值"""
+        return dict(zip(PARAM_FIELDS, self.astuple()))
+
+    def replace(self, **changes) -> "TinDeliveryParams":
+        """
+        生成修改了部分参数的新参数集（原对象不变）
+
+        参数:
+            **changes: 要修改的参数，如 vat_rate=0.09
+
+        返回:
+            新的 TinDeliveryParams；没有实际修改时返回自身
+        """
+        unknown = set(changes) - set(PARAM_FIELDS)
+        if unknown:
+            raise TypeError(f"未知的交割参数: {', '.join(sorted(unknown))}")
+        values = self.to_dict()
+        values.update(changes)
+        replaced = TinDeliveryParams(**values)
+        return self if replaced == self else replaced
+
+    def __eq__(self, other):
+        if not isinstance(other, TinDeliveryParams):
+            return NotImplemented
+        return self.astuple() == other.astuple()
+
+    def __hash__(self):
+        return hash(self.astuple())
+
+    def __reduce__(self):
+        return (TinDeliveryParams, self.astuple())
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={value!r}" for name, value in self.to_dict().items())
+        return f"TinDeliveryParams({fields})"
+
+
+# 按 tin_params_config 构建的默认参数集
+DEFAULT_PARAMS = TinDeliveryParams()
+
+
+# 批量计算中的交割杂费参数：(参数名, TinDeliveryParams中默认值的字段名, 结果列名)
+_BATCH_FEE_FIELDS = (
+    ("inbound_fee_per_ton", "inbound_fee_per_ton", "inbound_fee"),
+    ("outbound_fee_per_ton", "outbound_fee_per_ton", "outbound_fee"),
+    ("packing_fee_per_ton", "packing_fee_per_ton", "packing_fee"),
+    ("transfer_fee_per_ton", "transfer_fee_per_ton", "transfer_fee"),
+    ("delivery_fee_per_ton", "delivery_fee_per_ton", "delivery_fee"),
+    ("train_application_fee_per_ton", None, "train_application_fee"),
+    ("transport_fee_per_ton", None, "transport_fee"),
+)
+
+
+def _is_pandas(value, *type_names: str) -> bool:
+    """value 是否为 pandas 的某类对象；pandas 尚未导入时不可能是，也不为此导入 pandas"""
+    pd = sys.modules.get("pandas")
+    return pd is not None and isinstance(value, tuple(getattr(pd, name) for name in type_names))
+
+
+def _batch_column(scenarios, name: str, value):
+    """取批量输入列：显式传入的参数优先，其次取DataFrame中的同名列"""
+    if value is None and scenarios is not None and name in scenarios:
+        value = scenarios[name]
+    if value is None:
+        return None
+    if _is_pandas(value, "Series", "Index"):
+        value = value.to_numpy()
+    return value
+
+
+def _holding_days_array(start_date, end_date) -> np.ndarray:
+    """
+    批量计算持有天数，与 (end_date - start_date).days 一致（向下取整）
+
+    异常:
+        ValueError: 开始或结束日期缺失（None/NaT），与标量版本一致，不按某个天数继续计算
+    """
+    import numpy as np
+
+    start = np.asarray(start_date)
+    end = np.asarray(end_date)
+    if start.dtype.kind != "M":
+        start = start.astype("datetime64[s]")
+    if end.dtype.kind != "M":
+        end = end.astype("datetime64[s]")
+    missing = np.isnat(start) | np.isnat(end)
+    if missing.any():
+        rows = np.flatnonzero(missing)
+        raise ValueError(
+            f"批量计算的开始或结束日期缺失（共 {len(rows)} 行，第 {', '.join(map(str, rows[:10]))} 行）"
+        )
+    delta = end - start
+    unit = np.datetime_data(delta.dtype)[0]
+    if unit == "D":
+        return delta.astype(np.int64)
+    if unit in ("h", "m", "s", "ms", "us", "ns"):
+        # 日以下的单位按整数向下取整，比 timedelta64 之间的除法快一倍（已排除 NaT）
+        per_day = np.timedelta64(1, "D").astype(delta.dtype).astype(np.int64)
+        return delta.view(np.int64) // per_day
+    return np.floor_divide(delta, np.timedelta64(1, "D"))
+
+
+def _fill_missing(values, default: float) -> np.ndarray:
+    """None/NaN 视为未提供，使用默认值"""
+    import numpy as np
+
+    if values is None:
+        return np.float64(default)
+    values = np.asarray(values, dtype=np.float64)
+    return np.where(np.isnan(values), default, values)
+
+
+def _broadcast_columns(columns: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """把标量/数组混合的结果统一广播成等长列（常数列为只读视图，不复制）"""
+    import numpy as np
+
+    shape = np.broadcast_shapes(*(np.shape(v) for v in columns.values()))
+    if not shape:
+        shape = (1,)
+    return {name: np.broadcast_to(value, shape) for name, value in columns.items()}
+
+
+# 保证金阶段说明（与 calculate_margin_rate 返回的 periods 一致）
+MARGIN_STAGE_DESCRIPTIONS = (
+    '合约挂牌之日起',
+    '交割月前第一月的第一个交易日起',
+    '交割月份第一个交易日起',
+    '最后交易日前二个交易日起'
+)
+
+# datetime64[D] 的纪元日（1970-01-01）对应的 date.toordinal()
+_EPOCH_ORDINAL = 719163
+
+
+def _epoch_day(value) -> int:
+    """日期/时间 -> 距1970-01-01的天数（只取日期部分）"""
+    return value.toordinal() - _EPOCH_ORDINAL
+
+
+def _start_day(value) -> int:
+    """
+    开始日期/时间 -> 纪元日；带时刻（不是零点）的 datetime 向后取整到次日
+
+    各时间点为零点时，(时间点 - 开始时间).days 向下取整，等于 时间点的纪元日 - 本函数的结果，
+    与 calculate_margin_rate 逐段计算的天数一致
+    """
+    day = _epoch_day(value)
+    if isinstance(value, datetime) and (value.hour or value.minute or value.second or value.microsecond):
+        day += 1
+    return day
+
+
+def _start_days_array(start_dates) -> np.ndarray:
+    """_start_day 的向量化版本（datetime64、date/datetime 序列）"""
+    import numpy as np
+
+    start = np.asarray(start_dates)
+    if start.dtype.kind != "M":
+        start = start.astype("datetime64[us]")
+    days = start.astype("datetime64[D]")
+    return days.astype(np.int64) + (days != start)
+
+
+class MarginSchedule:
+    """
+    单个合约的动态保证金阶梯
+
+    由四个时间点（交割月前第一月第一个交易日、交割月第一个交易日、最后交易日前
+    二个交易日、交割日）和对应的四档比例构建一次，之后对任意开始日期（或一整列
+    开始日期）查询"开始日期到交割日"的加权平均保证金比例。
+
+    构建时把各阶段整理为首尾相接的有效区间，并预先计算每个区间完整的"保证金
+    比例×天数"，单次查询只需一次二分定位所在区间：
+        加权和 = 所在区间比例 × (区间终点 - 开始日期) + 其后各区间的比例×天数
+    其后各区间按阶段顺序逐项累加（最多三项），保证与原逐段累加的结果逐位相同。
+    规则与 calculate_margin_rate 完全一致：手工修改后时间点顺序颠倒时被覆盖的阶段
+    不计入，区间终点不超过交割日，开始日期等于交割日时取20%。
+    各时间点按日期（零点）处理；开始时间带时刻时向后取整到次日（_start_day），
+    各段天数与 calculate_margin_rate 中 timedelta.days 的向下取整一致。
+    """
+
+    def __init__(
+        self,
+        delivery_date: datetime,
+        month_before_delivery_date: datetime,
+        delivery_month_start_date: datetime,
+        two_days_before_last_date: datetime,
+        rate_5_percent: float = 0.05,
+        rate_10_percent: float = 0.10,
+        rate_15_percent: float = 0.15,
+        rate_20_percent: float = 0.20,
+        listing_date: Optional[datetime] = None
+    ):
+        """
+        参数:
+            delivery_date: 交割日期
+            month_before_delivery_date: 交割月前第一月的第一个交易日
+            delivery_month_start_date: 交割月份第一个交易日
+            two_days_before_last_date: 最后交易日前二个交易日
+            rate_5_percent ~ rate_20_percent: 四个阶段的保证金比例
+            listing_date: 合约挂牌日期（仅用于展示）
+        """
+        self.delivery_date = delivery_date
+        self.listing_date = listing_date
+        self.breakpoints = (
+            month_before_delivery_date,
+            delivery_month_start_date,
+            two_days_before_last_date,
+            delivery_date
+        )
+        self.rates = (rate_5_percent, rate_10_percent, rate_15_percent, rate_20_percent)
+
+        # 整理有效区间：第k阶段覆盖 [前面各时间点的最大值, 第k个时间点)，
+        # 若第k个时间点不晚于前面的最大值，则该阶段被覆盖、不出现
+        delivery_day = _epoch_day(delivery_date)
+        ends, rates, lows = [], [], []
+        running_max = None
+        for breakpoint, rate in zip(self.breakpoints, self.rates):
+            day = _epoch_day(breakpoint)
+            if running_max is None or day > running_max:
+                lows.append(running_max)
+                ends.append(day)
+                rates.append(rate)
+                running_max = day
+
+        # 每个区间计息到 min(区间终点, 交割日)；full_terms[k] 为第k个区间完整的
+        # "比例×天数"（第一个区间没有下界，不会被完整计入）
+        self._delivery_day = delivery_day
+        self._ends = tuple(ends)
+        self._rates = tuple(rates)
+        self._capped_ends = tuple(min(end, delivery_day) for end in ends)
+        self._full_terms = (0.0,) + tuple(
+            rates[k] * (self._capped_ends[k] - lows[k]) for k in range(1, len(ends))
+        )
+        self._arrays = None
+
+    def _vector_terms(self) -> tuple:
+        """
+        向量化查询用的数组 (区间终点, 比例, 截断终点, 完整项)，首次使用时构建
+
+        比例等数组末尾补零，对应"开始日期不早于最后一个区间终点"。
+        """
+        if self._arrays is None:
+            import numpy as np
+
+            padding = len(MARGIN_STAGE_DESCRIPTIONS)
+            self._arrays = (
+                np.array(self._ends, dtype=np.int64),
+                np.array(self._rates + (0.0,)),
+                np.array(self._capped_ends + (0,), dtype=np.int64),
+                np.array(self._full_terms + (0.0,) * padding),
+            )
+        return self._arrays
+
+    def weighted_rate_days(self, start_day: int) -> float:
+        """开始日期（纪元日）到交割日的"保证金比例×天数"之和"""
+        k = bisect_right(self._ends, start_day)
+        if k == len(self._ends):
+            return 0.0
+        weighted_sum = self._rates[k] * (self._capped_ends[k] - start_day)
+        for term in self._full_terms[k + 1:]:
+            weighted_sum += term
+        return weighted_sum
+
+    def average_rate(self, start_date: datetime) -> float:
+        """
+        单个开始日期到交割日的加权平均保证金比例（不含企业加收）
+
+        参数:
+            start_date: 开始日期
+
+        返回:
+            平均保证金比例
+        """
+        start_day = _start_day(start_date)
+        total_days = self._delivery_day - start_day
+        if total_days == 0:
+            return 0.20
+        return self.weighted_rate_days(start_day) / total_days
+
+    def average_rates(self, start_dates, enterprise_margin_addon: float = 0.0) -> np.ndarray:
+        """
+        一整列开始日期的加权平均保证金比例（向量化）
+
+        参数:
+            start_dates: 开始日期数组（datetime64、date/datetime 序列或 Series）
+            enterprise_margin_addon: 企业保证金加收比例
+
+        返回:
+            与 start_dates 等长的保证金比例数组（含企业加收）
+        """
+        timer = _stage_timer
+        if timer is not None:
+            timer, lap = timer.begin()
+        import numpy as np
+
+        if _is_pandas(start_dates, "Series", "Index"):
+            start_dates = start_dates.to_numpy()
+        ends, rates, capped_ends, full_terms = self._vector_terms()
+        start_days = _start_days_array(start_dates)
+        k = np.searchsorted(ends, start_days, side="right")
+        weighted = rates[k] * (capped_ends[k] - start_days)
+        for offset in range(1, len(self._ends)):
+            weighted += full_terms[k + offset]
+        total_days = self._delivery_day - start_days
+        with np.errstate(divide="ignore", invalid="ignore"):
+            average = np.where(total_days == 0, 0.20, weighted / total_days)
+        average = average + enterprise_margin_addon
+        if timer is not None:
+            timer.lap("margin", lap)
+        return average
+
+    def daily_rates(self, start_date, enterprise_margin_addon: float = 0.0) -> np.ndarray:
+        """
+        开始日期到交割日之间每一天适用的保证金比例（含企业加收）
+
+        各天比例之和即 weighted_rate_days（加收部分另计），可用于按天计算保证金占用。
+
+        参数:
+            start_date: 开始日期
+            enterprise_margin_addon: 企业保证金加收比例
+
+        返回:
+            长度为持有天数的数组，第 i 个元素为开始日期后第 i 天的保证金比例
+        """
+        import numpy as np
+
+        ends, rates, _, _ = self._vector_terms()
+        start_day = _start_day(start_date)
+        days = np.arange(start_day, max(start_day, self._delivery_day), dtype=np.int64)
+        k = np.searchsorted(ends, days, side="right")
+        return rates[k] + enterprise_margin_addon
+
+    def periods(self, start_date: datetime) -> list:
+        """
+        开始日期到交割日之间的各保证金阶段明细（用于展示）
+
+        返回:
+            [{'start', 'end', 'rate', 'description'}, ...]
+        """
+        periods = []
+        current_date = start_date
+        for breakpoint, rate, description in zip(
+            self.breakpoints, self.rates, MARGIN_STAGE_DESCRIPTIONS
+        ):
+            if current_date < breakpoint:
+                periods.append({
+                    'start': current_date,
+                    'end': min(breakpoint, self.delivery_date),
+                    'rate': rate,
+                    'description': description
+                })
+                current_date = breakpoint
+        return periods
+
+
+def calculate_capital_cost(
+    params: TinDeliveryParams,
+    spot_price: float, 
+    quantity_ton: float,
+    start_date: datetime,
+    end_date: datetime,
+    interest_rate: Optional[float] = None,
+    margin_rate: Optional[float] = None
+) -> Dict[str, float]:
+    """
+    计算资金占用成本（同时计算现货和期货保证金）
+    
+    参数:
+        params: 交割参数（TinDeliveryParams）
+        spot_price: 现货价格（元/吨）
+        quantity_ton: 数量（吨）
+        start_date: 开始日期
+        end_date: 结束日期
+        interest_rate: 资金利率（年化），默认使用params.default_interest_rate
+        margin_rate: 期货保证金比例（如果提供了margin_rate，则使用此值，否则使用默认值）
+    
+    返回:
+        包含资金成本明细的字典
+    """
+    if interest_rate is None:
+        interest_rate = params.default_interest_rate
+    
+    holding_days = (end_date - start_date).days
+    # 确保持有天数不为负数
+    if holding_days < 0:
+        holding_days = 0
+    
+    # 计算现货资金占用（全额现货款，含增值税）
+    spot_capital_amount = spot_price * quantity_ton * (1 + params.vat_rate)
+    
+    # 计算期货保证金占用
+    if margin_rate is not None:
+        used_margin_rate = max(0, margin_rate)  # 确保保证金比例不为负数
+    else:
+        used_margin_rate = params.futures_margin_rate
+    
+    futures_capital_amount = spot_price * quantity_ton * used_margin_rate
+    
+    # 总资金占用
+    total_capital_amount = spot_capital_amount + futures_capital_amount
+    
+    # 计算资金利息（按天计算）
+    daily_rate = interest_rate / 365
+    spot_interest_cost = spot_capital_amount * daily_rate * holding_days
+    futures_interest_cost = futures_capital_amount * daily_rate * holding_days
+    total_interest_cost = spot_interest_cost + futures_interest_cost
+    
+    # 确保所有成本都是正数
+    spot_interest_cost = max(0, spot_interest_cost)
+    futures_interest_cost = max(0, futures_interest_cost)
+    total_interest_cost = spot_interest_cost + futures_interest_cost
+    
+    return {
+        "spot_capital_amount": spot_capital_amount,
+        "futures_capital_amount": futures_capital_amount,
+        "total_capital_amount": total_capital_amount,
+        "spot_interest_cost": spot_interest_cost,
+        "futures_interest_cost": futures_interest_cost,
+        "total_interest_cost": total_interest_cost,
+        "interest_rate": interest_rate,
+        "holding_days": holding_days,
+        "margin_rate": used_margin_rate
+    }
+
+
+def calculate_storage_cost(
+    params: TinDeliveryParams,
+    quantity_ton: float,
+    holding_days: int
+) -> Dict[str, float]:
+    """
+    计算仓储成本
+    
+    参数:
+        params: 交割参数（TinDeliveryParams）
+        quantity_ton: 数量（吨）
+        holding_days: 持有天数
+    
+    返回:
+        包含仓储成本明细的字典
+    """
+    storage_cost = params.storage_fee_per_ton_per_day * quantity_ton * holding_days
+    
+    return {
+        "storage_fee_per_ton_per_day": params.storage_fee_per_ton_per_day,
+        "quantity_ton": quantity_ton,
+        "holding_days": holding_days,
+        "storage_cost": storage_cost
+    }
+
+
+def _delivery_fee_amounts(
+    params: TinDeliveryParams,
+    quantity_ton: float,
+    inbound_fee_per_ton: Optional[float] = None,
+    outbound_fee_per_ton: Optional[float] = None,
+    packing_fee_per_ton: Optional[float] = None,
+    transfer_fee_per_ton: Optional[float] = None,
+    delivery_fee_per_ton: Optional[float] = None,
+    train_application_fee_per_ton: float = 0.0,
+    transport_fee_per_ton: float = 0.0
+) -> Tuple[float, ...]:
+    """各项交割杂费及小计，顺序同 MISC_FEE_ITEMS（不构建字典）"""
+    inbound_cost = (inbound_fee_per_ton or params.inbound_fee_per_ton) * quantity_ton
+    outbound_cost = (outbound_fee_per_ton or params.outbound_fee_per_ton) * quantity_ton
+    packing_cost = (packing_fee_per_ton or params.packing_fee_per_ton) * quantity_ton
+    transfer_cost = (transfer_fee_per_ton or params.transfer_fee_per_ton) * quantity_ton
+    delivery_fee_cost = (delivery_fee_per_ton or params.delivery_fee_per_ton) * quantity_ton
+    train_app_cost = train_application_fee_per_ton * quantity_ton
+    transport_cost = transport_fee_per_ton * quantity_ton
+    
+    total_misc_fees = (
+        inbound_cost + 
+        outbound_cost + 
+        packing_cost + 
+        transfer_cost + 
+        delivery_fee_cost +
+        train_app_cost +
+        transport_cost
+    )
+    return (
+        inbound_cost,
+        outbound_cost,
+        packing_cost,
+        transfer_cost,
+        delivery_fee_cost,
+        train_app_cost,
+        transport_cost,
+        total_misc_fees
+    )
+
+
+def calculate_delivery_fees(
+    params: TinDeliveryParams,
+    quantity_ton: float,
+    inbound_fee_per_ton: Optional[float] = None,
+    outbound_fee_per_ton: Optional[float] = None,
+    packing_fee_per_ton: Optional[float] = None,
+    transfer_fee_per_ton: Optional[float] = None,
+    delivery_fee_per_ton: Optional[float] = None,
+    train_application_fee_per_ton: float = 0.0,
+    transport_fee_per_ton: float = 0.0
+) -> Dict[str, float]:
+    """
+    计算交割杂费（入库费、出库费、打包费、过户费等）
+    
+    参数:
+        params: 交割参数（TinDeliveryParams）
+        quantity_ton: 数量（吨）
+        inbound_fee_per_ton: 入库费（元/吨），如果为None则使用默认值
+        outbound_fee_per_ton: 出库费（元/吨），如果为None则使用默认值
+        packing_fee_per_ton: 打包费（元/吨），如果为None则使用默认值
+        transfer_fee_per_ton: 过户费（元/吨），如果为None则使用默认值
+        delivery_fee_per_ton: 交割手续费（元/吨），如果为None则使用默认值
+        train_application_fee_per_ton: 代办车皮申请费（元/吨）
+        transport_fee_per_ton: 代办提运费（元/吨）
+    
+    返回:
+        包含各项交割杂费的字典
+    """
+    (
+        inbound_cost,
+        outbound_cost,
+        packing_cost,
+        transfer_cost,
+        delivery_fee_cost,
+        train_app_cost,
+        transport_cost,
+        total_misc_fees
+    ) = _delivery_fee_amounts(
+        params,
+        quantity_ton,
+        inbound_fee_per_ton,
+        outbound_fee_per_ton,
+        packing_fee_per_ton,
+        transfer_fee_per_ton,
+        delivery_fee_per_ton,
+        train_application_fee_per_ton,
+        transport_fee_per_ton
+    )
+    
+    return {
+        "inbound_fee": inbound_cost,
+        "outbound_fee": outbound_cost,
+        "packing_fee": packing_cost,
+        "transfer_fee": transfer_cost,
+        "delivery_fee": delivery_fee_cost,
+        "train_application_fee": train_app_cost,
+        "transport_fee": transport_cost,
+        "total_misc_fees": total_misc_fees
+    }
+
+
+class CostAmounts(NamedTuple):
+    """
+    一组成本金额（不可变）
+
+    同一套字段既用于总额（元），也用于每吨视图（元/吨），见 CostBreakdown。
+    """
+    spot_cost_base: float           # 现货基价
+    vat_amount: float               # 增值税
+    spot_cost_with_vat: float       # 现货成本（含税）
+    inbound_fee: float              # 入库费
+    outbound_fee: float             # 出库费
+    packing_fee: float              # 打包费
+    transfer_fee: float             # 过户费
+    delivery_fee: float             # 交割手续费
+    train_application_fee: float    # 代办车皮申请费
+    transport_fee: float            # 代办提运费
+    total_misc_fees: float          # 交割杂费小计
+    storage_cost: float             # 仓储费
+    spot_capital_amount: float      # 现货资金占用（含税现货成本）
+    futures_capital_amount: float   # 期货保证金占用
+    spot_capital_cost: float        # 现货资金利息
+    futures_capital_cost: float     # 期货保证金利息
+    capital_cost: float             # 资金利息合计
+    total_cost: float               # 总成本
+
+    def to_dict(self) -> Dict[str, float]:
+        """金额项 -> 金额"""
+        return dict(zip(self._fields, self))
+
+    def scaled(self, factor: float) -> "CostAmounts":
+        """每项金额除以 factor（如数量）后的新金额组"""
+        return CostAmounts._make(value / factor for value in self)
+
+
+# 成本明细中的金额项（顺序即明细表顺序）
+COST_ITEMS = CostAmounts._fields
+
+# 交割杂费明细的金额项（calculate_delivery_fees 返回字典的键）
+MISC_FEE_ITEMS = COST_ITEMS[3:11]
+
+
+class _ResultView(Mapping):
+    """
+    结果分段的只读字典视图
+
+    只持有数据来源的引用，按键读取时才取值，不复制数据；支持下标访问、
+    属性访问、遍历以及与普通字典比较，to_dict() 转为普通字典。
+    """
+
+    __slots__ = ("_source",)
+    _KEYS: Tuple[str, ...] = ()
+
+    def __init__(self, source):
+        self._source = source
+
+    def _value(self, key: str):
+        return getattr(self._source, key)
+
+    def __getitem__(self, key: str):
+        if key not in self._KEYS:
+            raise KeyError(key)
+        return self._value(key)
+
+    def __getattr__(self, name: str):
+        if name in self._KEYS:
+            return self._value(name)
+        raise AttributeError(name)
+
+    def __iter__(self):
+        return iter(self._KEYS)
+
+    def __len__(self) -> int:
+        return len(self._KEYS)
+
+    def to_dict(self) -> Dict[str, any]:
+        """转为普通字典（嵌套的视图一并转换）"""
+        values = {}
+        for key in self._KEYS:
+            value = self._value(key)
+            values[key] = value.to_dict() if isinstance(value, _ResultView) else value
+        return values
+
+    def __reduce__(self):
+        return (type(self), (self._source,))
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+class CostInputView(_ResultView):
+    """input：测算输入（持有天数、实际使用的利率和保证金比例）"""
+    __slots__ = ()
+    _KEYS = (
+        "spot_price", "delivery_price", "quantity_ton", "start_date", "end_date",
+        "holding_days", "interest_rate", "margin_rate"
+    )
+
+
+class MiscFeesView(_ResultView):
+    """misc_fees：交割杂费明细（数据来源为 CostAmounts）"""
+    __slots__ = ()
+    _KEYS = MISC_FEE_ITEMS
+
+
+class CostItemsView(_ResultView):
+    """cost_breakdown：各项成本（数据来源为 CostAmounts）"""
+    __slots__ = ()
+    _KEYS = (
+        "spot_cost_with_vat", "spot_cost_base", "vat_amount", "misc_fees", "storage_cost",
+        "capital_cost", "spot_capital_cost", "futures_capital_cost"
+    )
+
+    def _value(self, key: str):
+        if key == "misc_fees":
+            return MiscFeesView(self._source)
+        return getattr(self._source, key)
+
+
+class CostSummaryView(_ResultView):
+    """summary：总成本、单位成本与盈亏平衡点"""
+    __slots__ = ()
+    _KEYS = ("total_cost", "cost_per_ton", "break_even_price", "premium_needed")
+
+    def _value(self, key: str):
+        if key == "total_cost":
+            return self._source.total.total_cost
+        return getattr(self._source, key)
+
+
+class ArbitrageView(_ResultView):
+    """arbitrage：期货收入、利润与是否能套利"""
+    __slots__ = ()
+    _KEYS = (
+        "futures_price", "futures_revenue", "total_cost_excl_vat", "profit",
+        "profit_per_ton", "profit_rate", "can_arbitrage", "break_even_futures_price"
+    )
+
+    def _value(self, key: str):
+        if key == "break_even_futures_price":
+            return self._source.break_even_price
+        return getattr(self._source, key)
+
+
+class CostBreakdown(Mapping):
+    """
+    单次测算的完整成本明细
+
+    由 calculate_breakdown 一次算出：输入、总额 total、每吨视图 per_ton（首次
+    访问时计算）、汇总指标，以及提供期货价格时的套利结果。
+    calculate_total_cost / check_arbitrage 直接返回它：按 "input"、
+    "cost_breakdown"、"summary"、"arbitrage" 下标访问时才创建对应的只读视图，
+    与原来的嵌套字典用法兼容；需要普通字典（如序列化）时用 to_dict()。
+
+    为了让大量测算时的构造足够快，字段不做写保护；结果可能被缓存共享，
+    调用方应视其为只读。
+    """
+
+    __slots__ = (
+        "spot_price",
+        "futures_price",
+        "delivery_price",
+        "quantity_ton",
+        "start_date",
+        "end_date",
+        "holding_days",
+        "interest_rate",
+        "margin_rate",
+        "total",
+        "break_even_price",
+        "futures_revenue",
+        "total_cost_excl_vat",
+        "profit",
+        "profit_rate",
+        "_per_ton",
+    )
+
+    _SECTIONS = {
+        "input": CostInputView,
+        "cost_breakdown": CostItemsView,
+        "summary": CostSummaryView,
+        "arbitrage": ArbitrageView,
+    }
+
+    def __init__(
+        self,
+        spot_price: float,
+        futures_price: Optional[float],
+        delivery_price: float,
+        quantity_ton: float,
+        start_date: datetime,
+        end_date: datetime,
+        holding_days: int,
+        interest_rate: float,
+        margin_rate: float,
+        total: CostAmounts,
+        break_even_price: float,
+        futures_revenue: Optional[float] = None,
+        total_cost_excl_vat: Optional[float] = None,
+        profit: Optional[float] = None,
+        profit_rate: Optional[float] = None
+    ):
+        self.spot_price = spot_price
+        self.futures_price = futures_price
+        self.delivery_price = delivery_price
+        self.quantity_ton = quantity_ton
+        self.start_date = start_date
+        self.end_date = end_date
+        self.holding_days = holding_days
+        self.interest_rate = interest_rate
+        self.margin_rate = margin_rate
+        self.total = total
+        self.break_even_price = break_even_price
+        self.futures_revenue = futures_revenue
+        self.total_cost_excl_vat = total_cost_excl_vat
+        self.profit = profit
+        self.profit_rate = profit_rate
+        self._per_ton = None
+
+    def __reduce__(self):
+        return (CostBreakdown, tuple(getattr(self, name) for name in self.__slots__[:-1]))
+
+    @property
+    def per_ton(self) -> CostAmounts:
+        """每吨视图（元/吨），口径与 total 相同"""
+        per_ton = self._per_ton
+        if per_ton is None:
+            per_ton = self._per_ton = self.total.scaled(self.quantity_ton)
+        return per_ton
+
+    @property
+    def cost_per_ton(self) -> float:
+        """单位成本（元/吨）"""
+        return self.total.total_cost / self.quantity_ton
+
+    @property
+    def premium_needed(self) -> float:
+        """需要的期现价差（元/吨）"""
+        return self.break_even_price - self.spot_price
+
+    @property
+    def profit_per_ton(self) -> Optional[float]:
+        """每吨利润（元/吨），未提供期货价格时为 None"""
+        if self.profit is None:
+            return None
+        return self.profit / self.quantity_ton
+
+    @property
+    def can_arbitrage(self) -> Optional[bool]:
+        """是否能套利，未提供期货价格时为 None"""
+        if self.profit is None:
+            return None
+        return self.profit > 0
+
+    def __getitem__(self, key: str) -> _ResultView:
+        view = self._SECTIONS.get(key)
+        if view is None or (key == "arbitrage" and self.futures_price is None):
+            raise KeyError(key)
+        return view(self.total if view is CostItemsView else self)
+
+    def __iter__(self):
+        if self.futures_price is None:
+            return iter(("input", "cost_breakdown", "summary"))
+        return iter(self._SECTIONS)
+
+    def __len__(self) -> int:
+        return 3 if self.futures_price is None else 4
+
+    def to_dict(self) -> Dict[str, any]:
+        """
+        转为嵌套的普通字典：包含 input / cost_breakdown / summary 三部分，
+        提供了期货价格时再加上 arbitrage 部分
+        """
+        total = self.total
+        result = {
+            "input": {
+                "spot_price": self.spot_price,
+                "delivery_price": self.delivery_price,
+                "quantity_ton": self.quantity_ton,
+                "start_date": self.start_date,
+                "end_date": self.end_date,
+                "holding_days": self.holding_days,
+                "interest_rate": self.interest_rate,
+                "margin_rate": self.margin_rate
+            },
+            "cost_breakdown": {
+                "spot_cost_with_vat": total.spot_cost_with_vat,
+                "spot_cost_base": total.spot_cost_base,
+                "vat_amount": total.vat_amount,
+                "misc_fees": dict(zip(MISC_FEE_ITEMS, total[3:11])),
+                "storage_cost": total.storage_cost,
+                "capital_cost": total.capital_cost,
+                "spot_capital_cost": total.spot_capital_cost,
+                "futures_capital_cost": total.futures_capital_cost
+            },
+            "summary": {
+                "total_cost": total.total_cost,
+                "cost_per_ton": self.cost_per_ton,
+                "break_even_price": self.break_even_price,
+                "premium_needed": self.premium_needed
+            }
+        }
+        if self.futures_price is not None:
+            result["arbitrage"] = {
+                "futures_price": self.futures_price,
+                "futures_revenue": self.futures_revenue,
+                "total_cost_excl_vat": self.total_cost_excl_vat,
+                "profit": self.profit,
+                "profit_per_ton": self.profit_per_ton,
+                "profit_rate": self.profit_rate,
+                "can_arbitrage": self.can_arbitrage,
+                "break_even_futures_price": self.break_even_price
+            }
+        return result
+
+    def __repr__(self):
+        return (
+            f"CostBreakdown(spot_price={self.spot_price!r}, futures_price={self.futures_price!r}, "
+            f"quantity_ton={self.quantity_ton!r}, holding_days={self.holding_days!r}, "
+            f"total_cost={self.total.total_cost!r}, profit={self.profit!r})"
+        )
+
+
+def calculate_breakdown(
+    params: TinDeliveryParams,
+    spot_price: float,
+    futures_price: Optional[float],
+    quantity_ton: float,
+    start_date: datetime,
+    end_date: datetime,
+    interest_rate: Optional[float] = None,
+    margin_rate: Optional[float] = None,
+    delivery_price: Optional[float] = None,
+    **fee_kwargs
+) -> CostBreakdown:
+    """
+    一次算出完整的成本明细（总额、每吨视图和套利结果）
+
+    calculate_total_cost 和 check_arbitrage 都基于此函数，网页端的每吨成本表
+    也直接取自 per_ton，保证各处使用同一套口径：现货资金占用为含税现货成本，
+    期货保证金占用为 现货价格 × 数量 × 保证金比例。
+
+    参数:
+        params: 交割参数（TinDeliveryParams）
+        spot_price: 现货价格（元/吨）
+        futures_price: 期货价格（元/吨），为None时不计算套利结果
+        quantity_ton: 数量（吨）
+        start_date: 开始日期（买入现货日期）
+        end_date: 结束日期（交割日期）
+        interest_rate: 资金利率（年化），默认使用params.default_interest_rate
+        margin_rate: 期货保证金比例，默认使用params.futures_margin_rate
+        delivery_price: 交割价格（元/吨），为None时使用期货价格（未提供期货价格时使用现货价格）
+        其他费用参数：**fee_kwargs，见 calculate_delivery_fees
+
+    返回:
+        CostBreakdown
+    """
+    timer = _stage_timer
+    if timer is not None:
+        timer, lap = timer.begin()
+
+    holding_days = (end_date - start_date).days
+    if delivery_price is None:
+        delivery_price = spot_price if futures_price is None else futures_price
+    if interest_rate is None:
+        interest_rate = params.default_interest_rate
+    used_margin_rate = params.futures_margin_rate if margin_rate is None else max(0, margin_rate)
+
+    # 交割杂费与仓储费（仓储费按实际天数计算）
+    fee_amounts = _delivery_fee_amounts(params, quantity_ton, **fee_kwargs)
+    if timer is not None:
+        lap = timer.lap("fees", lap)
+    storage_cost = params.storage_fee_per_ton_per_day * quantity_ton * holding_days
+    if timer is not None:
+        lap = timer.lap("storage", lap)
+
+    # 现货成本与增值税
+    spot_cost_base = spot_price * quantity_ton
+    vat_amount = max(0, (delivery_price - spot_price) * quantity_ton * params.vat_rate)
+    spot_cost = spot_cost_base + vat_amount
+
+    # 资金利息：现货资金占用为含税现货成本，期货为保证金占用；计息天数不为负数
+    interest_days = max(0, holding_days)
+    daily_rate = interest_rate / 365
+    futures_capital_amount = spot_price * quantity_ton * used_margin_rate
+    spot_interest_cost = spot_cost * daily_rate * interest_days
+    futures_interest_cost = max(0, futures_capital_amount * daily_rate * interest_days)
+    total_interest_cost = spot_interest_cost + futures_interest_cost
+    if timer is not None:
+        lap = timer.lap("capital", lap)
+
+    total_cost = spot_cost + fee_amounts[-1] + storage_cost + total_interest_cost
+    amounts = (
+        spot_cost_base,
+        vat_amount,
+        spot_cost,
+        *fee_amounts,
+        storage_cost,
+        spot_cost,
+        futures_capital_amount,
+        spot_interest_cost,
+        futures_interest_cost,
+        total_interest_cost,
+        total_cost
+    )
+
+    # 盈亏平衡点（期货价格需要达到这个水平才能保本）
+    break_even_price = spot_price + (total_cost - spot_cost) / quantity_ton
+    if timer is not None:
+        lap = timer.lap("summary", lap)
+
+    # 套利结果：期货收入与不含增值税的总成本比较
+    futures_revenue = total_cost_excl_vat = profit = profit_rate = None
+    if futures_price is not None:
+        futures_revenue = futures_price * quantity_ton
+        total_cost_excl_vat = total_cost - vat_amount
+        profit = futures_revenue - total_cost_excl_vat
+        profit_rate = (profit / (spot_price * quantity_ton)) * 100 if spot_price > 0 else 0
+        if timer is not None:
+            lap = timer.lap("arbitrage", lap)
+
+    result = CostBreakdown(
+        spot_price=spot_price,
+        futures_price=futures_price,
+        delivery_price=delivery_price,
+        quantity_ton=quantity_ton,
+        start_date=start_date,
+        end_date=end_date,
+        holding_days=holding_days,
+        interest_rate=interest_rate,
+        margin_rate=used_margin_rate,
+        total=CostAmounts._make(amounts),
+        break_even_price=break_even_price,
+        futures_revenue=futures_revenue,
+        total_cost_excl_vat=total_cost_excl_vat,
+        profit=profit,
+        profit_rate=profit_rate
+    )
+    if timer is not None:
+        timer.lap("result", lap)
+    return result
+
+
+def calculate_total_cost(
+    params: TinDeliveryParams,
+    spot_price: float,
+    quantity_ton: float,
+    start_date: datetime,
+    end_date: datetime,
+    interest_rate: Optional[float] = None,
+    margin_rate: Optional[float] = None,
+    delivery_price: Optional[float] = None,
+    inbound_fee_per_ton: Optional[float] = None,
+    outbound_fee_per_ton: Optional[float] = None,
+    packing_fee_per_ton: Optional[float] = None,
+    transfer_fee_per_ton: Optional[float] = None,
+    delivery_fee_per_ton: Optional[float] = None,
+    train_application_fee_per_ton: float = 0.0,
+    transport_fee_per_ton: float = 0.0
+) -> CostBreakdown:
+    """
+    计算期现套利总成本
+    
+    核心公式：
+    期现套利总成本 = 现货买入价 + 入库杂费 + (仓储费 × 天数) + 资金利息（现货+期货） + 交割手续费 + 增值税
+    增值税 = (交割价格 - 现货成本) × 增值税率
+    
+    参数:
+        params: 交割参数（TinDeliveryParams）
+        spot_price: 现货价格（元/吨）
+        quantity_ton: 数量（吨）
+        start_date: 开始日期（买入现货日期）
+        end_date: 结束日期（交割日期）
+        interest_rate: 资金利率（年化），默认使用params.default_interest_rate
+        margin_rate: 期货保证金比例（如果提供了margin_rate，则使用此值）
+        delivery_price: 交割价格（元/吨），如果为None则使用spot_price
+        其他费用参数：入库费、出库费等，如果为None则使用默认值
+    
+    返回:
+        CostBreakdown（可按 input / cost_breakdown / summary 下标访问，与原字典结构相同）
+    """
+    return calculate_breakdown(
+        params,
+        spot_price=spot_price,
+        futures_price=None,
+        quantity_ton=quantity_ton,
+        start_date=start_date,
+        end_date=end_date,
+        interest_rate=interest_rate,
+        margin_rate=margin_rate,
+        delivery_price=delivery_price,
+        inbound_fee_per_ton=inbound_fee_per_ton,
+        outbound_fee_per_ton=outbound_fee_per_ton,
+        packing_fee_per_ton=packing_fee_per_ton,
+        transfer_fee_per_ton=transfer_fee_per_ton,
+        delivery_fee_per_ton=delivery_fee_per_ton,
+        train_application_fee_per_ton=train_application_fee_per_ton,
+        transport_fee_per_ton=transport_fee_per_ton
+    )
+
+
+def check_arbitrage(
+    params: TinDeliveryParams,
+    spot_price: float,
+    futures_price: float,
+    quantity_ton: float,
+    start_date: datetime,
+    end_date: datetime,
+    interest_rate: Optional[float] = None,
+    margin_rate: Optional[float] = None,
+    delivery_price: Optional[float] = None,
+    **fee_kwargs
+) -> CostBreakdown:
+    """
+    检查是否能套利
+    
+    参数:
+        params: 交割参数（TinDeliveryParams）
+        spot_price: 现货价格（元/吨）
+        futures_price: 期货价格（元/吨）
+        quantity_ton: 数量（吨）
+        start_date: 开始日期
+        end_date: 结束日期
+        interest_rate: 资金利率（年化）
+        margin_rate: 期货保证金比例
+        delivery_price: 交割价格（元/吨），如果为None则使用futures_price
+        其他费用参数：**fee_kwargs
+    
+    返回:
+        CostBreakdown（在 calculate_total_cost 的基础上多一个 arbitrage 部分）
+    """
+    return calculate_breakdown(
+        params,
+        spot_price=spot_price,
+        futures_price=futures_price,
+        quantity_ton=quantity_ton,
+        start_date=start_date,
+        end_date=end_date,
+        interest_rate=interest_rate,
+        margin_rate=margin_rate,
+        delivery_price=delivery_price,
+        **fee_kwargs
+    )
+
+
+def _total_cost_columns(params: TinDeliveryParams, scenarios, **values) -> Dict[str, np.ndarray]:
+    """批量总成本计算的核心，运算顺序与 calculate_total_cost 保持一致"""
+    import numpy as np
+
+    timer = _stage_timer
+    if timer is not None:
+        timer, lap = timer.begin()
+
+    known = {name for name, _, _ in _BATCH_FEE_FIELDS} | {
+        "spot_price", "quantity_ton", "start_date", "end_date",
+        "interest_rate", "margin_rate", "delivery_price"
+    }
+    unknown = set(values) - known
+    if unknown:
+        raise TypeError(f"未知的批量计算参数: {', '.join(sorted(unknown))}")
+    values = {
+        name: _batch_column(scenarios, name, values.get(name))
+        for name in known
+    }
+    for name in ("spot_price", "quantity_ton", "start_date", "end_date"):
+        if values[name] is None:
+            raise ValueError(f"批量计算缺少必需参数: {name}")
+
+    spot_price = np.asarray(values["spot_price"], dtype=np.float64)
+    quantity_ton = np.asarray(values["quantity_ton"], dtype=np.float64)
+    raw_days = _holding_days_array(values["start_date"], values["end_date"])
+    delivery_price = values["delivery_price"]
+    if delivery_price is None:
+        delivery_price = spot_price
+    else:
+        delivery_price = np.asarray(delivery_price, dtype=np.float64)
+        delivery_price = np.where(np.isnan(delivery_price), spot_price, delivery_price)
+    interest_rate = _fill_missing(values["interest_rate"], params.default_interest_rate)
+    margin_rate = values["margin_rate"]
+    if margin_rate is None:
+        used_margin_rate = np.float64(params.futures_margin_rate)
+    else:
+        margin_rate = np.asarray(margin_rate, dtype=np.float64)
+        used_margin_rate = np.where(
+            np.isnan(margin_rate), params.futures_margin_rate, np.maximum(0, margin_rate)
+        )
+
+    fee_rates = []
+    for name, default_attr, _ in _BATCH_FEE_FIELDS:
+        default = getattr(params, default_attr) if default_attr else 0.0
+        fee = _fill_missing(values[name], default)
+        if default_attr:
+            # 与标量版本的 `fee or default` 一致：0 也使用默认值
+            fee = np.where(fee == 0, default, fee)
+        fee_rates.append(fee)
+
+    # 标量输入保持为标量参与运算，最后统一广播成列，避免为常数列分配整列内存；
+    # 运算顺序与标量版本一致，结果逐位相同
+    # 1. 交割杂费
+    columns = {}
+    for (_, _, column), fee in zip(_BATCH_FEE_FIELDS, fee_rates):
+        columns[column] = fee * quantity_ton
+    if all(fee.ndim == 0 for fee in fee_rates):
+        # 费率均为标量时先按吨汇总再乘数量，与逐项相加的差异远小于0.01元
+        total_misc_fees = quantity_ton * sum(float(fee) for fee in fee_rates)
+    else:
+        total_misc_fees = sum(columns[column] for _, _, column in _BATCH_FEE_FIELDS)
+    if timer is not None:
+        lap = timer.lap("fees", lap)
+
+    # 2. 仓储成本（与标量版本一致，使用未截断的持有天数）
+    # 天数先转成浮点，后面几次乘法不必各自再转换整数列（结果相同）
+    days = raw_days.astype(np.float64)
+    storage_cost = params.storage_fee_per_ton_per_day * quantity_ton * days
+    if timer is not None:
+        lap = timer.lap("storage", lap)
+
+    # 3-5. 现货成本与增值税
+    spot_cost_base = spot_price * quantity_ton
+    vat_amount = np.maximum(0, (delivery_price - spot_price) * quantity_ton * params.vat_rate)
+    spot_cost = spot_cost_base + vat_amount
+
+    # 6. 资金利息（持有天数不为负，期货利息不为负）
+    holding_days = np.maximum(days, 0)
+    daily_rate = interest_rate / 365
+    futures_capital_amount = spot_cost_base * used_margin_rate
+    spot_interest_cost = spot_cost * daily_rate * holding_days
+    futures_interest_cost = np.maximum(0, futures_capital_amount * daily_rate * holding_days)
+    total_interest_cost = spot_interest_cost + futures_interest_cost
+    if timer is not None:
+        lap = timer.lap("capital", lap)
+
+    # 7-9. 总成本、单位成本、盈亏平衡点
+    total_cost = spot_cost + total_misc_fees + storage_cost + total_interest_cost
+    cost_per_ton = total_cost / quantity_ton
+    break_even_price = spot_price + (total_cost - spot_cost) / quantity_ton
+
+    columns = {
+        "spot_price": spot_price,
+        "delivery_price": delivery_price,
+        "quantity_ton": quantity_ton,
+        "holding_days": raw_days,
+        "interest_rate": interest_rate,
+        "margin_rate": used_margin_rate,
+        "spot_cost_base": spot_cost_base,
+        "vat_amount": vat_amount,
+        "spot_cost_with_vat": spot_cost,
+        **columns,
+        "total_misc_fees": total_misc_fees,
+        "storage_cost": storage_cost,
+        "spot_capital_amount": spot_cost,
+        "futures_capital_amount": futures_capital_amount,
+        "spot_capital_cost": spot_interest_cost,
+        "futures_capital_cost": futures_interest_cost,
+        "capital_cost": total_interest_cost,
+        "total_cost": total_cost,
+        "cost_per_ton": cost_per_ton,
+        "break_even_price": break_even_price,
+        "premium_needed": break_even_price - spot_price
+    }
+    columns = _broadcast_columns(columns)
+    if timer is not None:
+        timer.lap("summary", lap)
+    return columns
+
+
+# check_arbitrage_batch(sensitivities=True) 追加的利润敏感度列：
+# 列名 -> (说明, 单位变动)
+SENSITIVITY_COLUMNS = {
+    "profit_delta_spot_price": ("现货价格 +1 元/吨", 1.0),
+    "profit_delta_futures_price": ("期货价格 +1 元/吨", 1.0),
+    "profit_delta_interest_rate": ("资金利率 +1 个百分点", 0.01),
+    "profit_delta_margin_rate": ("保证金比例 +1 个百分点", 0.01),
+    "profit_delta_holding_days": ("持有天数 +1 天（保证金比例不变）", 1.0),
+}
+
+
+def _profit_sensitivity_columns(
+    params: TinDeliveryParams,
+    columns: Dict[str, np.ndarray],
+    floating_delivery
+) -> Dict[str, np.ndarray]:
+    """
+    利润对各输入的偏导数（按 SENSITIVITY_COLUMNS 的单位变动缩放）
+
+    利润对现货价格、期货价格、资金利率、保证金比例和持有天数都是分段线性的
+    （分段点来自增值税、期货利息和计息天数的 max(0, …)），这里直接用
+    check_arbitrage_batch 已算出的中间列求出所在分段的斜率，不需要重算模型；
+    单位变动不跨越分段点时，与把该输入加一个单位后重算的利润差完全一致
+    （分段点上取右导数，即输入增加方向）。
+
+    参数:
+        params: 交割参数
+        columns: check_arbitrage_batch 的结果列
+        floating_delivery: 交割价格是否随期货价格变化（未提供交割价格），标量或布尔数组
+    """
+    import numpy as np
+
+    quantity_ton = columns["quantity_ton"]
+    raw_days = columns["holding_days"]
+    interest_days = np.maximum(raw_days, 0)
+    daily_rate = columns["interest_rate"] / 365
+    rate_days = daily_rate * interest_days
+    vat_rate = params.vat_rate
+    # 增值税 max(0, (交割价格 - 现货价格) × 数量 × 税率) 为正时随价格变化
+    vat_active = columns["vat_amount"] > 0
+    futures_interest_active = columns["futures_capital_cost"] > 0
+
+    # 每吨现货价格 +1：现货基价、含税现货成本（扣除增值税的变化）及其利息、期货保证金利息
+    spot_cost_slope = quantity_ton * np.where(vat_active, 1 - vat_rate, 1.0)
+    delta_spot = -(
+        quantity_ton
+        + spot_cost_slope * rate_days
+        + np.where(futures_interest_active, quantity_ton * columns["margin_rate"] * rate_days, 0.0)
+    )
+    # 每吨期货价格 +1：期货收入；交割价格随期货价格变化时增值税占用的利息也增加
+    # （交割价格等于现货价格时增值税从0开始增加，按右导数也计入）
+    vat_rises = columns["delivery_price"] >= columns["spot_price"]
+    vat_interest = np.where(vat_rises & floating_delivery, quantity_ton * vat_rate * rate_days, 0.0)
+    delta_futures = quantity_ton - vat_interest
+
+    # 资金利率、保证金比例：利息对两者都是线性的
+    futures_interest_base = np.where(
+        columns["interest_rate"] >= 0, np.maximum(0, columns["futures_capital_amount"]), 0.0
+    )
+    delta_interest = -(columns["spot_capital_amount"] + futures_interest_base) * interest_days / 365
+    delta_margin = -np.maximum(0, columns["spot_cost_base"] * rate_days)
+
+    # 持有天数 +1：仓储费按未截断天数计算；利息按计息天数（不为负）计算
+    accrues = raw_days >= 0
+    delta_days = -(
+        params.storage_fee_per_ton_per_day * quantity_ton
+        + np.where(
+            accrues,
+            columns["spot_capital_amount"] * daily_rate
+            + np.maximum(0, columns["futures_capital_amount"] * daily_rate),
+            0.0
+        )
+    )
+
+    deltas = (delta_spot, delta_futures, delta_interest, delta_margin, delta_days)
+    return {
+        name: delta * unit
+        for (name, (_, unit)), delta in zip(SENSITIVITY_COLUMNS.items(), deltas)
+    }
+
+
+def _param_property(name: str) -> property:
+    """计算器上与交割参数同名的属性：读取 params；赋值时替换为新的参数集"""
+    def getter(self):
+        return getattr(self.params, name)
+
+    def setter(self, value):
+        self.params = self.params.replace(**{name: value})
+
+    return property(getter, setter, doc=f"交割参数 {name}（见 TinDeliveryParams）")
+
+
 class TinDeliveryCostCalculator:
     """锡期现交割成本计算器"""
     
-    def __init__(self):
-        """初始化锡的交割参数"""
-        # ========== 锡的固定交割参数 ==========
-        # 从配置文件加载参数
-        self.storage_fee_per_ton_per_day = STORAGE_FEE_PER_TON_PER_DAY
-        self.delivery_unit_ton = DELIVERY_UNIT_TON
-        self.trading_unit_ton = TRADING_UNIT_TON
-        self.inbound_fee_per_ton = INBOUND_FEE_PER_TON
-        self.outbound_fee_per_ton = OUTBOUND_FEE_PER_TON
-        self.packing_fee_per_ton = PACKING_FEE_PER_TON
-        self.transfer_fee_per_ton = TRANSFER_FEE_PER_TON
-        self.delivery_fee_per_ton = DELIVERY_FEE_PER_TON
-        self.vat_rate = VAT_RATE
-        self.default_interest_rate = DEFAULT_INTEREST_RATE
-        self.futures_margin_rate = FUTURES_MARGIN_RATE
+    # 与 TinDeliveryParams 同名的参数属性（兼容旧代码直接读写计算器属性的用法）
+    storage_fee_per_ton_per_day = _param_property("storage_fee_per_ton_per_day")
+    delivery_unit_ton = _param_property("delivery_unit_ton")
+    trading_unit_ton = _param_property("trading_unit_ton")
+    inbound_fee_per_ton = _param_property("inbound_fee_per_ton")
+    outbound_fee_per_ton = _param_property("outbound_fee_per_ton")
+    packing_fee_per_ton = _param_property("packing_fee_per_ton")
+    transfer_fee_per_ton = _param_property("transfer_fee_per_ton")
+    delivery_fee_per_ton = _param_property("delivery_fee_per_ton")
+    vat_rate = _param_property("vat_rate")
+    default_interest_rate = _param_property("default_interest_rate")
+    futures_margin_rate = _param_property("futures_margin_rate")
+    
+    def __init__(self, params: Optional[TinDeliveryParams] = None):
+        """
+        初始化锡的交割参数
+        
+        参数:
+            params: 交割参数，默认使用按配置文件构建的 DEFAULT_PARAMS
+        
+        计算器本身不保存其他状态；各计算方法也可以通过 params 参数临时使用
+        另一组参数，因此同一个计算器可以在多个会话和线程之间共享。
+        """
+        self.params = DEFAULT_PARAMS if params is None else params
     
     def calculate_margin_rate(
         self,
@@ -93,82 +1506,58 @@ class TinDeliveryCostCalculator:
         返回:
             (平均保证金比例, 详细信息字典)
         """
+        timer = _stage_timer
+        if timer is not None:
+            timer, lap = timer.begin()
+
         # 计算关键时间点（如果未提供则自动计算）
         if listing_date is None:
             listing_date = start_date
         
+        calendar = get_calendar()
+        
         if month_before_delivery_date is None:
-            # 交割月前第一月的第一个交易日（简化处理，假设为交割月前一个月的1号）
-            month_before_delivery_date = delivery_date.replace(day=1) - timedelta(days=1)
-            month_before_delivery_date = month_before_delivery_date.replace(day=1)
+            # 交割月前第一月的第一个交易日
+            previous_month = delivery_date.replace(day=1) - timedelta(days=1)
+            month_before_delivery_date = match_date_type(
+                delivery_date,
+                calendar.first_trading_day_of_month(previous_month.year, previous_month.month)
+            )
         
         if delivery_month_start_date is None:
-            # 交割月份第一个交易日（交割月1号）
-            delivery_month_start_date = delivery_date.replace(day=1)
+            # 交割月份第一个交易日
+            delivery_month_start_date = match_date_type(
+                delivery_date,
+                calendar.first_trading_day_of_month(delivery_date.year, delivery_date.month)
+            )
         
         if two_days_before_last_date is None:
             # 最后交易日前二个交易日（如果未提供last_trading_date，则基于交割日期计算）
             if last_trading_date is None:
-                two_days_before_last_date = delivery_date - timedelta(days=2)
+                two_days_before_last_date = calendar.offset(delivery_date, -2)
             else:
-                two_days_before_last_date = last_trading_date - timedelta(days=2)
+                two_days_before_last_date = calendar.offset(last_trading_date, -2)
         
-        # 确定每个时间段
-        periods = []
-        current_date = start_date
-        
-        # 1. 合约挂牌之日起（使用rate_5_percent）
-        if current_date < month_before_delivery_date:
-            periods.append({
-                'start': current_date,
-                'end': min(month_before_delivery_date, delivery_date),
-                'rate': rate_5_percent,
-                'description': '合约挂牌之日起'
-            })
-            current_date = month_before_delivery_date
-        
-        # 2. 交割月前第一月的第一个交易日起（使用rate_10_percent）
-        if current_date < delivery_month_start_date:
-            periods.append({
-                'start': current_date,
-                'end': min(delivery_month_start_date, delivery_date),
-                'rate': rate_10_percent,
-                'description': '交割月前第一月的第一个交易日起'
-            })
-            current_date = delivery_month_start_date
-        
-        # 3. 交割月份第一个交易日起（使用rate_15_percent）
-        if current_date < two_days_before_last_date:
-            periods.append({
-                'start': current_date,
-                'end': min(two_days_before_last_date, delivery_date),
-                'rate': rate_15_percent,
-                'description': '交割月份第一个交易日起'
-            })
-            current_date = two_days_before_last_date
-        
-        # 4. 最后交易日前二个交易日起（使用rate_20_percent）
-        if current_date < delivery_date:
-            periods.append({
-                'start': current_date,
-                'end': delivery_date,
-                'rate': rate_20_percent,
-                'description': '最后交易日前二个交易日起'
-            })
-        
-        # 计算加权平均保证金比例
+        # 构建保证金阶梯并计算加权平均保证金比例（开始日期等于交割日时取20%）
+        schedule = MarginSchedule(
+            delivery_date,
+            month_before_delivery_date,
+            delivery_month_start_date,
+            two_days_before_last_date,
+            rate_5_percent,
+            rate_10_percent,
+            rate_15_percent,
+            rate_20_percent,
+            listing_date=listing_date
+        )
+        periods = schedule.periods(start_date)
         total_days = (delivery_date - start_date).days
-        if total_days == 0:
-            avg_rate = 0.20
-        else:
-            weighted_sum = 0
-            for period in periods:
-                period_days = (period['end'] - period['start']).days
-                weighted_sum += period['rate'] * period_days
-            avg_rate = weighted_sum / total_days
+        avg_rate = schedule.average_rate(start_date)
         
         # 加上企业保证金加收比例
         final_rate = avg_rate + enterprise_margin_addon
+        if timer is not None:
+            timer.lap("margin", lap)
         
         return final_rate, {
             'periods': periods,
@@ -189,90 +1578,26 @@ class TinDeliveryCostCalculator:
         start_date: datetime,
         end_date: datetime,
         interest_rate: Optional[float] = None,
-        margin_rate: Optional[float] = None
+        margin_rate: Optional[float] = None,
+        params: Optional[TinDeliveryParams] = None
     ) -> Dict[str, float]:
-        """
-        计算资金占用成本（同时计算现货和期货保证金）
-        
-        参数:
-            spot_price: 现货价格（元/吨）
-            quantity_ton: 数量（吨）
-            start_date: 开始日期
-            end_date: 结束日期
-            interest_rate: 资金利率（年化），默认使用self.default_interest_rate
-            margin_rate: 期货保证金比例（如果提供了margin_rate，则使用此值，否则使用默认值）
-        
-        返回:
-            包含资金成本明细的字典
-        """
-        if interest_rate is None:
-            interest_rate = self.default_interest_rate
-        
-        holding_days = (end_date - start_date).days
-        # 确保持有天数不为负数
-        if holding_days < 0:
-            holding_days = 0
-        
-        # 计算现货资金占用（全额现货款，含增值税）
-        spot_capital_amount = spot_price * quantity_ton * (1 + self.vat_rate)
-        
-        # 计算期货保证金占用
-        if margin_rate is not None:
-            used_margin_rate = max(0, margin_rate)  # 确保保证金比例不为负数
-        else:
-            used_margin_rate = self.futures_margin_rate
-        
-        futures_capital_amount = spot_price * quantity_ton * used_margin_rate
-        
-        # 总资金占用
-        total_capital_amount = spot_capital_amount + futures_capital_amount
-        
-        # 计算资金利息（按天计算）
-        daily_rate = interest_rate / 365
-        spot_interest_cost = spot_capital_amount * daily_rate * holding_days
-        futures_interest_cost = futures_capital_amount * daily_rate * holding_days
-        total_interest_cost = spot_interest_cost + futures_interest_cost
-        
-        # 确保所有成本都是正数
-        spot_interest_cost = max(0, spot_interest_cost)
-        futures_interest_cost = max(0, futures_interest_cost)
-        total_interest_cost = spot_interest_cost + futures_interest_cost
-        
-        return {
-            "spot_capital_amount": spot_capital_amount,
-            "futures_capital_amount": futures_capital_amount,
-            "total_capital_amount": total_capital_amount,
-            "spot_interest_cost": spot_interest_cost,
-            "futures_interest_cost": futures_interest_cost,
-            "total_interest_cost": total_interest_cost,
-            "interest_rate": interest_rate,
-            "holding_days": holding_days,
-            "margin_rate": used_margin_rate
-        }
+        """计算资金占用成本，参数见模块函数 calculate_capital_cost（params 默认为 self.params）"""
+        return calculate_capital_cost(
+            self.params if params is None else params,
+            spot_price, quantity_ton, start_date, end_date,
+            interest_rate, margin_rate
+        )
     
     def calculate_storage_cost(
         self,
         quantity_ton: float,
-        holding_days: int
+        holding_days: int,
+        params: Optional[TinDeliveryParams] = None
     ) -> Dict[str, float]:
-        """
-        计算仓储成本
-        
-        参数:
-            quantity_ton: 数量（吨）
-            holding_days: 持有天数
-        
-        返回:
-            包含仓储成本明细的字典
-        """
-        storage_cost = self.storage_fee_per_ton_per_day * quantity_ton * holding_days
-        
-        return {
-            "storage_fee_per_ton_per_day": self.storage_fee_per_ton_per_day,
-            "quantity_ton": quantity_ton,
-            "holding_days": holding_days,
-            "storage_cost": storage_cost
-        }
+        """计算仓储成本，参数见模块函数 calculate_storage_cost（params 默认为 self.params）"""
+        return calculate_storage_cost(
+            self.params if params is None else params, quantity_ton, holding_days
+        )
     
     def calculate_delivery_fees(
         self,
@@ -283,52 +1608,21 @@ class TinDeliveryCostCalculator:
         transfer_fee_per_ton: Optional[float] = None,
         delivery_fee_per_ton: Optional[float] = None,
         train_application_fee_per_ton: float = 0.0,
-        transport_fee_per_ton: float = 0.0
+        transport_fee_per_ton: float = 0.0,
+        params: Optional[TinDeliveryParams] = None
     ) -> Dict[str, float]:
-        """
-        计算交割杂费（入库费、出库费、打包费、过户费等）
-        
-        参数:
-            quantity_ton: 数量（吨）
-            inbound_fee_per_ton: 入库费（元/吨），如果为None则使用默认值
-            outbound_fee_per_ton: 出库费（元/吨），如果为None则使用默认值
-            packing_fee_per_ton: 打包费（元/吨），如果为None则使用默认值
-            transfer_fee_per_ton: 过户费（元/吨），如果为None则使用默认值
-            delivery_fee_per_ton: 交割手续费（元/吨），如果为None则使用默认值
-            train_application_fee_per_ton: 代办车皮申请费（元/吨）
-            transport_fee_per_ton: 代办提运费（元/吨）
-        
-        返回:
-            包含各项交割杂费的字典
-        """
-        inbound_cost = (inbound_fee_per_ton or self.inbound_fee_per_ton) * quantity_ton
-        outbound_cost = (outbound_fee_per_ton or self.outbound_fee_per_ton) * quantity_ton
-        packing_cost = (packing_fee_per_ton or self.packing_fee_per_ton) * quantity_ton
-        transfer_cost = (transfer_fee_per_ton or self.transfer_fee_per_ton) * quantity_ton
-        delivery_fee_cost = (delivery_fee_per_ton or self.delivery_fee_per_ton) * quantity_ton
-        train_app_cost = train_application_fee_per_ton * quantity_ton
-        transport_cost = transport_fee_per_ton * quantity_ton
-        
-        total_misc_fees = (
-            inbound_cost + 
-            outbound_cost + 
-            packing_cost + 
-            transfer_cost + 
-            delivery_fee_cost +
-            train_app_cost +
-            transport_cost
+        """计算交割杂费，参数见模块函数 calculate_delivery_fees（params 默认为 self.params）"""
+        return calculate_delivery_fees(
+            self.params if params is None else params,
+            quantity_ton,
+            inbound_fee_per_ton,
+            outbound_fee_per_ton,
+            packing_fee_per_ton,
+            transfer_fee_per_ton,
+            delivery_fee_per_ton,
+            train_application_fee_per_ton,
+            transport_fee_per_ton
         )
-        
-        return {
-            "inbound_fee": inbound_cost,
-            "outbound_fee": outbound_cost,
-            "packing_fee": packing_cost,
-            "transfer_fee": transfer_cost,
-            "delivery_fee": delivery_fee_cost,
-            "train_application_fee": train_app_cost,
-            "transport_fee": transport_cost,
-            "total_misc_fees": total_misc_fees
-        }
     
     def calculate_total_cost(
         self,
@@ -345,114 +1639,27 @@ class TinDeliveryCostCalculator:
         transfer_fee_per_ton: Optional[float] = None,
         delivery_fee_per_ton: Optional[float] = None,
         train_application_fee_per_ton: float = 0.0,
-        transport_fee_per_ton: float = 0.0
-    ) -> Dict[str, any]:
-        """
-        计算期现套利总成本
-        
-        核心公式：
-        期现套利总成本 = 现货买入价 + 入库杂费 + (仓储费 × 天数) + 资金利息（现货+期货） + 交割手续费 + 增值税
-        增值税 = (交割价格 - 现货成本) × 增值税率
-        
-        参数:
-            spot_price: 现货价格（元/吨）
-            quantity_ton: 数量（吨）
-            start_date: 开始日期（买入现货日期）
-            end_date: 结束日期（交割日期）
-            interest_rate: 资金利率（年化），默认使用self.default_interest_rate
-            margin_rate: 期货保证金比例（如果提供了margin_rate，则使用此值）
-            delivery_price: 交割价格（元/吨），如果为None则使用spot_price
-            其他费用参数：入库费、出库费等，如果为None则使用默认值
-        
-        返回:
-            包含所有成本明细的字典
-        """
-        holding_days = (end_date - start_date).days
-        
-        # 如果未提供交割价格，默认使用现货价格
-        if delivery_price is None:
-            delivery_price = spot_price
-        
-        # 1. 现货买入成本（不含增值税）
-        spot_cost_base = spot_price * quantity_ton
-        
-        # 2. 增值税 = (交割价格 - 现货成本) × 增值税率
-        vat_amount = max(0, (delivery_price - spot_price) * quantity_ton * self.vat_rate)
-        
-        # 3. 现货买入成本（含增值税）
-        spot_cost = spot_cost_base + vat_amount
-        
-        # 4. 交割杂费
-        misc_fees = self.calculate_delivery_fees(
-            quantity_ton,
-            inbound_fee_per_ton,
-            outbound_fee_per_ton,
-            packing_fee_per_ton,
-            transfer_fee_per_ton,
-            delivery_fee_per_ton,
-            train_application_fee_per_ton,
-            transport_fee_per_ton
-        )
-        
-        # 5. 仓储成本
-        storage = self.calculate_storage_cost(quantity_ton, holding_days)
-        
-        # 6. 资金利息（同时计算现货和期货保证金）
-        # 注意：资金占用基于现货成本（含增值税）
-        capital = self.calculate_capital_cost(
-            spot_price, quantity_ton, start_date, end_date,
-            interest_rate, margin_rate
-        )
-        # 调整现货资金占用，包含增值税
-        capital["spot_capital_amount"] = spot_cost
-        # 重新计算现货资金成本
-        daily_rate = capital["interest_rate"] / 365
-        capital["spot_interest_cost"] = capital["spot_capital_amount"] * daily_rate * capital["holding_days"]
-        capital["total_capital_amount"] = capital["spot_capital_amount"] + capital["futures_capital_amount"]
-        capital["total_interest_cost"] = capital["spot_interest_cost"] + capital["futures_interest_cost"]
-        
-        # 7. 总成本
-        total_cost = (
-            spot_cost +
-            misc_fees["total_misc_fees"] +
-            storage["storage_cost"] +
-            capital["total_interest_cost"]
+        transport_fee_per_ton: float = 0.0,
+        params: Optional[TinDeliveryParams] = None
+    ) -> CostBreakdown:
+        """计算期现套利总成本，参数见模块函数 calculate_total_cost（params 默认为 self.params）"""
+        return calculate_total_cost(
+            self.params if params is None else params,
+            spot_price=spot_price,
+            quantity_ton=quantity_ton,
+            start_date=start_date,
+            end_date=end_date,
+            interest_rate=interest_rate,
+            margin_rate=margin_rate,
+            delivery_price=delivery_price,
+            inbound_fee_per_ton=inbound_fee_per_ton,
+            outbound_fee_per_ton=outbound_fee_per_ton,
+            packing_fee_per_ton=packing_fee_per_ton,
+            transfer_fee_per_ton=transfer_fee_per_ton,
+            delivery_fee_per_ton=delivery_fee_per_ton,
+            train_application_fee_per_ton=train_application_fee_per_ton,
+            transport_fee_per_ton=transport_fee_per_ton
         )
-        
-        # 8. 单位成本（元/吨）
-        cost_per_ton = total_cost / quantity_ton
-        
-        # 9. 盈亏平衡点（期货价格需要达到这个水平才能保本）
-        break_even_price = spot_price + (total_cost - spot_cost) / quantity_ton
-        
-        return {
-            "input": {
-                "spot_price": spot_price,
-                "delivery_price": delivery_price,
-                "quantity_ton": quantity_ton,
-                "start_date": start_date,
-                "end_date": end_date,
-                "holding_days": holding_days,
-                "interest_rate": capital["interest_rate"],
-                "margin_rate": capital["margin_rate"]
-            },
-            "cost_breakdown": {
-                "spot_cost_with_vat": spot_cost,
-                "spot_cost_base": spot_cost_base,
-                "vat_amount": vat_amount,
-                "misc_fees": misc_fees,
-                "storage_cost": storage["storage_cost"],
-                "capital_cost": capital["total_interest_cost"],
-                "spot_capital_cost": capital["spot_interest_cost"],
-                "futures_capital_cost": capital["futures_interest_cost"]
-            },
-            "summary": {
-                "total_cost": total_cost,
-                "cost_per_ton": cost_per_ton,
-                "break_even_price": break_even_price,
-                "premium_needed": break_even_price - spot_price
-            }
-        }
     
     def check_arbitrage(
         self,
@@ -464,31 +1671,165 @@ class TinDeliveryCostCalculator:
         interest_rate: Optional[float] = None,
         margin_rate: Optional[float] = None,
         delivery_price: Optional[float] = None,
+        params: Optional[TinDeliveryParams] = None,
         **fee_kwargs
-    ) -> Dict[str, any]:
+    ) -> CostBreakdown:
+        """检查是否能套利，参数见模块函数 check_arbitrage（params 默认为 self.params）"""
+        return check_arbitrage(
+            self.params if params is None else params,
+            spot_price=spot_price,
+            futures_price=futures_price,
+            quantity_ton=quantity_ton,
+            start_date=start_date,
+            end_date=end_date,
+            interest_rate=interest_rate,
+            margin_rate=margin_rate,
+            delivery_price=delivery_price,
+            **fee_kwargs
+        )
+
+    def calculate_breakdown(
+        self,
+        spot_price: float,
+        futures_price: Optional[float],
+        quantity_ton: float,
+        start_date: datetime,
+        end_date: datetime,
+        interest_rate: Optional[float] = None,
+        margin_rate: Optional[float] = None,
+        delivery_price: Optional[float] = None,
+        params: Optional[TinDeliveryParams] = None,
+        **fee_kwargs
+    ) -> CostBreakdown:
+        """一次算出完整的成本明细，参数见模块函数 calculate_breakdown（params 默认为 self.params）"""
+        return calculate_breakdown(
+            self.params if params is None else params,
+            spot_price=spot_price,
+            futures_price=futures_price,
+            quantity_ton=quantity_ton,
+            start_date=start_date,
+            end_date=end_date,
+            interest_rate=interest_rate,
+            margin_rate=margin_rate,
+            delivery_price=delivery_price,
+            **fee_kwargs
+        )
+
+    def calculate_total_cost_batch(
+        self,
+        scenarios: Optional[pd.DataFrame] = None,
+        spot_price=None,
+        quantity_ton=None,
+        start_date=None,
+        end_date=None,
+        interest_rate=None,
+        margin_rate=None,
+        delivery_price=None,
+        inbound_fee_per_ton=None,
+        outbound_fee_per_ton=None,
+        packing_fee_per_ton=None,
+        transfer_fee_per_ton=None,
+        delivery_fee_per_ton=None,
+        train_application_fee_per_ton=None,
+        transport_fee_per_ton=None,
+        params: Optional[TinDeliveryParams] = None
+    ) -> Union[Dict[str, np.ndarray], pd.DataFrame]:
         """
-        检查是否能套利
-        
+        批量计算期现套利总成本（向量化版本的 calculate_total_cost）
+
+        每个参数既可以是标量，也可以是数组/Series（按元素广播）；也可以传入
+        scenarios DataFrame，列名与参数名一致，显式传入的参数优先。
+        可选参数中的 None/NaN 视为未提供，与标量版本传 None 的含义相同；
+        交割杂费与标量版本一致，为0时同样使用默认值。
+
         参数:
-            spot_price: 现货价格（元/吨）
-            futures_price: 期货价格（元/吨）
-            quantity_ton: 数量（吨）
-            start_date: 开始日期
-            end_date: 结束日期
-            interest_rate: 资金利率（年化）
-            margin_rate: 期货保证金比例
-            delivery_price: 交割价格（元/吨），如果为None则使用spot_price
-            其他费用参数：**fee_kwargs
-        
+            scenarios: 场景表（可选）
+            params: 交割参数，默认为 self.params
+            其余参数同 calculate_total_cost
+
+        返回:
+            列式结果：传入DataFrame时返回同索引的DataFrame，否则返回 {列名: ndarray}
+        """
+        columns = _total_cost_columns(
+            self.params if params is None else params,
+            scenarios,
+            spot_price=spot_price,
+            quantity_ton=quantity_ton,
+            start_date=start_date,
+            end_date=end_date,
+            interest_rate=interest_rate,
+            margin_rate=margin_rate,
+            delivery_price=delivery_price,
+            inbound_fee_per_ton=inbound_fee_per_ton,
+            outbound_fee_per_ton=outbound_fee_per_ton,
+            packing_fee_per_ton=packing_fee_per_ton,
+            transfer_fee_per_ton=transfer_fee_per_ton,
+            delivery_fee_per_ton=delivery_fee_per_ton,
+            train_application_fee_per_ton=train_application_fee_per_ton,
+            transport_fee_per_ton=transport_fee_per_ton
+        )
+        if _is_pandas(scenarios, "DataFrame"):
+            import pandas as pd
+
+            timer = _stage_timer
+            if timer is not None:
+                timer, lap = timer.begin()
+            columns = pd.DataFrame(columns, index=scenarios.index)
+            if timer is not None:
+                timer.lap("result", lap)
+        return columns
+
+    def check_arbitrage_batch(
+        self,
+        scenarios: Optional[pd.DataFrame] = None,
+        spot_price=None,
+        futures_price=None,
+        quantity_ton=None,
+        start_date=None,
+        end_date=None,
+        interest_rate=None,
+        margin_rate=None,
+        delivery_price=None,
+        params: Optional[TinDeliveryParams] = None,
+        sensitivities: bool = False,
+        **fee_kwargs
+    ) -> Union[Dict[str, np.ndarray], pd.DataFrame]:
+        """
+        批量检查是否能套利（向量化版本的 check_arbitrage）
+
+        参数:
+            scenarios: 场景表（可选），列名与参数名一致
+            params: 交割参数，默认为 self.params
+            sensitivities: 是否同时给出利润对各输入的敏感度（SENSITIVITY_COLUMNS），
+                由同一次计算的中间结果直接求出，不需要逐个输入上下浮动重算
+            其余参数同 check_arbitrage，可以是标量或数组
+
         返回:
-            包含套利分析结果的字典
+            列式结果，包含 calculate_total_cost_batch 的全部列以及
+            futures_price、futures_revenue、total_cost_excl_vat、profit、
+            profit_per_ton、profit_rate、can_arbitrage、break_even_futures_price；
+            sensitivities=True 时另含 SENSITIVITY_COLUMNS 各列（元/单位变动）
         """
+        import numpy as np
+
+        futures_price = _batch_column(scenarios, "futures_price", futures_price)
+        if futures_price is None:
+            raise ValueError("批量计算缺少必需参数: futures_price")
+        futures_price = np.asarray(futures_price, dtype=np.float64)
+
         # 如果未提供交割价格，默认使用期货价格
+        delivery_price = _batch_column(scenarios, "delivery_price", delivery_price)
         if delivery_price is None:
+            floating_delivery = True
             delivery_price = futures_price
-        
-        # 计算总成本
-        cost_result = self.calculate_total_cost(
+        else:
+            delivery_price = np.asarray(delivery_price, dtype=np.float64)
+            floating_delivery = np.isnan(delivery_price)
+            delivery_price = np.where(floating_delivery, futures_price, delivery_price)
+
+        columns = _total_cost_columns(
+            self.params if params is None else params,
+            scenarios,
             spot_price=spot_price,
             quantity_ton=quantity_ton,
             start_date=start_date,
@@ -498,35 +1839,50 @@ class TinDeliveryCostCalculator:
             delivery_price=delivery_price,
             **fee_kwargs
         )
-        
-        # 计算期货收入（不含增值税）
+        shape = np.broadcast_shapes(columns["spot_price"].shape, futures_price.shape)
+        if shape != columns["spot_price"].shape:
+            columns = {name: np.broadcast_to(value, shape) for name, value in columns.items()}
+        spot_price = columns["spot_price"]
+        quantity_ton = columns["quantity_ton"]
+        futures_price = np.broadcast_to(futures_price, shape)
+        timer = _stage_timer
+        if timer is not None:
+            timer, lap = timer.begin()
+
+        # 期货收入、不含增值税的总成本与利润
         futures_revenue = futures_price * quantity_ton
-        
-        # 计算总成本（不含增值税的现货成本）
-        total_cost_excl_vat = cost_result['summary']['total_cost'] - cost_result['cost_breakdown']['vat_amount']
-        
-        # 计算利润
+        total_cost_excl_vat = columns["total_cost"] - columns["vat_amount"]
         profit = futures_revenue - total_cost_excl_vat
-        profit_per_ton = profit / quantity_ton
-        
-        # 判断是否能套利
-        can_arbitrage = profit > 0
-        profit_rate = (profit / (spot_price * quantity_ton)) * 100 if spot_price > 0 else 0
-        
-        return {
-            **cost_result,
-            "arbitrage": {
-                "futures_price": futures_price,
-                "futures_revenue": futures_revenue,
-                "total_cost_excl_vat": total_cost_excl_vat,
-                "profit": profit,
-                "profit_per_ton": profit_per_ton,
-                "profit_rate": profit_rate,
-                "can_arbitrage": can_arbitrage,
-                "break_even_futures_price": cost_result['summary']['break_even_price']
-            }
-        }
-    
+
+        # 利润率 = 利润 / 现货基价 × 100（现货价格不为正时记为0）
+        profit_rate = np.zeros_like(profit)
+        np.divide(profit, columns["spot_cost_base"], out=profit_rate, where=spot_price > 0)
+        profit_rate *= 100
+
+        columns.update({
+            "futures_price": futures_price,
+            "futures_revenue": futures_revenue,
+            "total_cost_excl_vat": total_cost_excl_vat,
+            "profit": profit,
+            "profit_per_ton": profit / quantity_ton,
+            "profit_rate": profit_rate,
+            "can_arbitrage": profit > 0,
+            "break_even_futures_price": columns["break_even_price"]
+        })
+        if sensitivities:
+            columns.update(_profit_sensitivity_columns(
+                self.params if params is None else params, columns, floating_delivery
+            ))
+        if timer is not None:
+            lap = timer.lap("arbitrage", lap)
+        if _is_pandas(scenarios, "DataFrame"):
+            import pandas as pd
+
+            columns = pd.DataFrame(columns, index=scenarios.index)
+            if timer is not None:
+                timer.lap("result", lap)
+        return columns
+
     def print_cost_report(self, result: Dict[str, any]):
         """打印成本报告"""
         print("=" * 80)
@@ -582,5 +1938,6 @@ class TinDeliveryCostCalculator:
 
 
 if __name__ == "__main__":
-    calculator = TinDeliveryCostCalculator()
-    print("锡期现交割成本计算器已初始化")
+    # 命令行批量测算，见 tin_scenario_cli.py（python tin_delivery_cost_calculator.py --help）
+    from tin_scenario_cli import main
+    sys.exit(main())
@@ -0,0 +1,262 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+标量成本计算的融合内核（可选 Numba 加速）
+盘中报价监控、网页请求等只能逐笔计算的路径上，calculate_breakdown 的主要耗时是
+函数调用和结果对象的构建，而不是算术本身。这里把交割杂费、仓储费、资金利息和
+动态保证金平均的算术合并为一个只接收、返回浮点数的内核函数：
+安装了 numba 时用 numba.njit 编译，否则直接作为普通 Python 函数运行。
+运算顺序与 calculate_breakdown / MarginSchedule.average_rate 完全一致，结果逐位相同。
+
+设置环境变量 TIN_DISABLE_JIT=1 可强制使用纯 Python 版本。
+"""
+
+import os
+import weakref
+from datetime import datetime
+from functools import lru_cache
+from typing import NamedTuple, Optional
+
+from tin_delivery_cost_calculator import (
+    _BATCH_FEE_FIELDS,
+    MarginSchedule,
+    TinDeliveryParams,
+    _start_day
+)
+
+try:
+    if os.environ.get("TIN_DISABLE_JIT"):
+        raise ImportError
+    from numba import njit
+except ImportError:
+    njit = None
+
+# 当前使用的内核实现："numba" 或 "python"
+BACKEND = "python" if njit is None else "numba"
+
+
+def _jit(function):
+    """安装了 numba 时编译为机器码（缓存到 __pycache__），否则原样返回"""
+    if njit is None:
+        return function
+    return njit(cache=True, nogil=True)(function)
+
+
+@_jit
+def _cost_kernel(
+    spot_price, futures_price, delivery_price, quantity_ton, start_day, holding_days,
+    interest_rate, margin_rate, use_schedule, margin_addon,
+    delivery_day, schedule, fees, storage_fee_per_ton_per_day, vat_rate
+):
+    """
+    calculate_breakdown 的算术部分，以及按保证金阶梯计算平均保证金比例
+
+    参数:
+        start_day: 开始日期（纪元日，带时刻时为次日，同 MarginSchedule.average_rate）
+        holding_days: 持有天数（同 calculate_breakdown，不足一天的部分舍去）
+        use_schedule: 为真时按保证金阶梯计算 margin_rate 并加上 margin_addon；
+            delivery_day 为交割日（纪元日），schedule 为 MarginSchedule 整理后的有效区间
+            (区间终点, 比例, 截断终点, 完整项) 四行
+        fees: 已解析默认值后的七项按吨费率，顺序同 _BATCH_FEE_FIELDS
+
+    返回:
+        (保证金比例, 增值税, 交割杂费小计, 仓储费, 资金利息, 总成本, 盈亏平衡点, 利润, 利润率)
+    """
+    if use_schedule:
+        # 同 MarginSchedule.average_rate
+        total_days = delivery_day - start_day
+        if total_days == 0:
+            margin_rate = 0.20
+        else:
+            # bisect_right(ends, start_day)，区间最多4个，线性查找即可
+            ends = schedule[0]
+            k = 0
+            while k < len(ends) and ends[k] <= start_day:
+                k += 1
+            weighted_sum = 0.0
+            if k < len(ends):
+                weighted_sum = schedule[1][k] * (schedule[2][k] - start_day)
+                for i in range(k + 1, len(ends)):
+                    weighted_sum += schedule[3][i]
+            margin_rate = weighted_sum / total_days
+        margin_rate = max(0.0, margin_rate + margin_addon)
+
+    spot_cost_base = spot_price * quantity_ton
+    vat_amount = max(0.0, (delivery_price - spot_price) * quantity_ton * vat_rate)
+    spot_cost = spot_cost_base + vat_amount
+
+    total_misc_fees = (
+        fees[0] * quantity_ton
+        + fees[1] * quantity_ton
+        + fees[2] * quantity_ton
+        + fees[3] * quantity_ton
+        + fees[4] * quantity_ton
+        + fees[5] * quantity_ton
+        + fees[6] * quantity_ton
+    )
+    storage_cost = storage_fee_per_ton_per_day * quantity_ton * holding_days
+
+    interest_days = max(0, holding_days)
+    daily_rate = interest_rate / 365
+    futures_capital_amount = spot_price * quantity_ton * margin_rate
+    spot_interest_cost = spot_cost * daily_rate * interest_days
+    futures_interest_cost = max(0.0, futures_capital_amount * daily_rate * interest_days)
+    total_interest_cost = spot_interest_cost + futures_interest_cost
+
+    total_cost = spot_cost + total_misc_fees + storage_cost + total_interest_cost
+    break_even_price = spot_price + (total_cost - spot_cost) / quantity_ton
+
+    profit = futures_price * quantity_ton - (total_cost - vat_amount)
+    profit_rate = (profit / (spot_price * quantity_ton)) * 100 if spot_price > 0 else 0.0
+    return (
+        margin_rate, vat_amount, total_misc_fees, storage_cost, total_interest_cost,
+        total_cost, break_even_price, profit, profit_rate
+    )
+
+
+class KernelResult(NamedTuple):
+    """fast_check_arbitrage 的结果（数值与 check_arbitrage 对应字段逐位相同）"""
+    quantity_ton: float
+    holding_days: int
+    margin_rate: float          # 实际使用的保证金比例（含企业加收）
+    vat_amount: float
+    total_misc_fees: float
+    storage_cost: float
+    capital_cost: float         # 现货 + 期货资金利息
+    total_cost: float
+    break_even_price: float
+    profit: float
+    profit_rate: float
+
+    @property
+    def cost_per_ton(self) -> float:
+        return self.total_cost / self.quantity_ton
+
+    @property
+    def profit_per_ton(self) -> float:
+        return self.profit / self.quantity_ton
+
+    @property
+    def can_arbitrage(self) -> bool:
+        return self.profit > 0
+
+
+def _as_kernel_rows(rows):
+    """内核的数组参数：numba 下为 float64 数组（按元组传参时类型推断很慢），否则为元组"""
+    if njit is None:
+        return rows
+    import numpy as np
+    return np.array(rows, dtype=np.float64)
+
+
+# 未使用保证金阶梯时传给内核的占位区间（类型与真实区间一致，避免重新编译）
+_NO_SCHEDULE = (0, _as_kernel_rows(((0,), (0.0,), (0,), (0.0,))))
+
+# MarginSchedule 按对象（弱引用）缓存整理后的区间，阶梯对象被回收时条目随之删除
+_schedule_terms_cache: "weakref.WeakKeyDictionary[MarginSchedule, tuple]" = weakref.WeakKeyDictionary()
+
+
+def _schedule_terms(schedule: MarginSchedule) -> tuple:
+    """MarginSchedule 整理后的 (交割日, 有效区间)，按对象缓存"""
+    cached = _schedule_terms_cache.get(schedule)
+    if cached is None:
+        rows = (
+            tuple(schedule._ends),
+            tuple(float(rate) for rate in schedule._rates),
+            tuple(schedule._capped_ends),
+            tuple(float(term) for term in schedule._full_terms),
+        )
+        cached = (schedule._delivery_day, _as_kernel_rows(rows))
+        _schedule_terms_cache[schedule] = cached
+    return cached
+
+
+@lru_cache(maxsize=32)
+def _default_fees(params: TinDeliveryParams):
+    """参数集的默认费率（按参数值缓存，最多保留32个参数集）"""
+    return _fee_rows(params, {})
+
+
+# 最近一次使用的参数集及其默认费率：TinDeliveryParams 的哈希要遍历全部字段，
+# 连续使用同一个参数集时按对象比较即可，不必每次查 _default_fees
+_last_default_fees = (None, None)
+
+
+def _resolve_fees(params: TinDeliveryParams, fee_kwargs: dict):
+    """七项按吨费率；与 calculate_delivery_fees 一致，未提供或为0时使用默认值"""
+    global _last_default_fees
+    if not fee_kwargs:
+        last_params, fees = _last_default_fees
+        if last_params is not params:
+            fees = _default_fees(params)
+            _last_default_fees = (params, fees)
+        return fees
+    return _fee_rows(params, fee_kwargs)
+
+
+def _fee_rows(params: TinDeliveryParams, fee_kwargs: dict):
+    """按 _BATCH_FEE_FIELDS 的顺序解析七项按吨费率"""
+    unknown = set(fee_kwargs) - {name for name, _, _ in _BATCH_FEE_FIELDS}
+    if unknown:
+        raise TypeError(f"未知的费用参数: {', '.join(sorted(unknown))}")
+    fees = []
+    for name, default_attr, _ in _BATCH_FEE_FIELDS:
+        value = fee_kwargs.get(name)
+        if default_attr:
+            value = value or getattr(params, default_attr)
+        elif value is None:
+            value = 0.0
+        fees.append(float(value))
+    return _as_kernel_rows(fees)
+
+
+def fast_check_arbitrage(
+    params: TinDeliveryParams,
+    spot_price: float,
+    futures_price: float,
+    quantity_ton: float,
+    start_date: datetime,
+    end_date: datetime,
+    interest_rate: Optional[float] = None,
+    margin_rate: Optional[float] = None,
+    delivery_price: Optional[float] = None,
+    margin_schedule: Optional[MarginSchedule] = None,
+    enterprise_margin_addon: float = 0.0,
+    **fee_kwargs
+) -> KernelResult:
+    """
+    标量套利检查（融合内核版 check_arbitrage）
+
+    参数:
+        params: 交割参数（TinDeliveryParams）
+        spot_price / futures_price / quantity_ton / start_date / end_date /
+        interest_rate / delivery_price: 同 check_arbitrage
+        margin_rate: 期货保证金比例；为None且提供了 margin_schedule 时按保证金阶梯计算
+        margin_schedule: 动态保证金阶梯（MarginSchedule）
+        enterprise_margin_addon: 企业保证金加收比例（只在按保证金阶梯计算时加上）
+        其他费用参数：**fee_kwargs，见 calculate_delivery_fees
+
+    返回:
+        KernelResult
+    """
+    fees = _resolve_fees(params, fee_kwargs)
+    use_schedule = margin_rate is None and margin_schedule is not None
+    if use_schedule:
+        schedule = _schedule_terms(margin_schedule)
+        margin_rate = 0.0
+    else:
+        schedule = _NO_SCHEDULE
+        margin_rate = params.futures_margin_rate if margin_rate is None else max(0, margin_rate)
+    if interest_rate is None:
+        interest_rate = params.default_interest_rate
+    if delivery_price is None:
+        delivery_price = futures_price
+
+    holding_days = (end_date - start_date).days
+    amounts = _cost_kernel(
+        float(spot_price), float(futures_price), float(delivery_price), float(quantity_ton),
+        _start_day(start_date), holding_days,
+        float(interest_rate), float(margin_rate), use_schedule, float(enterprise_margin_addon),
+        *schedule, fees, params.storage_fee_per_ton_per_day, params.vat_rate
+    )
+    return KernelResult(quantity_ton, holding_days, *amounts)
@@ -0,0 +1,397 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+仓单组合
+持有的多笔仓单（每笔为 DELIVERY_UNIT_TON 的整数倍，买入日期、现货价格、对应合约各不相同）
+按列存放在数组中，一次批量计算每笔仓单持有到交割日的仓储费、资金利息、保证金占用、
+交割杂费和盈亏，并维护整个组合的合计。增删仓单、更新某些合约的期货价格时只计算
+涉及的仓单，合计按差额增减，不重算整个组合。
+
+用法:
+    portfolio = LotPortfolio(interest_rate=0.04)
+    portfolio.add_lots(read_lots("lots.csv"))
+    portfolio.mark_to_market({"sn2607": 252000})
+    print(portfolio.totals())
+    portfolio.lots()                    # 每笔仓单的成本与盈亏
+"""
+
+import os
+from typing import Dict, Iterable, Mapping, NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+from tin_contract_registry import DEFAULT_MARGIN_RATES, ContractRegistry, get_registry
+from tin_delivery_cost_calculator import (
+    DEFAULT_PARAMS,
+    TinDeliveryCostCalculator,
+    TinDeliveryParams
+)
+
+# 仓单清单的列（标准列名）；lot_id、quantity_ton、futures_price 可以省略：
+# lot_id 默认按顺序编号，quantity_ton 默认为一个交割单位，futures_price 可由 futures_prices 按合约提供
+LOT_COLUMNS = ("lot_id", "contract_code", "purchase_date", "spot_price", "quantity_ton", "futures_price")
+REQUIRED_LOT_COLUMNS = ("contract_code", "purchase_date", "spot_price")
+
+# 每笔仓单的计算结果列（取自 check_arbitrage_batch）
+LOT_RESULT_COLUMNS = (
+    "delivery_date",
+    "holding_days",
+    "margin_rate",
+    "spot_cost_base",
+    "vat_amount",
+    "total_misc_fees",
+    "storage_cost",
+    "spot_capital_amount",
+    "futures_capital_amount",
+    "capital_cost",
+    "total_cost",
+    "futures_revenue",
+    "total_cost_excl_vat",
+    "profit",
+    "profit_per_ton",
+    "profit_rate",
+    "can_arbitrage",
+    "break_even_futures_price",
+)
+
+
+class PortfolioTotals(NamedTuple):
+    """仓单组合的合计（金额单位：元）"""
+    lots: int                           # 仓单笔数
+    quantity_ton: float                 # 数量（吨）
+    spot_cost_base: float               # 现货基价
+    vat_amount: float                   # 增值税
+    total_misc_fees: float              # 交割杂费
+    storage_cost: float                 # 仓储费
+    spot_capital_amount: float          # 现货资金占用（含税现货成本）
+    futures_capital_amount: float       # 期货保证金占用
+    capital_cost: float                 # 资金利息
+    total_cost: float                   # 总成本
+    futures_revenue: float              # 期货收入
+    total_cost_excl_vat: float          # 不含增值税的总成本
+    profit: float                       # 利润
+
+    @property
+    def profit_per_ton(self) -> float:
+        return self.profit / self.quantity_ton if self.quantity_ton else 0.0
+
+    def to_dict(self) -> Dict[str, float]:
+        return dict(zip(self._fields, self))
+
+
+# 按差额增减的合计列（PortfolioTotals 中除笔数外的各项）
+TOTAL_COLUMNS = PortfolioTotals._fields[1:]
+
+# 各列的数据类型（仓单编号、合约代码为字符串）
+_COLUMN_DTYPES = {
+    "lot_id": object,
+    "contract_code": object,
+    "purchase_date": "datetime64[D]",
+    "spot_price": np.float64,
+    "quantity_ton": np.float64,
+    "futures_price": np.float64,
+    "delivery_date": "datetime64[D]",
+    "holding_days": np.int64,
+    "can_arbitrage": bool,
+}
+
+# 数组的初始容量（之后按需翻倍）
+_INITIAL_CAPACITY = 64
+
+
+def read_lots(path: str, column_map: Optional[Dict[str, str]] = None) -> pd.DataFrame:
+    """
+    读取仓单清单
+
+    参数:
+        path: CSV 或 Excel（.xlsx/.xls）文件路径，或 Streamlit 上传的文件对象（按 name 判断格式）
+        column_map: 标准列名 -> 文件列名，如 {"contract_code": "合约", "spot_price": "买入价"}
+
+    返回:
+        DataFrame，列名为 LOT_COLUMNS 中的标准列名（其余列忽略）
+    """
+    name = path if isinstance(path, str) else getattr(path, "name", "")
+    if os.path.splitext(name)[1].lower() in (".xlsx", ".xls"):
+        lots = pd.read_excel(path)
+    else:
+        lots = pd.read_csv(path)
+    if column_map:
+        lots = lots.rename(columns={source: name for name, source in column_map.items()})
+    return lots[[name for name in LOT_COLUMNS if name in lots]]
+
+
+class LotPortfolio:
+    """
+    仓单组合（列式存储，增量维护合计）
+
+    每笔仓单视为在买入日期买入现货、持有到对应合约的交割日期并以期货价格交割；
+    交割日期和动态保证金按合约信息表确定。资金利率、保证金比例、交割杂费和交割参数
+    在组合内统一，修改它们需要新建组合。
+    """
+
+    def __init__(
+        self,
+        params: TinDeliveryParams = DEFAULT_PARAMS,
+        interest_rate: Optional[float] = None,
+        enterprise_margin_addon: float = 0.0,
+        margin_rates: Iterable[float] = DEFAULT_MARGIN_RATES,
+        fee_kwargs: Optional[Dict[str, float]] = None,
+        registry: Optional[ContractRegistry] = None,
+        calculator: Optional[TinDeliveryCostCalculator] = None
+    ):
+        """
+        参数:
+            params: 交割参数
+            interest_rate: 资金利率（年化），默认使用params.default_interest_rate
+            enterprise_margin_addon: 企业保证金加收比例
+            margin_rates: 四档保证金比例
+            fee_kwargs: 交割杂费参数，见 calculate_delivery_fees
+            registry: 合约信息表，默认使用 get_registry()
+            calculator: 计算器，默认新建一个
+        """
+        self.params = params
+        self.interest_rate = interest_rate
+        self.enterprise_margin_addon = enterprise_margin_addon
+        self.margin_rates = tuple(margin_rates)
+        self.fee_kwargs = dict(fee_kwargs or {})
+        self.registry = get_registry() if registry is None else registry
+        self.calculator = TinDeliveryCostCalculator(params) if calculator is None else calculator
+
+        self._size = 0
+        self._next_id = 1
+        self._lot_ids = set()
+        self._columns = {
+            name: np.empty(_INITIAL_CAPACITY, dtype=_COLUMN_DTYPES.get(name, np.float64))
+            for name in LOT_COLUMNS + LOT_RESULT_COLUMNS
+        }
+        self._totals = np.zeros(len(TOTAL_COLUMNS))
+
+    def __len__(self) -> int:
+        return self._size
+
+    def column(self, name: str) -> np.ndarray:
+        """某一列的只读视图（LOT_COLUMNS 或 LOT_RESULT_COLUMNS）"""
+        view = self._columns[name][:self._size]
+        view.flags.writeable = False
+        return view
+
+    def add_lots(
+        self,
+        lots: pd.DataFrame,
+        futures_prices: Optional[Mapping[str, float]] = None
+    ) -> np.ndarray:
+        """
+        加入一批仓单，只计算新加入的仓单
+
+        参数:
+            lots: 仓单清单，列见 LOT_COLUMNS（contract_code、purchase_date、spot_price 必需）
+            futures_prices: 合约代码 -> 期货价格，用于清单中没有期货价格的仓单
+
+        返回:
+            新加入仓单的编号数组
+
+        异常:
+            ValueError: 缺少必需列、编号重复、合约未知、买入日期缺失或晚于交割日期、
+                现货价格缺失或不为正数、数量不是交割单位的正整数倍，或仓单没有期货价格
+        """
+        missing = [name for name in REQUIRED_LOT_COLUMNS if name not in lots]
+        if missing:
+            raise ValueError(f"仓单清单缺少列: {', '.join(missing)}")
+        count = len(lots)
+        if count == 0:
+            return np.empty(0, dtype=object)
+
+        if "lot_id" in lots:
+            lot_id = lots["lot_id"].astype(str).to_numpy(dtype=object)
+        else:
+            lot_id = np.array([str(number) for number in range(self._next_id, self._next_id + count)], dtype=object)
+        if len(set(lot_id)) < count or not self._lot_ids.isdisjoint(lot_id):
+            raise ValueError("仓单编号重复")
+
+        # 合约代码规范化（去空格、转小写），未知合约报错
+        codes, uniques = pd.factorize(lots["contract_code"].astype(str))
+        infos = self.registry.get_many(uniques)
+        unknown = [code for code, info in zip(uniques, infos) if info is None]
+        if unknown:
+            raise ValueError(f"未知合约: {', '.join(unknown)}")
+        contract_code = np.array([info.code for info in infos], dtype=object)[codes]
+        delivery_date = np.array([info.delivery_date for info in infos], dtype="datetime64[D]")[codes]
+
+        purchase_date = pd.to_datetime(lots["purchase_date"]).to_numpy(dtype="datetime64[D]")
+        # NaT 与任何日期比较都为假，需要单独检查
+        undated = np.isnat(purchase_date)
+        if undated.any():
+            raise ValueError(f"仓单没有买入日期: {', '.join(lot_id[undated][:10])}")
+        late = purchase_date > delivery_date
+        if late.any():
+            raise ValueError(f"仓单买入日期晚于交割日期: {', '.join(lot_id[late][:10])}")
+
+        spot_price = pd.to_numeric(lots["spot_price"], errors="coerce").to_numpy(dtype=np.float64)
+        unpriced = ~(spot_price > 0)
+        if unpriced.any():
+            raise ValueError(f"仓单现货价格缺失或不为正数: {', '.join(lot_id[unpriced][:10])}")
+
+        unit = self.params.delivery_unit_ton
+        if "quantity_ton" in lots:
+            quantity_ton = pd.to_numeric(lots["quantity_ton"], errors="coerce").to_numpy(dtype=np.float64)
+            quantity_ton = np.where(np.isnan(quantity_ton), unit, quantity_ton)
+        else:
+            quantity_ton = np.full(count, unit)
+        units = quantity_ton / unit
+        invalid = (units < 1) | (units != np.round(units))
+        if invalid.any():
+            raise ValueError(f"仓单数量应为 {unit:g} 吨的正整数倍: {', '.join(lot_id[invalid][:10])}")
+
+        if "futures_price" in lots:
+            futures_price = pd.to_numeric(lots["futures_price"], errors="coerce").to_numpy(dtype=np.float64)
+        else:
+            futures_price = np.full(count, np.nan)
+        if futures_prices:
+            prices = self._contract_prices(futures_prices)
+            quoted = np.array([prices.get(info.code, np.nan) for info in infos], dtype=np.float64)[codes]
+            futures_price = np.where(np.isnan(futures_price), quoted, futures_price)
+        if np.isnan(futures_price).any():
+            raise ValueError(f"仓单没有期货价格: {', '.join(lot_id[np.isnan(futures_price)][:10])}")
+
+        inputs = {
+            "lot_id": lot_id,
+            "contract_code": contract_code,
+            "purchase_date": purchase_date,
+            "spot_price": spot_price,
+            "quantity_ton": quantity_ton,
+            "futures_price": futures_price,
+        }
+        results = self._evaluate(inputs, delivery_date)
+
+        self._reserve(self._size + count)
+        rows = slice(self._size, self._size + count)
+        for name, values in {**inputs, **results}.items():
+            self._columns[name][rows] = values
+        self._size += count
+        self._next_id += count
+        self._lot_ids.update(lot_id)
+        self._totals += self._sums({**inputs, **results})
+        return lot_id
+
+    def remove_lots(self, lot_ids: Iterable) -> int:
+        """
+        移出仓单（未知编号忽略），合计减去移出仓单的金额
+
+        参数:
+            lot_ids: 仓单编号序列；单个编号（字符串或数字）视为只移出这一笔
+
+        返回:
+            实际移出的笔数
+        """
+        # 字符串本身可迭代，不能按字符拆成多个编号
+        if isinstance(lot_ids, (str, bytes)) or not isinstance(lot_ids, Iterable):
+            lot_ids = [lot_ids]
+        removed = np.isin(self.column("lot_id"), [str(lot_id) for lot_id in lot_ids])
+        count = int(removed.sum())
+        if count == 0:
+            return 0
+        self._totals -= self._sums({name: self._columns[name][:self._size][removed] for name in TOTAL_COLUMNS})
+        self._lot_ids.difference_update(self._columns["lot_id"][:self._size][removed])
+        keep = ~removed
+        for name, column in self._columns.items():
+            column[:self._size - count] = column[:self._size][keep]
+        self._size -= count
+        if self._size == 0:
+            # 全部移出后合计归零，不留浮点误差
+            self._totals[:] = 0.0
+        return count
+
+    def mark_to_market(self, futures_prices: Mapping[str, float]) -> int:
+        """
+        按合约更新期货价格，只重算这些合约的仓单，合计按差额调整
+
+        参数:
+            futures_prices: 合约代码 -> 期货价格（未持有的合约忽略）
+
+        返回:
+            重算的仓单笔数
+        """
+        prices = self._contract_prices(futures_prices)
+        rows = np.flatnonzero(np.isin(self.column("contract_code"), list(prices)))
+        if len(rows) == 0:
+            return 0
+        inputs = {name: self._columns[name][rows] for name in LOT_COLUMNS}
+        inputs["futures_price"] = np.array([prices[code] for code in inputs["contract_code"]])
+        results = self._evaluate(inputs, self._columns["delivery_date"][rows])
+        self._totals += self._sums({**inputs, **results}) - self._sums(
+            {name: self._columns[name][rows] for name in TOTAL_COLUMNS}
+        )
+        self._columns["futures_price"][rows] = inputs["futures_price"]
+        for name, values in results.items():
+            self._columns[name][rows] = values
+        return len(rows)
+
+    def totals(self) -> PortfolioTotals:
+        """组合合计（增删仓单时按差额维护，不重新求和）"""
+        return PortfolioTotals(self._size, *self._totals.tolist())
+
+    def lots(self) -> pd.DataFrame:
+        """每笔仓单的输入与计算结果，列为 LOT_COLUMNS + LOT_RESULT_COLUMNS"""
+        return pd.DataFrame({
+            name: self._columns[name][:self._size].copy()
+            for name in LOT_COLUMNS + LOT_RESULT_COLUMNS
+        })
+
+    def by_contract(self) -> pd.DataFrame:
+        """按合约汇总：笔数、数量、各项成本和利润（按合约代码排序）"""
+        lots = self.lots()
+        grouped = lots.groupby("contract_code", sort=True)
+        summary = grouped[list(TOTAL_COLUMNS)].sum()
+        summary.insert(0, "lots", grouped.size())
+        summary["profit_per_ton"] = summary["profit"] / summary["quantity_ton"]
+        return summary
+
+    def _evaluate(self, inputs: Dict[str, np.ndarray], delivery_date: np.ndarray) -> Dict[str, np.ndarray]:
+        """批量计算一组仓单（动态保证金按合约分组，每个合约的保证金阶梯对整组买入日期一次算出）"""
+        codes, uniques = pd.factorize(inputs["contract_code"])
+        margin_rate = np.empty(len(codes))
+        for position, code in enumerate(uniques):
+            rows = codes == position
+            schedule = self.registry[code].margin_schedule(*self.margin_rates)
+            margin_rate[rows] = schedule.average_rates(
+                inputs["purchase_date"][rows], self.enterprise_margin_addon
+            )
+        result = self.calculator.check_arbitrage_batch(
+            spot_price=inputs["spot_price"],
+            futures_price=inputs["futures_price"],
+            quantity_ton=inputs["quantity_ton"],
+            start_date=inputs["purchase_date"],
+            end_date=delivery_date,
+            interest_rate=self.interest_rate,
+            margin_rate=margin_rate,
+            params=self.params,
+            **self.fee_kwargs
+        )
+        results = {name: result[name] for name in LOT_RESULT_COLUMNS if name in result}
+        results["delivery_date"] = delivery_date
+        return results
+
+    def _contract_prices(self, futures_prices: Mapping[str, float]) -> Dict[str, float]:
+        """合约代码 -> 价格，代码按合约信息表规范化（未知合约忽略）"""
+        prices = {}
+        for info, price in zip(self.registry.get_many(futures_prices), futures_prices.values()):
+            if info is not None:
+                prices[info.code] = float(price)
+        return prices
+
+    @staticmethod
+    def _sums(columns: Dict[str, np.ndarray]) -> np.ndarray:
+        return np.array([columns[name].sum() for name in TOTAL_COLUMNS])
+
+    def _reserve(self, size: int):
+        """保证各列容量不小于 size（容量按倍数增长，追加仓单的均摊开销为常数）"""
+        capacity = len(self._columns["lot_id"])
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+        for name, column in self._columns.items():
+            grown = np.empty(capacity, dtype=column.dtype)
+            grown[:self._size] = column[:self._size]
+            self._columns[name] = grown
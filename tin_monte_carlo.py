@@ -0,0 +1,297 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+期现套利损益的蒙特卡洛模拟
+现货在开始日期买入、价格已锁定，期货空头的保证金和逐日结算资金却随期货价格变化：
+按几何布朗运动模拟 N 条期货价格路径，逐日计算保证金占用（按动态保证金阶梯）、
+资金成本以及交割日结算的增值税，得到到期损益分布、VaR 和亏损概率。
+
+路径按批生成（每批一个独立的随机数子序列），内存占用只与批大小有关；
+设置 workers 时各批分给多个进程并行计算，结果与单进程相同。
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, Optional
+
+import numpy as np
+
+from tin_delivery_cost_calculator import (
+    DEFAULT_PARAMS,
+    MarginSchedule,
+    TinDeliveryParams,
+    calculate_breakdown
+)
+
+# 默认模拟路径数
+DEFAULT_PATHS = 100_000
+
+# 每批模拟的路径数（每批约占用 批大小 × 持有天数 × 8 字节 × 几个数组）
+DEFAULT_BATCH_PATHS = 10_000
+
+# 默认期货价格年化波动率
+DEFAULT_VOLATILITY = 0.20
+
+# summary() 默认给出的 VaR 置信水平
+DEFAULT_VAR_LEVELS = (0.95, 0.99)
+
+
+class MonteCarloResult:
+    """
+    蒙特卡洛模拟结果
+
+    属性:
+        profit: 每条路径的到期利润（元）
+        futures_capital_cost: 每条路径的期货资金成本（保证金 + 逐日结算占用的利息，元）
+        final_futures_price: 每条路径交割日的期货价格（元/吨）
+        deterministic_profit: 期货价格不变时的利润（元）
+    """
+
+    __slots__ = ("profit", "futures_capital_cost", "final_futures_price", "deterministic_profit")
+
+    def __init__(
+        self,
+        profit: np.ndarray,
+        futures_capital_cost: np.ndarray,
+        final_futures_price: np.ndarray,
+        deterministic_profit: float
+    ):
+        self.profit = profit
+        self.futures_capital_cost = futures_capital_cost
+        self.final_futures_price = final_futures_price
+        self.deterministic_profit = deterministic_profit
+
+    @property
+    def paths(self) -> int:
+        """路径数"""
+        return len(self.profit)
+
+    @property
+    def probability_of_loss(self) -> float:
+        """亏损（利润 < 0）的概率"""
+        return float(np.mean(self.profit < 0))
+
+    def value_at_risk(self, level: float = 0.95) -> float:
+        """
+        在险价值（VaR）：置信水平 level 下的最大亏损，按利润分布的 1 - level 分位数计算
+
+        返回:
+            VaR（元，正数表示亏损；最差情况仍盈利时为负数）
+        """
+        return float(-np.quantile(self.profit, 1 - level))
+
+    def expected_shortfall(self, level: float = 0.95) -> float:
+        """预期亏损（ES/CVaR）：利润低于 1 - level 分位数的路径的平均亏损（元）"""
+        threshold = np.quantile(self.profit, 1 - level)
+        return float(-self.profit[self.profit <= threshold].mean())
+
+    def histogram(self, bins: int = 50) -> tuple:
+        """利润分布直方图，返回 (各区间路径数, 区间边界)"""
+        return np.histogram(self.profit, bins=bins)
+
+    def summary(self, levels=DEFAULT_VAR_LEVELS) -> Dict[str, float]:
+        """
+        汇总指标
+
+        返回:
+            字典：paths、deterministic_profit、mean_profit、std_profit、min_profit、
+            max_profit、probability_of_loss、mean_futures_capital_cost，
+            以及每个置信水平的 var_95 / es_95 等
+        """
+        summary = {
+            "paths": self.paths,
+            "deterministic_profit": self.deterministic_profit,
+            "mean_profit": float(self.profit.mean()),
+            "std_profit": float(self.profit.std()),
+            "min_profit": float(self.profit.min()),
+            "max_profit": float(self.profit.max()),
+            "probability_of_loss": self.probability_of_loss,
+            "mean_futures_capital_cost": float(self.futures_capital_cost.mean()),
+        }
+        for level in levels:
+            suffix = f"{level * 100:g}".replace(".", "_")
+            summary[f"var_{suffix}"] = self.value_at_risk(level)
+            summary[f"es_{suffix}"] = self.expected_shortfall(level)
+        return summary
+
+    def __repr__(self):
+        return (
+            f"MonteCarloResult(paths={self.paths}, mean_profit={self.profit.mean():.2f}, "
+            f"probability_of_loss={self.probability_of_loss:.4f})"
+        )
+
+
+def _simulate_batch(
+    seed: np.random.SeedSequence,
+    paths: int,
+    futures_price: float,
+    volatility: float,
+    drift: float,
+    daily_margin_rates: np.ndarray,
+    daily_rate: float,
+    spot_price: float,
+    quantity_ton: float,
+    vat_rate: float,
+    fixed_cost: float,
+    spot_capital_base: float,
+    interest_days: int
+) -> tuple:
+    """
+    模拟一批路径（模块级函数，供进程池调用）
+
+    返回:
+        (利润, 期货资金成本, 交割日期货价格)
+    """
+    rng = np.random.default_rng(seed)
+    days = len(daily_margin_rates)
+    dt = 1 / 365
+    # 对数价格增量，第 i 列为第 i 天到第 i+1 天
+    increments = rng.standard_normal((paths, days))
+    increments *= volatility * np.sqrt(dt)
+    increments += (drift - 0.5 * volatility ** 2) * dt
+    np.cumsum(increments, axis=1, out=increments)
+    prices = np.exp(increments, out=increments)
+    prices *= futures_price
+
+    # 第 t 天计息的占用资金按当天开始时的价格：第0天为建仓价格，之后取前一天的模拟价格
+    final_price = prices[:, -1].copy()
+    opening = np.empty_like(prices)
+    opening[:, 0] = futures_price
+    opening[:, 1:] = prices[:, :-1]
+    # 期货空头的占用资金 = 保证金 + 逐日结算亏损（价格上涨时追加，下跌时释放），不为负
+    funding = opening * (daily_margin_rates + 1)
+    funding -= futures_price
+    np.maximum(funding, 0, out=funding)
+    futures_capital_cost = funding.sum(axis=1) * quantity_ton * daily_rate
+
+    # 交割日按期货结算价交割：增值税随交割价格变化，并占用现货资金
+    vat_amount = np.maximum(0, (final_price - spot_price) * quantity_ton * vat_rate)
+    spot_capital_cost = (spot_capital_base + vat_amount) * daily_rate * interest_days
+
+    # 与 check_arbitrage 一致：利润 = 期货收入 - 不含增值税的总成本
+    profit = futures_price * quantity_ton - (fixed_cost + spot_capital_cost + futures_capital_cost)
+    return profit, futures_capital_cost, final_price
+
+
+def simulate_pnl(
+    spot_price: float,
+    futures_price: float,
+    quantity_ton: float,
+    start_date: datetime,
+    end_date: datetime,
+    params: TinDeliveryParams = DEFAULT_PARAMS,
+    paths: int = DEFAULT_PATHS,
+    volatility: float = DEFAULT_VOLATILITY,
+    drift: float = 0.0,
+    interest_rate: Optional[float] = None,
+    margin_rate: Optional[float] = None,
+    margin_schedule: Optional[MarginSchedule] = None,
+    enterprise_margin_addon: float = 0.0,
+    seed: Optional[int] = None,
+    batch_size: int = DEFAULT_BATCH_PATHS,
+    workers: Optional[int] = None,
+    **fee_kwargs
+) -> MonteCarloResult:
+    """
+    模拟持有到交割的期现套利到期损益分布
+
+    期货价格按几何布朗运动逐日（自然日）模拟；每天的期货资金占用为
+    当天保证金比例 × 期货价格 + 逐日结算的累计亏损，按资金利率计息。
+    交割时按最后的期货价格结算，期货头寸的逐日结算盈亏与交割收入合计仍为建仓价格，
+    因此价格路径通过资金成本和增值税（按交割价格计算）影响利润。
+    波动率为0时结果与 check_arbitrage（交割价格等于期货价格、保证金按期货价格计算）一致。
+
+    参数:
+        spot_price: 现货价格（元/吨），开始日期买入
+        futures_price: 建仓时的期货价格（元/吨）
+        quantity_ton: 数量（吨）
+        start_date: 开始日期
+        end_date: 交割日期
+        params: 交割参数
+        paths: 模拟路径数
+        volatility: 期货价格年化波动率
+        drift: 期货价格年化漂移率（默认0）
+        interest_rate: 资金利率（年化），默认使用params.default_interest_rate
+        margin_rate: 固定的期货保证金比例，默认使用params.futures_margin_rate
+        margin_schedule: 动态保证金阶梯；提供时按天取各阶段比例（优先于 margin_rate），
+            只取开始日期到结束日期之间的天数，交割日之后比例为0
+        enterprise_margin_addon: 企业保证金加收比例（与 margin_schedule 一起使用）
+        seed: 随机数种子；相同种子和批大小下，单进程与多进程结果相同
+        batch_size: 每批路径数
+        workers: 并行进程数，为None或1时在当前进程内计算
+        其他费用参数：**fee_kwargs，见 calculate_delivery_fees
+
+    返回:
+        MonteCarloResult
+    """
+    if paths <= 0:
+        raise ValueError("模拟路径数必须大于0")
+    if batch_size <= 0:
+        raise ValueError("每批路径数必须大于0")
+    if interest_rate is None:
+        interest_rate = params.default_interest_rate
+    raw_days = (end_date - start_date).days
+    interest_days = max(raw_days, 0)
+    if margin_schedule is not None:
+        daily_margin_rates = margin_schedule.daily_rates(start_date, enterprise_margin_addon)
+        # 阶梯按天排到交割日，路径长度须与仓储费、利息的天数一致：结束日期早于交割日时截断，
+        # 晚于交割日时交割后不再占用保证金
+        if len(daily_margin_rates) >= interest_days:
+            daily_margin_rates = daily_margin_rates[:interest_days]
+        else:
+            daily_margin_rates = np.concatenate(
+                [daily_margin_rates, np.zeros(interest_days - len(daily_margin_rates))]
+            )
+    else:
+        rate = params.futures_margin_rate if margin_rate is None else max(0, margin_rate)
+        daily_margin_rates = np.full(interest_days, rate)
+    if len(daily_margin_rates) == 0:
+        raise ValueError("交割日期必须晚于开始日期")
+
+    # 与价格路径无关的成本：现货基价、交割杂费、仓储费（交割价格等于现货价格时增值税为0）
+    fixed = calculate_breakdown(
+        params, spot_price, None, quantity_ton, start_date, end_date,
+        interest_rate=interest_rate, margin_rate=0.0, **fee_kwargs
+    ).total
+    fixed_cost = fixed.spot_cost_base + fixed.total_misc_fees + fixed.storage_cost
+    batch_args = (
+        futures_price,
+        volatility,
+        drift,
+        daily_margin_rates,
+        interest_rate / 365,
+        spot_price,
+        quantity_ton,
+        params.vat_rate,
+        fixed_cost,
+        fixed.spot_cost_base,
+        interest_days
+    )
+
+    sizes = [batch_size] * (paths // batch_size)
+    if paths % batch_size:
+        sizes.append(paths % batch_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    if workers is not None and workers > 1 and len(sizes) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(_simulate_batch, batch_seed, size, *batch_args)
+                for batch_seed, size in zip(seeds, sizes)
+            ]
+            batches = [future.result() for future in futures]
+    else:
+        batches = [
+            _simulate_batch(batch_seed, size, *batch_args)
+            for batch_seed, size in zip(seeds, sizes)
+        ]
+
+    # 期货价格不变时的利润（同一套公式，便于与模拟结果对照）
+    flat_profit, _, _ = _simulate_batch(
+        np.random.SeedSequence(0), 1, futures_price, 0.0, 0.0, *batch_args[3:]
+    )
+    return MonteCarloResult(
+        profit=np.concatenate([batch[0] for batch in batches]),
+        futures_capital_cost=np.concatenate([batch[1] for batch in batches]),
+        final_futures_price=np.concatenate([batch[2] for batch in batches]),
+        deterministic_profit=float(flat_profit[0])
+    )
@@ -0,0 +1,226 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+多进程批量计算
+把场景表按行分片交给进程池，各进程调用 check_arbitrage_batch 计算自己的行区间。
+输入列和结果列都放在共享内存（multiprocessing.shared_memory）中，进程间只传递
+共享内存名称和行区间，不序列化 DataFrame；每行的计算与单进程完全相同，
+因此结果逐位一致，与分片大小、进程数无关。
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from tin_delivery_cost_calculator import (
+    _BATCH_FEE_FIELDS,
+    TinDeliveryCostCalculator,
+    TinDeliveryParams
+)
+
+# 每个分片的行数（每个任务处理的行区间大小）
+DEFAULT_SHARD_ROWS = 250_000
+
+# 场景表中参与计算的列（其余列忽略）
+SCENARIO_COLUMNS = (
+    "spot_price",
+    "futures_price",
+    "quantity_ton",
+    "start_date",
+    "end_date",
+    "interest_rate",
+    "margin_rate",
+    "delivery_price",
+) + tuple(name for name, _, _ in _BATCH_FEE_FIELDS)
+
+_DATE_COLUMNS = ("start_date", "end_date")
+
+# 列在共享内存中按8字节对齐
+_ALIGNMENT = 8
+
+
+class SharedColumns:
+    """
+    放在同一块共享内存中的一组等长列
+
+    layout 记录每列的 (列名, dtype, 字节偏移)，与共享内存名称、行数一起即可在
+    其他进程中重建同样的 NumPy 视图（见 spec / attach）。
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, layout: tuple, rows: int, owner: bool):
+        self.shm = shm
+        self.layout = layout
+        self.rows = rows
+        self._owner = owner
+
+    @classmethod
+    def create(cls, dtypes: Dict[str, np.dtype], rows: int) -> "SharedColumns":
+        """按 {列名: dtype} 分配一块新的共享内存"""
+        layout = []
+        offset = 0
+        for name, dtype in dtypes.items():
+            dtype = np.dtype(dtype)
+            layout.append((name, dtype.str, offset))
+            size = dtype.itemsize * rows
+            offset += -(-size // _ALIGNMENT) * _ALIGNMENT
+        shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+        return cls(shm, tuple(layout), rows, owner=True)
+
+    @classmethod
+    def attach(cls, spec: tuple) -> "SharedColumns":
+        """在其他进程中按 spec() 的结果连接到同一块共享内存"""
+        name, layout, rows = spec
+        # 进程池的子进程与创建方共用同一个 resource_tracker，重复登记不会产生新记录；
+        # 这里不能取消登记，否则创建方 unlink 时会找不到记录（由创建方负责释放）
+        shm = shared_memory.SharedMemory(name=name)
+        return cls(shm, layout, rows, owner=False)
+
+    def spec(self) -> tuple:
+        """(共享内存名称, 列布局, 行数)，可跨进程传递"""
+        return self.shm.name, self.layout, self.rows
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        """{列名: 共享内存上的 NumPy 视图}"""
+        return {
+            name: np.ndarray((self.rows,), dtype=np.dtype(dtype), buffer=self.shm.buf, offset=offset)
+            for name, dtype, offset in self.layout
+        }
+
+    def write(self, arrays: Dict[str, np.ndarray]):
+        """把 {列名: 数组} 复制进共享内存"""
+        for name, values in self.arrays().items():
+            values[:] = arrays[name]
+
+    def read(self) -> Dict[str, np.ndarray]:
+        """{列名: 数组副本}（共享内存释放后仍然有效）"""
+        return {name: values.copy() for name, values in self.arrays().items()}
+
+    def close(self):
+        """断开连接；创建方同时释放共享内存"""
+        self.shm.close()
+        if self._owner:
+            self.shm.unlink()
+
+
+def _scenario_arrays(scenarios: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """场景表中参与计算的列 -> 数值数组（日期统一为 datetime64[s]，其余为 float64）"""
+    arrays = {}
+    for name in SCENARIO_COLUMNS:
+        if name not in scenarios:
+            continue
+        if name in _DATE_COLUMNS:
+            arrays[name] = pd.to_datetime(scenarios[name]).to_numpy(dtype="datetime64[s]")
+        else:
+            arrays[name] = pd.to_numeric(scenarios[name]).to_numpy(dtype=np.float64)
+    return arrays
+
+
+# 工作进程内的状态（由 _init_worker 设置）
+_worker_state: Dict[str, object] = {}
+
+
+def _init_worker(input_spec: tuple, output_spec: tuple, params: TinDeliveryParams, batch_kwargs: Dict):
+    """工作进程初始化：连接输入/输出共享内存，只做一次"""
+    inputs = SharedColumns.attach(input_spec)
+    outputs = SharedColumns.attach(output_spec)
+    _worker_state.update(
+        inputs=inputs,
+        outputs=outputs,
+        input_arrays=inputs.arrays(),
+        output_arrays=outputs.arrays(),
+        calculator=TinDeliveryCostCalculator(params),
+        batch_kwargs=batch_kwargs
+    )
+
+
+def _evaluate_rows(
+    calculator: TinDeliveryCostCalculator,
+    input_arrays: Dict[str, np.ndarray],
+    output_arrays: Dict[str, np.ndarray],
+    start: int,
+    stop: int,
+    batch_kwargs: Dict
+) -> int:
+    """计算 [start, stop) 行，结果写入输出列"""
+    columns = calculator.check_arbitrage_batch(
+        **{name: values[start:stop] for name, values in input_arrays.items()},
+        **batch_kwargs
+    )
+    for name, values in output_arrays.items():
+        values[start:stop] = columns[name]
+    return stop - start
+
+
+def _run_shard(start: int, stop: int) -> int:
+    """进程池任务：计算一个行区间"""
+    state = _worker_state
+    return _evaluate_rows(
+        state["calculator"], state["input_arrays"], state["output_arrays"],
+        start, stop, state["batch_kwargs"]
+    )
+
+
+def check_arbitrage_parallel(
+    scenarios: pd.DataFrame,
+    workers: Optional[int] = None,
+    params: Optional[TinDeliveryParams] = None,
+    shard_rows: int = DEFAULT_SHARD_ROWS,
+    **batch_kwargs
+) -> pd.DataFrame:
+    """
+    多进程批量检查是否能套利（结果与 check_arbitrage_batch 逐位相同）
+
+    参数:
+        scenarios: 场景表，列名与 check_arbitrage_batch 的参数名一致（见 SCENARIO_COLUMNS）
+        workers: 进程数，默认为 CPU 核数；为1或只有一个分片时在当前进程内计算
+        params: 交割参数，默认使用 DEFAULT_PARAMS
+        shard_rows: 每个分片的行数
+        **batch_kwargs: 对所有行相同的标量参数（如 interest_rate=0.04），
+            与场景表中的同名列不能同时提供
+
+    返回:
+        与场景表同索引的 DataFrame，列同 check_arbitrage_batch
+    """
+    calculator = TinDeliveryCostCalculator(params)
+    input_arrays = _scenario_arrays(scenarios)
+    duplicated = set(input_arrays) & set(batch_kwargs)
+    if duplicated:
+        raise TypeError(f"参数与场景表的列重复: {', '.join(sorted(duplicated))}")
+    rows = len(scenarios)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 1 or rows <= shard_rows:
+        return pd.DataFrame(
+            calculator.check_arbitrage_batch(**input_arrays, **batch_kwargs),
+            index=scenarios.index
+        )
+
+    # 先算第一行，确定结果的列名和类型
+    probe = calculator.check_arbitrage_batch(
+        **{name: values[:1] for name, values in input_arrays.items()}, **batch_kwargs
+    )
+    inputs = SharedColumns.create({name: values.dtype for name, values in input_arrays.items()}, rows)
+    outputs = SharedColumns.create({name: values.dtype for name, values in probe.items()}, rows)
+    try:
+        inputs.write(input_arrays)
+        del input_arrays
+
+        bounds = [(start, min(start + shard_rows, rows)) for start in range(0, rows, shard_rows)]
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(bounds)),
+            initializer=_init_worker,
+            initargs=(inputs.spec(), outputs.spec(), calculator.params, batch_kwargs)
+        ) as executor:
+            done = sum(executor.map(_run_shard, *zip(*bounds)))
+        if done != rows:
+            raise RuntimeError(f"并行计算只完成了 {done}/{rows} 行")
+
+        # 复制出共享内存后再释放
+        return pd.DataFrame(outputs.read(), index=scenarios.index)
+    finally:
+        inputs.close()
+        outputs.close()
@@ -50,6 +50,10 @@ DEFAULT_INTEREST_RATE = 0.05  # 5%
 # 期货保证金比例
 FUTURES_MARGIN_RATE = 0.10  # 10%
 
+# 合约信息表覆盖的交割年份范围（含首尾）
+CONTRACT_FIRST_YEAR = 2020
+CONTRACT_LAST_YEAR = 2035
+
 # ========== 参数说明 ==========
 """
 参数更新说明：
@@ -0,0 +1,197 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+分阶段计时与性能分析
+按阶段（动态保证金、交割杂费、仓储费、资金利息、汇总、套利结果、结果构建）
+累计 TinDeliveryCostCalculator 各计算路径的耗时和调用次数，可同时用 cProfile 采集
+完整的调用数据。默认关闭：未开启时各计算路径只多一次判断。
+
+用法:
+    with profile_stages(cprofile=True) as report:
+        calculator.check_arbitrage(...)
+    print(report.format())
+    report.save("stages.json")          # 或 report.dump_stats("run.pstats")
+"""
+
+import cProfile
+import io
+import json
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, NamedTuple, Optional
+
+import tin_delivery_cost_calculator
+
+# 阶段 -> 说明（顺序即报告中的顺序）
+STAGES = {
+    "margin": "动态保证金",
+    "fees": "交割杂费",
+    "storage": "仓储费",
+    "capital": "现货成本、增值税与资金利息",
+    "summary": "总成本与盈亏平衡点",
+    "arbitrage": "套利结果",
+    "result": "结果对象构建",
+}
+
+
+class StageStats(NamedTuple):
+    """一个阶段的累计数据"""
+    stage: str
+    description: str
+    calls: int
+    seconds: float
+
+    @property
+    def seconds_per_call(self) -> float:
+        return self.seconds / self.calls if self.calls else 0.0
+
+
+class StageReport:
+    """一次 profile_stages 的计时结果"""
+
+    def __init__(self, cprofile: bool = False):
+        """
+        参数:
+            cprofile: 是否同时用 cProfile 采集完整的调用数据
+        """
+        self.calls: Dict[str, int] = dict.fromkeys(STAGES, 0)
+        self.seconds: Dict[str, float] = dict.fromkeys(STAGES, 0.0)
+        self.elapsed = 0.0
+        self.profiler: Optional[cProfile.Profile] = cProfile.Profile() if cprofile else None
+
+    def lap(self, stage: str, start: float) -> float:
+        """把 start 到现在的耗时计入 stage，返回现在的时刻（下一阶段的开始）"""
+        now = time.perf_counter()
+        self.calls[stage] += 1
+        self.seconds[stage] += now - start
+        return now
+
+    @property
+    def staged_seconds(self) -> float:
+        """各阶段耗时之和"""
+        return sum(self.seconds.values())
+
+    @property
+    def other_seconds(self) -> float:
+        """计时期间不属于任何阶段的耗时（网页渲染、数据准备等）"""
+        return max(0.0, self.elapsed - self.staged_seconds)
+
+    def stages(self) -> List[StageStats]:
+        """各阶段的累计数据"""
+        return [
+            StageStats(stage, description, self.calls[stage], self.seconds[stage])
+            for stage, description in STAGES.items()
+        ]
+
+    def to_dict(self) -> Dict[str, object]:
+        """可序列化的结果"""
+        return {
+            "elapsed_seconds": self.elapsed,
+            "other_seconds": self.other_seconds,
+            "stages": {
+                stats.stage: {
+                    "description": stats.description,
+                    "calls": stats.calls,
+                    "seconds": stats.seconds,
+                }
+                for stats in self.stages()
+            },
+        }
+
+    def format(self) -> str:
+        """文本报告"""
+        lines = [f"{'阶段':<10}{'调用次数':>10}{'耗时(ms)':>12}{'每次(µs)':>12}{'占比':>8}  说明"]
+        total = self.elapsed or self.staged_seconds
+        for stats in self.stages():
+            share = stats.seconds / total if total else 0.0
+            lines.append(
+                f"{stats.stage:<10}{stats.calls:>10,}{stats.seconds * 1e3:>12.3f}"
+                f"{stats.seconds_per_call * 1e6:>12.2f}{share:>8.1%}  {stats.description}"
+            )
+        if self.elapsed:
+            share = self.other_seconds / self.elapsed
+            lines.append(f"{'other':<10}{'':>10}{self.other_seconds * 1e3:>12.3f}{'':>12}{share:>8.1%}  其他")
+            lines.append(f"{'total':<10}{'':>10}{self.elapsed * 1e3:>12.3f}")
+        return "\n".join(lines)
+
+    def save(self, path: str):
+        """保存为 JSON"""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+
+    def dump_stats(self, path: str):
+        """保存 cProfile 数据（可用 pstats、snakeviz 等查看）"""
+        self._require_profiler().dump_stats(path)
+
+    def stats_text(self, limit: int = 20, sort: str = "cumulative") -> str:
+        """cProfile 数据按 sort 排序后前 limit 行的文本"""
+        stream = io.StringIO()
+        pstats.Stats(self._require_profiler(), stream=stream).sort_stats(sort).print_stats(limit)
+        return stream.getvalue()
+
+    def _require_profiler(self) -> cProfile.Profile:
+        if self.profiler is None:
+            raise ValueError("未开启 cProfile，请使用 profile_stages(cprofile=True)")
+        return self.profiler
+
+
+class _ThreadReports:
+    """
+    各线程当前的 StageReport，开启计时期间作为计算模块的 _stage_timer
+
+    只记录开启计时的线程中的调用：网页端多个会话共享同一个计算器时，
+    各会话的报告互不干扰。
+    """
+
+    def __init__(self):
+        self.reports: Dict[int, StageReport] = {}
+        self.lock = threading.Lock()
+
+    def begin(self):
+        """计算路径开始时调用：当前线程开启了计时时返回 (报告, 当前时刻)，否则返回 (None, 0.0)"""
+        report = self.reports.get(threading.get_ident())
+        if report is None:
+            return None, 0.0
+        return report, time.perf_counter()
+
+
+_thread_reports = _ThreadReports()
+
+
+@contextmanager
+def profile_stages(cprofile: bool = False) -> Iterator[StageReport]:
+    """
+    在 with 块内开启分阶段计时
+
+    只统计当前线程中的计算；嵌套使用时内层块的计算只计入内层报告。
+
+    参数:
+        cprofile: 是否同时用 cProfile 采集完整的调用数据（开销较大）
+
+    返回:
+        StageReport（with 块结束后 elapsed 为块的总耗时）
+    """
+    report = StageReport(cprofile)
+    thread = threading.get_ident()
+    with _thread_reports.lock:
+        previous = _thread_reports.reports.get(thread)
+        _thread_reports.reports[thread] = report
+        tin_delivery_cost_calculator._set_stage_timer(_thread_reports)
+    if report.profiler is not None:
+        report.profiler.enable()
+    start = time.perf_counter()
+    try:
+        yield report
+    finally:
+        report.elapsed = time.perf_counter() - start
+        if report.profiler is not None:
+            report.profiler.disable()
+        with _thread_reports.lock:
+            if previous is None:
+                del _thread_reports.reports[thread]
+            else:
+                _thread_reports.reports[thread] = previous
+            if not _thread_reports.reports:
+                tin_delivery_cost_calculator._set_stage_timer(None)
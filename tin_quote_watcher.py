@@ -0,0 +1,489 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+盘中报价监控（asyncio）
+逐笔读取现货和 sn 期货报价，期货升水穿过盈亏平衡点时立即发出套利信号。
+
+交易日确定后，每个合约的持有天数、动态保证金、交割杂费、仓储费和利率都不再变化，
+每吨利润只剩现货价格和期货价格两个变量：
+    每吨利润 = 期货价格 - 现货价格 × spot_factor - fixed
+              - max(0, (期货价格 - 现货价格) × 增值税率) × rate_days
+（spot_factor、fixed、rate_days 见 tin_break_even._per_ton_terms，交割价格等于期货价格）。
+启动时按合约预先算好这几个系数，每笔报价只做几次浮点运算，不调用完整的 check_arbitrage。
+
+报价来源可以是本地 socket（tcp://host:port、unix:///path）、命名管道、标准输入（-）
+或回放文件，不需要外部网络。每行一笔报价：
+    代码,价格[,时间]             如 sn2607,252000 或 spot,250000
+    {"symbol": ..., "price": ...}  JSON 格式
+
+运行: python tin_quote_watcher.py quotes.txt --date 2026-03-16 --contracts sn2605,sn2607
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import stat
+import sys
+import time
+from bisect import bisect_left
+from datetime import date, datetime
+from typing import AsyncIterator, Callable, Dict, Iterable, List, NamedTuple, Optional
+
+from tin_break_even import _per_ton_terms
+from tin_contract_registry import DEFAULT_MARGIN_RATES, ContractRegistry, get_registry
+from tin_delivery_cost_calculator import DEFAULT_PARAMS, TinDeliveryParams
+
+# 现货报价的代码（不区分大小写）
+SPOT_SYMBOL = "spot"
+
+# 回放文件不限速时，每读这么多行让出一次事件循环
+_REPLAY_YIELD_LINES = 1000
+
+
+class ArbitrageSignal(NamedTuple):
+    """套利信号：每吨利润从阈值以下升到阈值以上（enter）或反过来（exit）"""
+    contract_code: str
+    kind: str                        # "enter" 或 "exit"
+    spot_price: float
+    futures_price: float
+    profit_per_ton: float            # 元/吨
+    profit: float                    # 元（每吨利润 × 数量）
+    break_even_futures_price: float  # 当前现货价格下的盈亏平衡期货价格（元/吨）
+    latency_ns: int                  # 从收到报价到产生信号的耗时（纳秒）
+
+
+class LatencyHistogram:
+    """
+    对数分桶的延迟直方图（纳秒）
+
+    桶边界从 min_ns 到 max_ns 按 2^(1/8) 递增（相对误差约9%），记录一次只做一次
+    二分查找，内存与记录次数无关。
+    """
+
+    def __init__(self, min_ns: int = 100, max_ns: int = 10_000_000_000, steps_per_doubling: int = 8):
+        edges = []
+        edge = float(min_ns)
+        factor = 2 ** (1 / steps_per_doubling)
+        while edge < max_ns:
+            edges.append(int(edge))
+            edge *= factor
+        edges.append(max_ns)
+        self._edges = edges
+        # 最后一个桶收集超过 max_ns 的值
+        self._counts = [0] * (len(edges) + 1)
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def record(self, value_ns: int):
+        self._counts[bisect_left(self._edges, value_ns)] += 1
+        self.count += 1
+        self.total_ns += value_ns
+        if value_ns > self.max_ns:
+            self.max_ns = value_ns
+
+    def percentile(self, q: float) -> int:
+        """
+        分位数（纳秒，取所在桶的上边界）
+
+        参数:
+            q: 0~100
+        """
+        if self.count == 0:
+            return 0
+        rank = max(1, math.ceil(self.count * q / 100))
+        seen = 0
+        for position, count in enumerate(self._counts):
+            seen += count
+            if seen >= rank:
+                # 桶上边界不超过实际最大值
+                return min(self._edges[position], self.max_ns) if position < len(self._edges) else self.max_ns
+        return self.max_ns
+
+    def summary(self) -> Dict[str, float]:
+        """次数、平均值和 p50/p90/p99/p99.9/最大值（微秒）"""
+        return {
+            "count": self.count,
+            "mean_us": self.total_ns / self.count / 1000 if self.count else 0.0,
+            "p50_us": self.percentile(50) / 1000,
+            "p90_us": self.percentile(90) / 1000,
+            "p99_us": self.percentile(99) / 1000,
+            "p999_us": self.percentile(99.9) / 1000,
+            "max_us": self.max_ns / 1000,
+        }
+
+
+class _ContractState:
+    """单个合约的预先计算系数和最新报价"""
+
+    __slots__ = (
+        "code", "spot_factor", "fixed", "rate_days", "vat_rate_days",
+        "futures_price", "profit_per_ton", "above"
+    )
+
+    def __init__(self, code: str, spot_factor: float, fixed: float, rate_days: float, vat_rate: float):
+        self.code = code
+        self.spot_factor = spot_factor
+        self.fixed = fixed
+        self.rate_days = rate_days
+        self.vat_rate_days = vat_rate * rate_days
+        self.futures_price: Optional[float] = None
+        self.profit_per_ton: Optional[float] = None
+        self.above = False
+
+    def break_even(self, spot_price: float) -> float:
+        """当前现货价格下的盈亏平衡期货价格，同 tin_break_even.break_even_futures_price"""
+        base = spot_price * self.spot_factor + self.fixed
+        if base <= spot_price:
+            return base
+        if self.vat_rate_days >= 1:
+            return math.nan
+        return (base - spot_price * self.vat_rate_days) / (1 - self.vat_rate_days)
+
+
+class QuoteWatcher:
+    """
+    逐笔报价的套利监控
+
+    on_quote 是同步的热路径：更新一笔现货或期货报价，只重算受影响合约的每吨利润
+    （现货报价影响所有已有期货报价的合约），每吨利润穿过阈值时返回信号，
+    并把每笔报价的处理耗时记入 latency。run 在 asyncio 中消费报价流。
+
+    每吨利润与 check_arbitrage 的 profit_per_ton 只有浮点舍入级别的差异。
+    """
+
+    def __init__(
+        self,
+        trade_date,
+        contracts: Optional[Iterable[str]] = None,
+        params: TinDeliveryParams = DEFAULT_PARAMS,
+        quantity_ton: float = 1.0,
+        threshold_per_ton: float = 0.0,
+        interest_rate: Optional[float] = None,
+        enterprise_margin_addon: float = 0.0,
+        margin_rates: Iterable[float] = DEFAULT_MARGIN_RATES,
+        fee_kwargs: Optional[Dict[str, float]] = None,
+        registry: Optional[ContractRegistry] = None,
+        spot_symbol: str = SPOT_SYMBOL
+    ):
+        """
+        参数:
+            trade_date: 交易日期（买入现货日期）
+            contracts: 监控的合约代码，默认为交易日所有在交易、未到交割日的合约
+            params: 交割参数
+            quantity_ton: 数量（吨），只影响信号中的 profit
+            threshold_per_ton: 每吨利润阈值（元/吨），默认0即盈亏平衡点
+            interest_rate: 资金利率（年化），默认使用params.default_interest_rate
+            enterprise_margin_addon: 企业保证金加收比例
+            margin_rates: 四档保证金比例
+            fee_kwargs: 交割杂费参数，见 calculate_delivery_fees
+            registry: 合约信息表，默认使用 get_registry()
+            spot_symbol: 现货报价的代码
+        """
+        if registry is None:
+            registry = get_registry()
+        if isinstance(trade_date, datetime):
+            trade_date = trade_date.date()
+        elif not isinstance(trade_date, date):
+            trade_date = date.fromisoformat(str(trade_date))
+        self.trade_date = trade_date
+        self.params = params
+        self.quantity_ton = quantity_ton
+        self.threshold_per_ton = threshold_per_ton
+        self.spot_symbol = spot_symbol.lower()
+        self.spot_price: Optional[float] = None
+        self.latency = LatencyHistogram()
+        self._registry = registry
+
+        if contracts is None:
+            infos = [
+                info for info in registry.listed_contracts(trade_date)
+                if info.delivery_date > trade_date
+            ]
+        else:
+            contracts = list(contracts)
+            infos = registry.get_many(contracts)
+            unknown = [code for code, info in zip(contracts, infos) if info is None]
+            if unknown:
+                raise KeyError(", ".join(unknown))
+        margin_rates = tuple(margin_rates)
+
+        self._states: Dict[str, _ContractState] = {}
+        for info in infos:
+            margin_rate = (
+                info.margin_schedule(*margin_rates).average_rate(trade_date) + enterprise_margin_addon
+            )
+            fixed, rate_days, futures_factor = _per_ton_terms(
+                params,
+                holding_days=(info.delivery_date - trade_date).days,
+                interest_rate=interest_rate,
+                margin_rate=margin_rate,
+                **(fee_kwargs or {})
+            )
+            self._states[info.code] = _ContractState(
+                info.code,
+                spot_factor=float(1 + rate_days + futures_factor),
+                fixed=float(fixed),
+                rate_days=float(rate_days),
+                vat_rate=params.vat_rate
+            )
+        # 已有期货报价的合约（现货报价更新时只重算这些合约）
+        self._priced: List[_ContractState] = []
+
+    @property
+    def contracts(self) -> List[str]:
+        """监控的合约代码"""
+        return list(self._states)
+
+    def _state(self, symbol: str) -> Optional[_ContractState]:
+        state = self._states.get(symbol)
+        if state is None:
+            info = self._registry.get(symbol)
+            state = self._states.get(info.code) if info is not None else None
+        return state
+
+    def _evaluate(self, state: _ContractState, signals: list, received_ns: int):
+        spot_price = self.spot_price
+        futures_price = state.futures_price
+        vat_per_ton = (futures_price - spot_price) * self.params.vat_rate
+        if vat_per_ton < 0:
+            vat_per_ton = 0.0
+        profit_per_ton = (
+            futures_price - spot_price * state.spot_factor - state.fixed
+            - vat_per_ton * state.rate_days
+        )
+        state.profit_per_ton = profit_per_ton
+        above = profit_per_ton > self.threshold_per_ton
+        if above is not state.above:
+            state.above = above
+            signals.append(ArbitrageSignal(
+                state.code,
+                "enter" if above else "exit",
+                spot_price,
+                futures_price,
+                profit_per_ton,
+                profit_per_ton * self.quantity_ton,
+                state.break_even(spot_price),
+                time.perf_counter_ns() - received_ns
+            ))
+
+    def on_quote(self, symbol: str, price: float, received_ns: Optional[int] = None) -> List[ArbitrageSignal]:
+        """
+        处理一笔报价
+
+        参数:
+            symbol: 合约代码，或现货代码（spot_symbol）
+            price: 价格（元/吨）
+            received_ns: 收到报价的时间（time.perf_counter_ns），默认为调用时刻
+
+        返回:
+            本笔报价触发的信号列表（通常为空）；未监控的代码被忽略
+        """
+        if received_ns is None:
+            received_ns = time.perf_counter_ns()
+        signals: List[ArbitrageSignal] = []
+        if symbol.lower() == self.spot_symbol:
+            self.spot_price = float(price)
+            for state in self._priced:
+                self._evaluate(state, signals, received_ns)
+        else:
+            state = self._state(symbol)
+            if state is None:
+                return signals
+            if state.futures_price is None:
+                self._priced.append(state)
+            state.futures_price = float(price)
+            if self.spot_price is not None:
+                self._evaluate(state, signals, received_ns)
+        self.latency.record(time.perf_counter_ns() - received_ns)
+        return signals
+
+    def snapshot(self) -> List[Dict[str, object]]:
+        """各合约的最新报价、每吨利润和盈亏平衡期货价格"""
+        rows = []
+        for state in self._states.values():
+            rows.append({
+                "contract_code": state.code,
+                "futures_price": state.futures_price,
+                "profit_per_ton": state.profit_per_ton,
+                "break_even_futures_price": (
+                    state.break_even(self.spot_price) if self.spot_price is not None else None
+                ),
+                "can_arbitrage": state.above if state.profit_per_ton is not None else None,
+            })
+        return rows
+
+    async def run(
+        self,
+        lines: AsyncIterator[bytes],
+        on_signal: Optional[Callable[[ArbitrageSignal], object]] = None
+    ) -> int:
+        """
+        消费报价流直到结束
+
+        参数:
+            lines: 报价行的异步迭代器，见 iter_quote_lines
+            on_signal: 信号回调，可以是普通函数或协程函数
+
+        返回:
+            处理的报价笔数（不含无法解析的行）
+        """
+        ticks = 0
+        async for line in lines:
+            received_ns = time.perf_counter_ns()
+            quote = parse_quote(line)
+            if quote is None:
+                continue
+            ticks += 1
+            signals = self.on_quote(quote[0], quote[1], received_ns)
+            if on_signal is not None:
+                for signal in signals:
+                    result = on_signal(signal)
+                    if asyncio.iscoroutine(result):
+                        await result
+        return ticks
+
+
+def parse_quote(line) -> Optional[tuple]:
+    """
+    解析一行报价
+
+    返回:
+        (代码, 价格)；空行、注释行（#开头）和格式不正确的行返回 None
+    """
+    if isinstance(line, bytes):
+        line = line.decode("utf-8", errors="replace")
+    line = line.strip()
+    if not line or line.startswith("#"):
+        return None
+    try:
+        if line.startswith("{"):
+            record = json.loads(line)
+            return str(record["symbol"]), float(record["price"])
+        fields = line.split(",")
+        return fields[0].strip(), float(fields[1])
+    except (ValueError, KeyError, IndexError, TypeError):
+        return None
+
+
+async def _iter_reader(reader: asyncio.StreamReader) -> AsyncIterator[bytes]:
+    while True:
+        line = await reader.readline()
+        if not line:
+            return
+        yield line
+
+
+async def _iter_pipe(file) -> AsyncIterator[bytes]:
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader()
+    transport, _ = await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), file)
+    try:
+        async for line in _iter_reader(reader):
+            yield line
+    finally:
+        transport.close()
+
+
+async def iter_quote_lines(source: str, replay_interval: float = 0.0) -> AsyncIterator[bytes]:
+    """
+    按行读取报价流
+
+    参数:
+        source: "tcp://host:port"、"unix:///path/to/socket"、"-"（标准输入）、
+            命名管道或普通文件（回放）路径
+        replay_interval: 回放普通文件时每行之间的间隔（秒），0 表示不限速
+
+    返回:
+        报价行（bytes）的异步迭代器
+    """
+    if source.startswith("tcp://"):
+        host, _, port = source[len("tcp://"):].rpartition(":")
+        reader, writer = await asyncio.open_connection(host or "127.0.0.1", int(port))
+    elif source.startswith("unix://"):
+        reader, writer = await asyncio.open_unix_connection(source[len("unix://"):])
+    else:
+        reader = writer = None
+
+    if reader is not None:
+        try:
+            async for line in _iter_reader(reader):
+                yield line
+        finally:
+            writer.close()
+        return
+
+    if source == "-":
+        async for line in _iter_pipe(sys.stdin.buffer):
+            yield line
+        return
+
+    if stat.S_ISFIFO(os.stat(source).st_mode):
+        # 打开命名管道会阻塞到写入方连接为止，放到线程里等待
+        loop = asyncio.get_running_loop()
+        file = await loop.run_in_executor(None, open, source, "rb")
+        try:
+            async for line in _iter_pipe(file):
+                yield line
+        finally:
+            file.close()
+        return
+
+    with open(source, "rb") as file:
+        for number, line in enumerate(file, 1):
+            yield line
+            if replay_interval > 0:
+                await asyncio.sleep(replay_interval)
+            elif number % _REPLAY_YIELD_LINES == 0:
+                await asyncio.sleep(0)
+
+
+def _format_signal(signal: ArbitrageSignal) -> str:
+    action = "可以套利" if signal.kind == "enter" else "套利消失"
+    return (
+        f"{signal.contract_code} {action}  现货 {signal.spot_price:,.0f}  期货 {signal.futures_price:,.0f}  "
+        f"每吨利润 {signal.profit_per_ton:,.2f}  盈亏平衡 {signal.break_even_futures_price:,.2f}  "
+        f"延迟 {signal.latency_ns / 1000:.1f} 微秒"
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="锡期现套利盘中报价监控")
+    parser.add_argument("source", help='报价来源：文件、命名管道、"-"、tcp://host:port 或 unix:///path')
+    parser.add_argument("--date", default=date.today().isoformat(), help="交易日期，默认今天")
+    parser.add_argument("--contracts", help="监控的合约代码（逗号分隔），默认为全部在交易合约")
+    parser.add_argument("--threshold", type=float, default=0.0, help="每吨利润阈值（元/吨），默认0")
+    parser.add_argument("--quantity", type=float, default=1.0, help="数量（吨）")
+    parser.add_argument("--interest-rate", type=float, help="资金利率（年化）")
+    parser.add_argument("--margin-addon", type=float, default=0.0, help="企业保证金加收比例")
+    parser.add_argument("--replay-interval", type=float, default=0.0, help="回放文件时每行间隔（秒）")
+    args = parser.parse_args(argv)
+
+    watcher = QuoteWatcher(
+        args.date,
+        contracts=args.contracts.split(",") if args.contracts else None,
+        quantity_ton=args.quantity,
+        threshold_per_ton=args.threshold,
+        interest_rate=args.interest_rate,
+        enterprise_margin_addon=args.margin_addon
+    )
+    try:
+        ticks = asyncio.run(watcher.run(
+            iter_quote_lines(args.source, args.replay_interval),
+            on_signal=lambda signal: print(_format_signal(signal), flush=True)
+        ))
+    except KeyboardInterrupt:
+        ticks = watcher.latency.count
+    summary = watcher.latency.summary()
+    print(
+        f"{ticks:,} 笔报价  延迟 p50 {summary['p50_us']:.1f} / p99 {summary['p99_us']:.1f} / "
+        f"最大 {summary['max_us']:.1f} 微秒",
+        file=sys.stderr
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
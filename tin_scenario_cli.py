@@ -0,0 +1,406 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+场景表命令行测算
+按固定块大小读取场景 CSV（文件或标准输入），每块调用 check_arbitrage_batch 计算，
+逐块写出 CSV / JSONL / Parquet 结果，最后在标准错误输出吞吐量统计。
+任何时刻只保留一块输入和一块结果，内存占用与输入行数无关。
+
+运行: python tin_delivery_cost_calculator.py scenarios.csv -o result.parquet
+     cat scenarios.csv | python tin_scenario_cli.py - --format jsonl > result.jsonl
+"""
+
+import argparse
+import os
+import sys
+import time
+from contextlib import ExitStack
+from typing import Dict, Iterator, List, Optional
+
+import pandas as pd
+
+from tin_delivery_cost_calculator import (
+    SENSITIVITY_COLUMNS,
+    TinDeliveryCostCalculator,
+    TinDeliveryParams
+)
+from tin_parallel import SCENARIO_COLUMNS, _scenario_arrays
+
+# 每块读取的行数
+DEFAULT_CHUNK_ROWS = 100_000
+
+# 默认输出的结果列（其余列用 --all-columns 输出）
+DEFAULT_RESULT_COLUMNS = (
+    "holding_days",
+    "margin_rate",
+    "total_cost",
+    "cost_per_ton",
+    "break_even_futures_price",
+    "profit",
+    "profit_per_ton",
+    "profit_rate",
+    "can_arbitrage",
+)
+
+OUTPUT_FORMATS = ("csv", "jsonl", "parquet")
+
+# 错误信息中最多列出的跳过行号
+MAX_REPORTED_LINES = 10
+
+_FORMAT_SUFFIXES = {
+    ".csv": "csv",
+    ".jsonl": "jsonl",
+    ".ndjson": "jsonl",
+    ".parquet": "parquet",
+    ".pq": "parquet",
+}
+
+
+def iter_scenarios(
+    source,
+    chunksize: int = DEFAULT_CHUNK_ROWS,
+    column_map: Optional[Dict[str, str]] = None
+) -> Iterator[pd.DataFrame]:
+    """
+    按块读取场景 CSV
+
+    参数:
+        source: 文件路径，"-" 表示标准输入，也可以是已打开的文本流
+        chunksize: 每块行数
+        column_map: 标准列名 -> 文件列名，如 {"spot_price": "现货价格"}
+
+    返回:
+        DataFrame 迭代器，列名已换成标准列名，其余列原样保留
+    """
+    if source == "-":
+        source = sys.stdin
+    rename = {file_name: name for name, file_name in (column_map or {}).items()}
+    for chunk in pd.read_csv(source, chunksize=chunksize):
+        yield chunk.rename(columns=rename) if rename else chunk
+
+
+def missing_dates(chunk: pd.DataFrame) -> pd.Series:
+    """
+    开始或结束日期缺失（空白）的行
+
+    这些行没有持有天数，不能计算成本和利润；场景表没有日期列时由 --default 提供，不会缺失。
+
+    返回:
+        与 chunk 同索引的布尔 Series
+    """
+    missing = pd.Series(False, index=chunk.index)
+    for name in ("start_date", "end_date"):
+        if name in chunk:
+            missing |= chunk[name].isna()
+    return missing
+
+
+def evaluate_chunk(
+    chunk: pd.DataFrame,
+    calculator: TinDeliveryCostCalculator,
+    defaults: Optional[Dict[str, object]] = None,
+    result_columns=DEFAULT_RESULT_COLUMNS,
+    decimals: Optional[int] = None,
+    sensitivities: bool = False
+) -> pd.DataFrame:
+    """
+    计算一块场景
+
+    参数:
+        chunk: 场景表，参与计算的列见 SCENARIO_COLUMNS
+        calculator: 计算器
+        defaults: 场景表中没有对应列时使用的值，如 {"quantity_ton": 1.0}
+        result_columns: 输出的结果列，None 表示 check_arbitrage_batch 的全部列
+        decimals: 浮点结果列保留的小数位数，None 表示不舍入
+        sensitivities: 是否同时输出利润敏感度列（SENSITIVITY_COLUMNS）
+
+    返回:
+        原有的列加上结果列（与输入同名的结果列不重复输出）
+    """
+    arrays = _scenario_arrays(chunk)
+    values = {name: value for name, value in (defaults or {}).items() if name not in arrays}
+    result = calculator.check_arbitrage_batch(**arrays, **values, sensitivities=sensitivities)
+    if result_columns is None:
+        result_columns = result.keys()
+    elif sensitivities:
+        result_columns = tuple(result_columns) + tuple(SENSITIVITY_COLUMNS)
+    columns = {name: result[name] for name in result_columns if name not in chunk}
+    if decimals is not None:
+        # 文本输出时浮点数格式化是主要耗时，位数越少写得越快
+        columns = {
+            name: values.round(decimals) if values.dtype.kind == "f" else values
+            for name, values in columns.items()
+        }
+    output = chunk.reset_index(drop=True)
+    return pd.concat([output, pd.DataFrame(columns)], axis=1)
+
+
+class ResultWriter:
+    """
+    逐块写出结果：CSV 追加写入，JSONL 每行一条记录，Parquet 使用同一个 ParquetWriter
+    """
+
+    def __init__(self, target, output_format: str):
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"不支持的输出格式: {output_format}")
+        if output_format == "parquet" and target == "-":
+            raise ValueError("Parquet 结果需要写入文件，不能输出到标准输出")
+        self.output_format = output_format
+        self._target = target
+        self._stream = None
+        self._parquet_writer = None
+        self._first = True
+
+    def write(self, result: pd.DataFrame):
+        """写出一块结果"""
+        if self.output_format == "parquet":
+            try:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+            except ImportError:
+                raise ImportError("输出 Parquet 文件需要安装 pyarrow") from None
+            # read_csv 按块推断列类型（如某块有空白单元格时整数列变为浮点），
+            # 场景列统一为计算时的类型，其余列按第一块的结构转换
+            result = result.assign(**_scenario_arrays(result))
+            table = pa.Table.from_pandas(result, preserve_index=False)
+            if self._parquet_writer is None:
+                self._parquet_writer = pq.ParquetWriter(self._target, table.schema)
+            elif not table.schema.equals(self._parquet_writer.schema, check_metadata=False):
+                try:
+                    table = table.cast(self._parquet_writer.schema)
+                except (pa.ArrowInvalid, pa.ArrowNotImplementedError, ValueError) as exc:
+                    raise ValueError(f"结果列的类型与之前的块不一致，无法追加到 Parquet 文件: {exc}") from None
+            self._parquet_writer.write_table(table)
+            return
+        if self._stream is None:
+            if self._target == "-":
+                self._stream = sys.stdout
+            else:
+                self._stream = open(self._target, "w", encoding="utf-8", newline="")
+        if self.output_format == "csv":
+            result.to_csv(self._stream, header=self._first, index=False)
+        elif not result.empty:
+            text = result.to_json(orient="records", lines=True, date_format="iso", force_ascii=False)
+            # 不同版本的 pandas 对最后一行是否带换行符不一致
+            self._stream.write(text if text.endswith("\n") else text + "\n")
+        self._first = False
+
+    def close(self):
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+        if self._stream is not None and self._stream is not sys.stdout:
+            self._stream.close()
+        elif self._stream is not None:
+            self._stream.flush()
+
+
+def _peak_memory_mb() -> Optional[float]:
+    """进程的峰值常驻内存（MB），平台不支持时返回 None"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以 KB 为单位，macOS 以字节为单位
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def run_scenarios(
+    source,
+    output="-",
+    output_format: str = "csv",
+    chunksize: int = DEFAULT_CHUNK_ROWS,
+    column_map: Optional[Dict[str, str]] = None,
+    defaults: Optional[Dict[str, object]] = None,
+    result_columns=DEFAULT_RESULT_COLUMNS,
+    decimals: Optional[int] = None,
+    sensitivities: bool = False,
+    params: Optional[TinDeliveryParams] = None
+) -> Dict[str, float]:
+    """
+    逐块计算整个场景文件并写出结果
+
+    参数:
+        source: 场景 CSV 路径，"-" 表示标准输入
+        output: 结果文件路径，"-" 表示标准输出
+        output_format: "csv"、"jsonl" 或 "parquet"（需要 pyarrow）
+        chunksize: 每块行数
+        column_map: 标准列名 -> 文件列名
+        defaults: 场景表中没有对应列时使用的值
+        result_columns: 输出的结果列，None 表示全部列
+        decimals: 浮点结果列保留的小数位数，None 表示不舍入
+        sensitivities: 是否同时输出利润敏感度列
+        params: 交割参数，默认使用 DEFAULT_PARAMS
+
+    开始或结束日期缺失的行不计算、不写出，计入 skipped，skipped_lines 记录其中前
+    MAX_REPORTED_LINES 行在 CSV 文件中的行号（表头为第1行）。
+
+    返回:
+        吞吐量统计 {"rows", "chunks", "seconds", "rows_per_second", "skipped", "skipped_lines"}
+    """
+    calculator = TinDeliveryCostCalculator(params)
+    writer = ResultWriter(output, output_format)
+    rows = 0
+    chunks = 0
+    skipped = 0
+    skipped_lines: List[int] = []
+    start = time.perf_counter()
+    try:
+        for chunk in iter_scenarios(source, chunksize, column_map):
+            rows += len(chunk)
+            chunks += 1
+            missing = missing_dates(chunk)
+            if missing.any():
+                # read_csv 分块时索引连续编号，加上表头即文件行号
+                lines = chunk.index[missing.to_numpy()] + 2
+                skipped += len(lines)
+                skipped_lines.extend(lines[:MAX_REPORTED_LINES - len(skipped_lines)].tolist())
+                chunk = chunk[~missing]
+                if chunk.empty:
+                    # 整块都被跳过时不写出（空块的列类型与其他块不同，Parquet 无法追加）
+                    continue
+            writer.write(evaluate_chunk(
+                chunk, calculator, defaults, result_columns, decimals, sensitivities
+            ))
+    finally:
+        writer.close()
+    seconds = time.perf_counter() - start
+    return {
+        "rows": rows,
+        "chunks": chunks,
+        "seconds": seconds,
+        "rows_per_second": rows / seconds if seconds > 0 else 0.0,
+        "skipped": skipped,
+        "skipped_lines": skipped_lines,
+    }
+
+
+def _parse_pairs(pairs: List[str], option: str) -> Dict[str, str]:
+    """["a=b", ...] -> {"a": "b"}"""
+    result = {}
+    for pair in pairs:
+        name, sep, value = pair.partition("=")
+        if not sep or not name:
+            raise argparse.ArgumentTypeError(f"{option} 的格式应为 名称=值: {pair}")
+        result[name.strip()] = value.strip()
+    return result
+
+
+def _parse_defaults(pairs: List[str]) -> Dict[str, object]:
+    """--default 的值：日期列转为 datetime64，其余转为浮点数"""
+    defaults = {}
+    for name, value in _parse_pairs(pairs, "--default").items():
+        if name not in SCENARIO_COLUMNS:
+            raise argparse.ArgumentTypeError(f"--default 不支持的列: {name}")
+        defaults[name] = pd.Timestamp(value).to_datetime64() if name.endswith("_date") else float(value)
+    return defaults
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="锡期现交割成本批量测算：逐块读取场景 CSV，输出每个场景的成本与套利结果",
+        epilog="场景列: " + ", ".join(SCENARIO_COLUMNS) + "；其余列原样输出"
+    )
+    parser.add_argument("input", help='场景 CSV 文件，"-" 表示标准输入')
+    parser.add_argument("-o", "--output", default="-", help='结果文件，默认输出到标准输出')
+    parser.add_argument(
+        "-f", "--format", choices=OUTPUT_FORMATS,
+        help="输出格式，默认按结果文件扩展名判断，标准输出为 csv"
+    )
+    parser.add_argument(
+        "--chunksize", type=int, default=DEFAULT_CHUNK_ROWS,
+        help=f"每块行数（默认 {DEFAULT_CHUNK_ROWS}）"
+    )
+    parser.add_argument(
+        "--column", action="append", default=[], metavar="标准列名=文件列名",
+        help="文件列名与标准列名不同时指定，可重复"
+    )
+    parser.add_argument(
+        "--default", action="append", default=[], metavar="列名=值",
+        help="场景表中没有该列时使用的值，如 quantity_ton=1 或 end_date=2026-06-15，可重复"
+    )
+    parser.add_argument(
+        "--decimals", type=int, metavar="N",
+        help="浮点结果列保留 N 位小数（默认不舍入；文本输出时可明显加快写出）"
+    )
+    parser.add_argument("--all-columns", action="store_true", help="输出 check_arbitrage_batch 的全部结果列")
+    parser.add_argument(
+        "--sensitivities", action="store_true",
+        help="同时输出利润对现货价格、期货价格、利率、保证金比例和持有天数的敏感度"
+    )
+    parser.add_argument(
+        "--profile", metavar="FILE", nargs="?", const="",
+        help="按阶段统计计算耗时并输出到标准错误；指定 FILE 时另存 cProfile 数据（.pstats）"
+    )
+    parser.add_argument("-q", "--quiet", action="store_true", help="不输出吞吐量统计")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.chunksize <= 0:
+        parser.error("--chunksize 必须为正数")
+    try:
+        column_map = _parse_pairs(args.column, "--column")
+        defaults = _parse_defaults(args.default)
+    except (argparse.ArgumentTypeError, ValueError) as exc:
+        parser.error(str(exc))
+
+    output_format = args.format
+    if output_format is None:
+        suffix = os.path.splitext(args.output)[1].lower() if args.output != "-" else ""
+        output_format = _FORMAT_SUFFIXES.get(suffix, "csv")
+
+    profiling = ExitStack()
+    report = None
+    if args.profile is not None:
+        from tin_profiling import profile_stages
+        report = profiling.enter_context(profile_stages(cprofile=bool(args.profile)))
+
+    try:
+        with profiling:
+            stats = run_scenarios(
+                args.input,
+                output=args.output,
+                output_format=output_format,
+                chunksize=args.chunksize,
+                column_map=column_map,
+                defaults=defaults,
+                result_columns=None if args.all_columns else DEFAULT_RESULT_COLUMNS,
+                decimals=args.decimals,
+                sensitivities=args.sensitivities
+            )
+    except BrokenPipeError:
+        # 下游（如 head）提前关闭管道时正常退出，退出时不再向已关闭的管道写入
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 0
+    except (ValueError, TypeError, ImportError, OSError) as exc:
+        print(f"错误: {exc}", file=sys.stderr)
+        return 1
+
+    if not args.quiet:
+        peak = _peak_memory_mb()
+        print(
+            f"{stats['rows']:,} 行 / {stats['chunks']} 块  {stats['seconds']:.2f} 秒  "
+            f"{stats['rows_per_second']:,.0f} 行/秒"
+            + (f"  峰值内存 {peak:,.0f} MB" if peak is not None else ""),
+            file=sys.stderr
+        )
+    if report is not None:
+        print(report.format(), file=sys.stderr)
+        if args.profile:
+            report.dump_stats(args.profile)
+    if stats["skipped"]:
+        lines = "、".join(map(str, stats["skipped_lines"]))
+        more = " 等" if stats["skipped"] > len(stats["skipped_lines"]) else ""
+        print(
+            f"错误: {stats['skipped']:,} 行场景的开始或结束日期缺失，未计算也未输出（第 {lines}{more} 行）",
+            file=sys.stderr
+        )
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
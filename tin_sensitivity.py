@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+敏感性分析网格
+在两个输入（如现货价格 × 期货价格、期货价格 × 持有天数、资金利率 × 保证金加收）
+构成的二维网格上，一次向量化计算套利利润和盈亏平衡价格
+"""
+
+from datetime import date, datetime
+from typing import Dict, Optional
+
+import numpy as np
+
+from tin_delivery_cost_calculator import TinDeliveryCostCalculator, TinDeliveryParams
+
+# 可作为网格坐标轴的输入及显示名称
+SENSITIVITY_AXES = {
+    "spot_price": "现货价格（元/吨）",
+    "futures_price": "期货价格（元/吨）",
+    "holding_days": "持有天数",
+    "interest_rate": "资金利率（年化）",
+    "margin_addon": "企业保证金加收比例",
+}
+
+# 可展示的网格指标及显示名称
+SENSITIVITY_METRICS = {
+    "profit": "预期利润（元）",
+    "profit_per_ton": "每吨利润（元/吨）",
+    "break_even_futures_price": "盈亏平衡期货价格（元/吨）",
+    "profit_rate": "利润率（%）",
+}
+
+# 每个坐标轴默认的网格点数
+DEFAULT_GRID_POINTS = 200
+
+
+def axis_range(axis: str, base: Dict, spread: float = 0.05) -> tuple:
+    """
+    坐标轴的默认取值范围
+
+    参数:
+        axis: 坐标轴名称（SENSITIVITY_AXES 的键）
+        base: 基准输入，见 evaluate_grid
+        spread: 价格类坐标轴相对基准值的上下浮动比例
+
+    返回:
+        (最小值, 最大值)
+    """
+    if axis in ("spot_price", "futures_price"):
+        value = base[axis]
+        return value * (1 - spread), value * (1 + spread)
+    if axis == "holding_days":
+        return 0, max(2 * base["holding_days"], 60)
+    if axis == "interest_rate":
+        return 0.0, max(2 * base["interest_rate"], 0.10)
+    if axis == "margin_addon":
+        return 0.0, max(2 * base["margin_addon"], 0.20)
+    raise ValueError(f"未知的坐标轴: {axis}")
+
+
+def axis_values(axis: str, low: float, high: float, points: int = DEFAULT_GRID_POINTS) -> np.ndarray:
+    """坐标轴上等间距的取值（持有天数取整数并去重）"""
+    if axis == "holding_days":
+        return np.unique(np.linspace(low, high, points).round().astype(np.int64))
+    return np.linspace(low, high, points)
+
+
+def evaluate_grid(
+    params: TinDeliveryParams,
+    base: Dict,
+    x_axis: str,
+    x_values,
+    y_axis: str,
+    y_values,
+    calculator: Optional[TinDeliveryCostCalculator] = None
+) -> Dict[str, np.ndarray]:
+    """
+    在二维网格上计算套利结果（一次调用 check_arbitrage_batch，不逐点循环）
+
+    参数:
+        params: 交割参数（TinDeliveryParams）
+        base: 基准输入，键为 spot_price、futures_price、delivery_price、quantity_ton、
+            start_date、holding_days、interest_rate、margin_rate（不含加收的平均保证金比例）、
+            margin_addon，可选 fees（交割杂费参数字典）；
+            delivery_price 为 None 时交割价格随期货价格变化；
+            持有天数变化时保证金比例仍为 margin_rate，不按新的持有期重算动态保证金阶梯
+        x_axis: 横轴输入名称（SENSITIVITY_AXES 的键）
+        x_values: 横轴取值
+        y_axis: 纵轴输入名称，不能与横轴相同
+        y_values: 纵轴取值
+        calculator: 计算器，默认新建一个
+
+    返回:
+        字典：x、y 为坐标轴取值，SENSITIVITY_METRICS 中的每个指标为 (len(y), len(x)) 的数组
+    """
+    for axis in (x_axis, y_axis):
+        if axis not in SENSITIVITY_AXES:
+            raise ValueError(f"未知的坐标轴: {axis}")
+    if x_axis == y_axis:
+        raise ValueError("横轴和纵轴不能相同")
+    if calculator is None:
+        calculator = TinDeliveryCostCalculator()
+
+    x_values = np.asarray(x_values)
+    y_values = np.asarray(y_values)
+    inputs = {axis: base[axis] for axis in SENSITIVITY_AXES}
+    # 横轴沿列变化、纵轴沿行变化，广播后得到 (len(y), len(x)) 的网格
+    inputs[x_axis] = x_values[np.newaxis, :]
+    inputs[y_axis] = y_values[:, np.newaxis]
+
+    start_date = base["start_date"]
+    if isinstance(start_date, datetime):
+        start_date = start_date.date()
+    if isinstance(start_date, date):
+        start_date = np.datetime64(start_date, "D")
+    holding_days = np.asarray(inputs["holding_days"], dtype=np.int64)
+    end_date = start_date + holding_days.astype("timedelta64[D]")
+
+    delivery_price = base.get("delivery_price")
+    result = calculator.check_arbitrage_batch(
+        spot_price=inputs["spot_price"],
+        futures_price=inputs["futures_price"],
+        quantity_ton=base["quantity_ton"],
+        start_date=start_date,
+        end_date=end_date,
+        interest_rate=inputs["interest_rate"],
+        margin_rate=base["margin_rate"] + np.asarray(inputs["margin_addon"], dtype=np.float64),
+        delivery_price=inputs["futures_price"] if delivery_price is None else delivery_price,
+        params=params,
+        **base.get("fees", {})
+    )
+    shape = (len(y_values), len(x_values))
+    grid = {"x": x_values, "y": y_values}
+    for metric in SENSITIVITY_METRICS:
+        grid[metric] = np.broadcast_to(result[metric], shape)
+    return grid
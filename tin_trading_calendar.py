@@ -0,0 +1,347 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+上期所（SHFE）交易日历
+提供可加载的节假日表和排序后的交易日索引，支持"前后第n个交易日"、
+"某月第一个交易日"、"两日期之间的交易日数"等查询
+"""
+
+import warnings
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple, Union
+
+DateLike = Union[date, datetime]
+
+# ========== 上期所休市安排（法定节假日，周末另行排除） ==========
+# 每项为 (起始日期, 结束日期)，含首尾；调休上班的周末交易所仍休市，无需列出。
+# 交易所每年年底才公布下一年的休市安排，表外年份的节假日无法预知，
+# 查询落在这些年份时会发出 HolidayCoverageWarning（见 TradingCalendar.covered_years）
+SHFE_HOLIDAYS: Tuple[Tuple[str, str], ...] = (
+    # 2019年
+    ("2019-01-01", "2019-01-01"),  # 元旦
+    ("2019-02-04", "2019-02-10"),  # 春节
+    ("2019-04-05", "2019-04-07"),  # 清明节
+    ("2019-05-01", "2019-05-04"),  # 劳动节
+    ("2019-06-07", "2019-06-09"),  # 端午节
+    ("2019-09-13", "2019-09-15"),  # 中秋节
+    ("2019-10-01", "2019-10-07"),  # 国庆节
+    # 2020年
+    ("2020-01-01", "2020-01-01"),  # 元旦
+    ("2020-01-24", "2020-02-02"),  # 春节（延长休市）
+    ("2020-04-04", "2020-04-06"),  # 清明节
+    ("2020-05-01", "2020-05-05"),  # 劳动节
+    ("2020-06-25", "2020-06-27"),  # 端午节
+    ("2020-10-01", "2020-10-08"),  # 国庆节、中秋节
+    # 2021年
+    ("2021-01-01", "2021-01-03"),  # 元旦
+    ("2021-02-11", "2021-02-17"),  # 春节
+    ("2021-04-03", "2021-04-05"),  # 清明节
+    ("2021-05-01", "2021-05-05"),  # 劳动节
+    ("2021-06-12", "2021-06-14"),  # 端午节
+    ("2021-09-19", "2021-09-21"),  # 中秋节
+    ("2021-10-01", "2021-10-07"),  # 国庆节
+    # 2022年
+    ("2022-01-01", "2022-01-03"),  # 元旦
+    ("2022-01-31", "2022-02-06"),  # 春节
+    ("2022-04-03", "2022-04-05"),  # 清明节
+    ("2022-04-30", "2022-05-04"),  # 劳动节
+    ("2022-06-03", "2022-06-05"),  # 端午节
+    ("2022-09-10", "2022-09-12"),  # 中秋节
+    ("2022-10-01", "2022-10-07"),  # 国庆节
+    # 2023年
+    ("2023-01-01", "2023-01-02"),  # 元旦
+    ("2023-01-21", "2023-01-27"),  # 春节
+    ("2023-04-05", "2023-04-05"),  # 清明节
+    ("2023-04-29", "2023-05-03"),  # 劳动节
+    ("2023-06-22", "2023-06-24"),  # 端午节
+    ("2023-09-29", "2023-10-06"),  # 中秋节、国庆节
+    # 2024年
+    ("2024-01-01", "2024-01-01"),  # 元旦
+    ("2024-02-09", "2024-02-17"),  # 春节
+    ("2024-04-04", "2024-04-06"),  # 清明节
+    ("2024-05-01", "2024-05-05"),  # 劳动节
+    ("2024-06-10", "2024-06-10"),  # 端午节
+    ("2024-09-15", "2024-09-17"),  # 中秋节
+    ("2024-10-01", "2024-10-07"),  # 国庆节
+    # 2025年
+    ("2025-01-01", "2025-01-01"),  # 元旦
+    ("2025-01-28", "2025-02-04"),  # 春节
+    ("2025-04-04", "2025-04-06"),  # 清明节
+    ("2025-05-01", "2025-05-05"),  # 劳动节
+    ("2025-05-31", "2025-06-02"),  # 端午节
+    ("2025-10-01", "2025-10-08"),  # 国庆节、中秋节
+    # 2026年
+    ("2026-01-01", "2026-01-03"),  # 元旦
+    ("2026-02-15", "2026-02-23"),  # 春节
+    ("2026-04-04", "2026-04-06"),  # 清明节
+    ("2026-05-01", "2026-05-05"),  # 劳动节
+    ("2026-06-19", "2026-06-21"),  # 端午节
+    ("2026-09-25", "2026-09-27"),  # 中秋节
+    ("2026-10-01", "2026-10-07"),  # 国庆节
+)
+
+# 默认日历覆盖的年份范围（范围外的日期查询会报错）
+DEFAULT_FIRST_YEAR = 2000
+DEFAULT_LAST_YEAR = 2050
+
+# 尚未公布休市安排的年份，默认日历先按公历固定的法定节假日估计（元旦、劳动节、国庆节），
+# 春节、清明、端午、中秋等按农历/节气确定的假期无法估计；这些年份仍不计入 covered_years
+ESTIMATED_HOLIDAYS: Tuple[Tuple[str, str], ...] = (
+    ("01-01", "01-01"),  # 元旦
+    ("05-01", "05-05"),  # 劳动节
+    ("10-01", "10-07"),  # 国庆节
+)
+
+
+class HolidayCoverageWarning(UserWarning):
+    """查询日期所在年份没有休市安排，节假日不完整，结果可能不准确"""
+
+
+def _as_date(value: DateLike) -> date:
+    """datetime/date -> date"""
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
+def match_date_type(template: DateLike, value: date) -> DateLike:
+    """按输入的类型返回结果：输入为datetime时返回当天零点的datetime"""
+    if isinstance(template, datetime):
+        return datetime(value.year, value.month, value.day)
+    return value
+
+
+def expand_holidays(ranges: Iterable[Tuple[str, str]]) -> List[date]:
+    """
+    把 (起始日期, 结束日期) 区间展开为逐日的节假日列表
+
+    参数:
+        ranges: 形如 ("2026-02-15", "2026-02-23") 的区间序列，含首尾
+
+    返回:
+        节假日日期列表
+    """
+    holidays = []
+    for start_text, end_text in ranges:
+        current = date.fromisoformat(start_text)
+        end = date.fromisoformat(end_text)
+        while current <= end:
+            holidays.append(current)
+            current += timedelta(days=1)
+    return holidays
+
+
+def estimate_holidays(first_year: int, last_year: int) -> List[date]:
+    """
+    按 ESTIMATED_HOLIDAYS 估计 [first_year, last_year] 内的节假日
+
+    返回:
+        节假日日期列表
+    """
+    return expand_holidays(
+        (f"{year}-{start}", f"{year}-{end}")
+        for year in range(first_year, last_year + 1)
+        for start, end in ESTIMATED_HOLIDAYS
+    )
+
+
+def load_holidays(path: str) -> List[date]:
+    """
+    从文本/CSV文件加载节假日表
+
+    每行一个日期（YYYY-MM-DD），或"起始日期,结束日期"表示一段区间；
+    空行和以 # 开头的行会被忽略。
+
+    参数:
+        path: 文件路径
+
+    返回:
+        节假日日期列表
+    """
+    ranges = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if not line:
+                continue
+            parts = [part.strip() for part in line.split(",") if part.strip()]
+            ranges.append((parts[0], parts[-1]))
+    return expand_holidays(ranges)
+
+
+class TradingCalendar:
+    """
+    交易日历
+
+    构建时生成覆盖年份内所有交易日（工作日且非节假日）的排序索引，以及
+    交易日 -> 序号、(年, 月) -> 当月第一个交易日 两张字典：
+        - 是否交易日、交易日前后偏移、某月第一个交易日：O(1)
+        - 非交易日的偏移与区间计数：二分查找，O(log n)
+
+    节假日表只覆盖已公布休市安排的年份（covered_years），其余年份的节假日不完整；
+    偏移、顺延、月初交易日和区间计数查询落在这些年份时发出 HolidayCoverageWarning
+    """
+
+    def __init__(
+        self,
+        holidays: Optional[Iterable[DateLike]] = None,
+        first_year: int = DEFAULT_FIRST_YEAR,
+        last_year: int = DEFAULT_LAST_YEAR,
+        covered_years: Optional[Iterable[int]] = None
+    ):
+        """
+        参数:
+            holidays: 节假日列表，默认使用内置的上期所休市安排，之后的年份按
+                ESTIMATED_HOLIDAYS 估计
+            first_year: 日历起始年份
+            last_year: 日历结束年份（含）
+            covered_years: 节假日表完整覆盖的年份，默认为节假日列表中出现过的年份
+                （使用内置休市安排时只含已公布的年份）
+        """
+        if holidays is None:
+            published = expand_holidays(SHFE_HOLIDAYS)
+            if covered_years is None:
+                covered_years = {day.year for day in published}
+            holidays = published + estimate_holidays(max(covered_years) + 1, last_year)
+        self.holidays = frozenset(_as_date(day) for day in holidays)
+        if covered_years is None:
+            covered_years = {day.year for day in self.holidays}
+        self.covered_years: FrozenSet[int] = frozenset(covered_years)
+        self.first_day = date(first_year, 1, 1)
+        self.last_day = date(last_year, 12, 31)
+
+        days = []
+        current = self.first_day
+        while current <= self.last_day:
+            if current.weekday() < 5 and current not in self.holidays:
+                days.append(current)
+            current += timedelta(days=1)
+        self._days: Tuple[date, ...] = tuple(days)
+        self._index: Dict[date, int] = {day: i for i, day in enumerate(days)}
+
+        self._month_first: Dict[Tuple[int, int], date] = {}
+        for day in days:
+            self._month_first.setdefault((day.year, day.month), day)
+
+    @classmethod
+    def from_file(cls, path: str, **kwargs) -> "TradingCalendar":
+        """从节假日文件构建日历（文件格式见 load_holidays）"""
+        return cls(holidays=load_holidays(path), **kwargs)
+
+    @property
+    def trading_days(self) -> Tuple[date, ...]:
+        """排序后的全部交易日"""
+        return self._days
+
+    def _check_range(self, day: date):
+        if not (self.first_day <= day <= self.last_day):
+            raise ValueError(
+                f"日期 {day} 超出交易日历范围 {self.first_day} ~ {self.last_day}"
+            )
+        if day.year not in self.covered_years:
+            self._warn_uncovered(day.year)
+
+    def _warn_uncovered(self, year: int):
+        # 警告位置固定在本模块，同一年份按 warnings 的默认规则只显示一次
+        warnings.warn(
+            f"{year}年没有上期所休市安排，节假日不完整，日期可能不准确",
+            HolidayCoverageWarning,
+            stacklevel=1
+        )
+
+    def covers(self, value: DateLike) -> bool:
+        """日期所在年份是否有休市安排"""
+        return _as_date(value).year in self.covered_years
+
+    def is_trading_day(self, value: DateLike) -> bool:
+        """是否为交易日"""
+        return _as_date(value) in self._index
+
+    def offset(self, value: DateLike, n: int) -> DateLike:
+        """
+        第n个交易日：n>0 为之后第n个交易日，n<0 为之前第|n|个交易日，
+        n=0 时若当天不是交易日则顺延到下一个交易日
+
+        参数:
+            value: 基准日期
+            n: 偏移的交易日数
+
+        返回:
+            与输入同类型（date/datetime）的交易日
+        """
+        day = _as_date(value)
+        self._check_range(day)
+        position = self._index.get(day)
+        if position is None:
+            # 非交易日：向后偏移从下一个交易日算起，向前偏移从上一个交易日算起
+            position = bisect_left(self._days, day)
+            if n > 0:
+                n -= 1
+            elif n < 0:
+                position -= 1
+                n += 1
+        target = position + n
+        if not (0 <= target < len(self._days)):
+            raise ValueError(f"日期 {day} 偏移 {n} 个交易日后超出交易日历范围")
+        return match_date_type(value, self._days[target])
+
+    def roll_forward(self, value: DateLike) -> DateLike:
+        """当天为交易日则返回当天，否则顺延到下一个交易日"""
+        return self.offset(value, 0)
+
+    def roll_backward(self, value: DateLike) -> DateLike:
+        """当天为交易日则返回当天，否则返回上一个交易日"""
+        if self.is_trading_day(value):
+            return value
+        return self.offset(value, -1)
+
+    def first_trading_day_of_month(self, year: int, month: int) -> date:
+        """某年某月的第一个交易日"""
+        try:
+            day = self._month_first[(year, month)]
+        except KeyError:
+            raise ValueError(f"{year}年{month}月超出交易日历范围") from None
+        if year not in self.covered_years:
+            self._warn_uncovered(year)
+        return day
+
+    def trading_days_between(self, start: DateLike, end: DateLike) -> int:
+        """
+        区间 [start, end) 内的交易日数（end 早于 start 时为负数）
+
+        参数:
+            start: 起始日期（含）
+            end: 结束日期（不含）
+
+        返回:
+            交易日数
+        """
+        start_day = _as_date(start)
+        end_day = _as_date(end)
+        self._check_range(start_day)
+        self._check_range(end_day)
+        return bisect_left(self._days, end_day) - bisect_left(self._days, start_day)
+
+    def trading_days_in(self, start: DateLike, end: DateLike) -> Tuple[date, ...]:
+        """闭区间 [start, end] 内的全部交易日"""
+        lo = bisect_left(self._days, _as_date(start))
+        hi = bisect_right(self._days, _as_date(end))
+        return self._days[lo:hi]
+
+
+@lru_cache(maxsize=None)
+def get_calendar(holiday_file: Optional[str] = None) -> TradingCalendar:
+    """
+    获取（并缓存）交易日历，同一进程内只构建一次
+
+    参数:
+        holiday_file: 节假日文件路径，默认使用内置的上期所休市安排
+
+    返回:
+        TradingCalendar
+    """
+    if holiday_file is None:
+        return TradingCalendar()
+    return TradingCalendar.from_file(holiday_file)
@@ -3,12 +3,25 @@
 """
 锡期现交割成本测算模型 - Web界面
 使用Streamlit创建交互式网页应用
+
+页面按部分拆成带 key 的 st.fragment，每个部分声明自己依赖的侧边栏输入（SECTION_INPUTS）。
+修改侧边栏输入时只重新运行依赖它的部分：例如只改资金利率时，每吨现货与杂费明细、资金需求、
+交割杂费明细、保证金时间段明细等不依赖利率的部分保持不变，不重新计算和渲染。
 """
 
+import io
 import streamlit as st
 import pandas as pd
+from contextlib import ExitStack
 from datetime import datetime, timedelta
-from tin_delivery_cost_calculator import TinDeliveryCostCalculator
+from typing import NamedTuple, Optional
+from tin_calc_cache import DEFAULT_CACHE_SIZE, CachedCalculator
+from tin_delivery_cost_calculator import DEFAULT_PARAMS, CostBreakdown, TinDeliveryCostCalculator, TinDeliveryParams
+from tin_contract_registry import get_registry
+from tin_profiling import profile_stages
+from tin_trading_calendar import get_calendar
+# plotly、敏感性分析、全曲线扫描、盈亏平衡查找表和仓单组合只在对应部分打开时才导入，
+# 未打开时冷启动不加载这些模块
 
 # 设置页面配置
 st.set_page_config(
@@ -18,6 +31,22 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+
+# 性能调试（侧边栏底部的开关）：开启后按阶段统计本次运行的计算耗时，显示在页面底部的
+# "性能"面板中。整页运行时从页面开始计时，局部刷新时从触发刷新的输入回调开始计时，
+# 都在"性能"面板中结束；上一次运行被中断（如运行中又修改了参数）而没有结束计时时，先结束它
+def start_profiling():
+    if "profile_stack" in st.session_state:
+        st.session_state.profile_stack.close()
+    profile_stack = st.session_state.profile_stack = ExitStack()
+    st.session_state.profile_report = None
+    if st.session_state.get("show_profile", False):
+        st.session_state.profile_report = profile_stack.enter_context(
+            profile_stages(cprofile=st.session_state.get("show_cprofile", False))
+        )
+
+start_profiling()
+
 # 自定义CSS样式
 st.markdown("""
 <style>
@@ -49,8 +78,279 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # 初始化计算器
-# 注意：不使用缓存，确保每次都是新的实例，避免参数污染
-calculator = TinDeliveryCostCalculator()
+# 计算器不保存可变状态，页面上修改的参数通过不可变的 params 传入，
+# 因此所有会话共享同一个带LRU缓存的实例：重复的场景直接返回缓存结果，
+# 缓存条数有上限，不会在共享服务器上无限增长
+@st.cache_resource
+def get_calculator():
+    return CachedCalculator(TinDeliveryCostCalculator(), maxsize=DEFAULT_CACHE_SIZE)
+
+calculator = get_calculator()
+
+
+# 敏感性分析网格：按 (交割参数, 基准输入, 坐标轴, 浮动范围) 缓存，
+# 切换坐标轴或指标、重复打开页面时直接复用已算好的网格
+@st.cache_data(max_entries=64, show_spinner=False)
+def get_sensitivity_grid(params, base_items, x_axis, y_axis, spread):
+    from tin_sensitivity import axis_range, axis_values, evaluate_grid
+
+    base = dict(base_items)
+    base["fees"] = dict(base["fees"])
+    x_values = axis_values(x_axis, *axis_range(x_axis, base, spread))
+    y_values = axis_values(y_axis, *axis_range(y_axis, base, spread))
+    return evaluate_grid(params, base, x_axis, x_values, y_axis, y_values, calculator=get_calculator())
+
+
+# 盈亏平衡查找表：按 (交割参数, 利率, 保证金, 交割杂费) 构建一次全部合约、全部交易日的
+# 系数，之后全曲线扫描中每个合约的保本期货价格只需一次乘加
+@st.cache_resource(max_entries=16, show_spinner=False)
+def get_break_even_table(params, interest_rate, enterprise_margin_addon, margin_rates, fee_items):
+    from tin_break_even_table import BreakEvenTable
+
+    return BreakEvenTable.build(
+        params,
+        interest_rate=interest_rate,
+        enterprise_margin_addon=enterprise_margin_addon,
+        margin_rates=margin_rates,
+        fee_kwargs=dict(fee_items)
+    )
+
+
+# 上传的仓单清单：按文件内容缓存，仓单组合部分局部刷新时不重新解析文件
+@st.cache_data(max_entries=4, show_spinner=False)
+def get_lot_list(content, name):
+    from tin_lot_portfolio import read_lots
+
+    buffer = io.BytesIO(content)
+    buffer.name = name
+    return read_lots(buffer)
+
+
+# ========== 输入与页面各部分的依赖关系 ==========
+# 侧边栏输入的 key，按用途分组
+PRICE_INPUTS = ("spot_price", "futures_price", "delivery_price", "quantity_ton")
+DATE_INPUTS = (
+    "contract_code", "start_date", "delivery_date",
+    "listing_date", "month_before_delivery_date", "delivery_month_start_date", "two_days_before_last_date"
+)
+MARGIN_RATE_INPUTS = ("rate_5", "rate_10", "rate_15", "rate_20")
+CAPITAL_INPUTS = ("interest_rate_slider", "enterprise_margin_addon")
+FEE_INPUTS = (
+    "inbound_method", "outbound_method", "use_train_application", "use_transport",
+    "packing_fee_input", "transfer_fee_input", "delivery_fee_input"
+)
+PARAM_INPUTS = ("vat_rate_input", "storage_fee_input")
+ALL_INPUTS = PRICE_INPUTS + DATE_INPUTS + MARGIN_RATE_INPUTS + CAPITAL_INPUTS + FEE_INPUTS + PARAM_INPUTS
+# 不含资金利息的成本（现货、增值税、交割杂费、仓储费）：与资金利率、保证金比例无关
+GOODS_COST_INPUTS = ("spot_price", "delivery_price", "quantity_ton") + DATE_INPUTS + FEE_INPUTS + PARAM_INPUTS
+# 全部成本（含资金利息）：期货价格只影响收入和利润，不影响成本
+COST_INPUTS = GOODS_COST_INPUTS + MARGIN_RATE_INPUTS + CAPITAL_INPUTS
+# 第四~六部分的显示开关（不参与测算）
+TOGGLE_INPUTS = ("show_sensitivity", "show_curve_scan", "show_lot_portfolio")
+
+# 页面部分（fragment 的 key）-> 依赖的输入，由 declared_fragment 注册
+SECTION_INPUTS = {}
+
+
+def rerun_sections(input_key):
+    """侧边栏输入的 on_change 回调：只重新运行依赖该输入的部分"""
+    global _scenario
+    _scenario = None
+    start_profiling()
+    st.rerun([section for section, inputs in SECTION_INPUTS.items() if input_key in inputs])
+
+
+def declared_input(key):
+    """侧边栏输入控件的公共参数：key，以及修改后按依赖关系局部刷新的回调"""
+    return dict(key=key, on_change=rerun_sections, args=(key,))
+
+
+def declared_fragment(key, inputs):
+    """把函数注册为依赖 inputs 的页面部分（带 key 的 st.fragment）"""
+    def decorate(function):
+        SECTION_INPUTS[key] = frozenset(inputs)
+        return st.fragment(key=key)(function)
+    return decorate
+
+
+def section(key, inputs):
+    """
+    依赖 inputs 的结果展示部分：render(scenario) 在 fragment 中运行，scenario 为当前输入的
+    测算结果；测算出错时只由 calculation_status 显示错误，各部分不显示
+    """
+    def decorate(render):
+        @declared_fragment(key, inputs)
+        def fragment():
+            scenario = current_scenario()
+            if scenario.error is not None:
+                return
+            try:
+                render(scenario)
+            except Exception as e:
+                st.error(f"计算错误: {str(e)}")
+                st.exception(e)
+        return fragment
+    return decorate
+
+
+# ========== 当前输入的测算结果 ==========
+# 入库费用映射
+inbound_fee_map = {
+    "不出入库": 0.0,
+    "专用线": 35.0,
+    "非箱式车辆自送": 30.0,
+    "箱式车自送（包括集装箱车辆）": 40.0
+}
+
+# 出库费用映射
+outbound_fee_map = {
+    "不出入库": 0.0,
+    "专用线": 35.0,
+    "非箱式车辆自提": 25.0,
+    "箱式车辆自提（包括集装箱车辆）": 35.0
+}
+
+
+class Scenario(NamedTuple):
+    """当前侧边栏输入及其测算结果（各部分共用）"""
+    spot_price: float
+    futures_price: float
+    delivery_price: float
+    quantity_ton: float
+    start_date: object
+    delivery_date: object
+    interest_rate: float
+    enterprise_margin_addon: float
+    margin_rates: tuple                     # 四个阶段的保证金比例
+    inbound_method: str
+    outbound_method: str
+    fee_items: tuple                        # 交割杂费参数 ((参数名, 元/吨), ...)
+    params: TinDeliveryParams               # 本次计算使用的交割参数（不修改共享的计算器）
+    margin_rate: Optional[float]
+    margin_info: Optional[dict]
+    cost: Optional[CostBreakdown]
+    error: Optional[Exception]
+
+
+def contract_date_defaults(contract_code, start_date):
+    """
+    合约代码对应的交割日期和保证金时间点（从预先计算好的合约信息表中查询）；
+    未知合约的交割日期取30天后，保证金时间点按交割日期推算
+    """
+    contract_info = get_registry().get(contract_code) if contract_code else None
+    if contract_info:
+        return {
+            "delivery_date": contract_info.delivery_date,
+            "listing_date": contract_info.listing_date,
+            "month_before_delivery_date": contract_info.month_before_delivery_date,
+            "delivery_month_start_date": contract_info.delivery_month_start_date,
+            "two_days_before_last_date": contract_info.two_days_before_last_date,
+        }
+    delivery_date = (datetime.now() + timedelta(days=30)).date()
+    return {
+        "delivery_date": delivery_date,
+        "listing_date": start_date,
+        "month_before_delivery_date": get_calendar().first_trading_day_of_month(
+            *((delivery_date.replace(day=1) - timedelta(days=1)).timetuple()[:2])
+        ),
+        "delivery_month_start_date": get_calendar().first_trading_day_of_month(delivery_date.year, delivery_date.month),
+        "two_days_before_last_date": get_calendar().offset(delivery_date, -2),
+    }
+
+
+def select_contract():
+    """合约代码的 on_change 回调：按新合约重置交割日期和保证金时间点，再刷新依赖它们的部分"""
+    st.session_state.update(contract_date_defaults(st.session_state.contract_code, st.session_state.start_date))
+    rerun_sections("contract_code")
+
+
+# 当前输入的测算结果：整页运行和输入的 on_change 回调中清空，之后第一个用到的部分测算，
+# 本次运行中的其余部分直接复用
+_scenario = None
+
+
+def current_scenario() -> Scenario:
+    """当前输入的测算结果（从 session_state 读取输入，局部刷新时也能取到最新输入）"""
+    global _scenario
+    if _scenario is None:
+        _scenario = build_scenario({key: st.session_state[key] for key in ALL_INPUTS})
+    return _scenario
+
+
+def build_scenario(inputs) -> Scenario:
+    """按输入（ALL_INPUTS 中的 key -> 值）测算"""
+    margin_rates = tuple(inputs[key] / 100 for key in MARGIN_RATE_INPUTS)
+    inbound_fee_per_ton = inbound_fee_map[inputs["inbound_method"]]
+    outbound_fee_per_ton = outbound_fee_map[inputs["outbound_method"]]
+    fee_items = tuple({
+        "inbound_fee_per_ton": inbound_fee_per_ton,
+        "outbound_fee_per_ton": outbound_fee_per_ton,
+        "train_application_fee_per_ton": 5.0 if inputs["use_train_application"] else 0.0,
+        "transport_fee_per_ton": 2.0 if inputs["use_transport"] else 0.0
+    }.items())
+    params = DEFAULT_PARAMS.replace(
+        packing_fee_per_ton=inputs["packing_fee_input"],
+        transfer_fee_per_ton=inputs["transfer_fee_input"],
+        delivery_fee_per_ton=inputs["delivery_fee_input"],
+        vat_rate=inputs["vat_rate_input"],
+        storage_fee_per_ton_per_day=inputs["storage_fee_input"]
+    )
+    scenario = Scenario(
+        spot_price=inputs["spot_price"],
+        futures_price=inputs["futures_price"],
+        delivery_price=inputs["delivery_price"],
+        quantity_ton=inputs["quantity_ton"],
+        start_date=inputs["start_date"],
+        delivery_date=inputs["delivery_date"],
+        interest_rate=inputs["interest_rate_slider"] / 100.0,  # 转换为小数形式用于计算
+        enterprise_margin_addon=inputs["enterprise_margin_addon"],
+        margin_rates=margin_rates,
+        inbound_method=inputs["inbound_method"],
+        outbound_method=inputs["outbound_method"],
+        fee_items=fee_items,
+        params=params,
+        margin_rate=None,
+        margin_info=None,
+        cost=None,
+        error=None
+    )
+
+    try:
+        # 计算动态保证金比例
+        start_dt = datetime.combine(scenario.start_date, datetime.min.time())
+        end_dt = datetime.combine(scenario.delivery_date, datetime.min.time())
+        margin_rate, margin_info = calculator.calculate_margin_rate(
+            start_dt,
+            end_dt,
+            None,  # last_trading_date不再需要
+            scenario.enterprise_margin_addon,
+            datetime.combine(inputs["listing_date"], datetime.min.time()),
+            datetime.combine(inputs["month_before_delivery_date"], datetime.min.time()),
+            datetime.combine(inputs["delivery_month_start_date"], datetime.min.time()),
+            datetime.combine(inputs["two_days_before_last_date"], datetime.min.time()),
+            *margin_rates
+        )
+
+        # 计算套利
+        cost = calculator.calculate_breakdown(
+            spot_price=scenario.spot_price,
+            futures_price=scenario.futures_price,
+            delivery_price=scenario.delivery_price,
+            quantity_ton=scenario.quantity_ton,
+            start_date=start_dt,
+            end_date=end_dt,
+            interest_rate=scenario.interest_rate,
+            margin_rate=margin_rate,
+            params=params,
+            packing_fee_per_ton=params.packing_fee_per_ton,
+            transfer_fee_per_ton=params.transfer_fee_per_ton,
+            delivery_fee_per_ton=params.delivery_fee_per_ton,
+            **dict(fee_items)
+        )
+    except Exception as e:
+        return scenario._replace(error=e)
+    return scenario._replace(margin_rate=margin_rate, margin_info=margin_info, cost=cost)
+
 
 # 标题
 st.markdown('<h1 class="main-header">📊 锡（Sn）期现交割成本测算模型</h1>', unsafe_allow_html=True)
@@ -60,147 +360,89 @@ st.sidebar.header("⚙️ 参数设置")
 
 # 基础参数
 st.sidebar.subheader("基础参数")
-spot_price = st.sidebar.number_input(
+st.sidebar.number_input(
     "现货价格（元/吨）",
     min_value=0.0,
     value=403250.0,
     step=1000.0,
     format="%.2f",
-    help="当前现货市场价格"
+    help="当前现货市场价格",
+    **declared_input("spot_price")
 )
 
-futures_price = st.sidebar.number_input(
+st.sidebar.number_input(
     "期货价格（元/吨）",
     min_value=0.0,
     value=408290.0,
     step=1000.0,
     format="%.2f",
-    help="期货合约价格"
+    help="期货合约价格",
+    **declared_input("futures_price")
 )
 
-delivery_price = st.sidebar.number_input(
+st.sidebar.number_input(
     "交割价格（元/吨）",
     min_value=0.0,
     value=408290.0,
     step=1000.0,
     format="%.2f",
-    help="实际交割价格（默认等于期货价格，可手动修改）"
+    help="实际交割价格（默认等于期货价格，可手动修改）",
+    **declared_input("delivery_price")
 )
 
-quantity_ton = st.sidebar.number_input(
+st.sidebar.number_input(
     "数量（吨）",
     min_value=0.1,
     value=10.0,
     step=0.5,
     format="%.2f",
-    help="交割数量"
+    help="交割数量",
+    **declared_input("quantity_ton")
 )
 
 # 合约和日期选择
 st.sidebar.subheader("合约和时间设置")
 
-# 合约代码输入
-contract_code = st.sidebar.text_input(
+# 合约代码输入：修改后按新合约重置交割日期和保证金时间点
+st.sidebar.text_input(
     "合约代码",
     value="sn2603",
     help="输入合约代码，如sn2603（会自动识别交割日为2026年3月15日）",
-    placeholder="sn2603"
+    placeholder="sn2603",
+    key="contract_code",
+    on_change=select_contract
 )
 
-# 解析合约代码并计算相关日期
-def calculate_contract_dates(contract_code):
-    """根据合约代码计算相关日期"""
-    if not contract_code:
-        return None, None, None, None, None
-    
-    import re
-    match = re.match(r'sn(\d{2})(\d{2})', contract_code.lower())
-    if not match:
-        return None, None, None, None, None
-    
-    year_str, month_str = match.groups()
-    year = 2000 + int(year_str)
-    month = int(month_str)
-    
-    if not (1 <= month <= 12):
-        return None, None, None, None, None
-    
-    # 交割日期：合约月15日
-    delivery_date = datetime(year, month, 15).date()
-    
-    # 合约挂牌日期：通常为交割月前一年左右，简化处理为交割月前11个月
-    # 例如：sn2612 (2026年12月) -> 2026年1月22日左右
-    # 这里简化为交割月前11个月的22日
-    listing_year = year
-    listing_month = month - 11
-    if listing_month <= 0:
-        listing_month += 12
-        listing_year -= 1
-    listing_date = datetime(listing_year, listing_month, 22).date()
-    
-    # 交割月前第一月的第一个交易日：交割月前一个月的1号
-    month_before_year = year
-    month_before_month = month - 1
-    if month_before_month <= 0:
-        month_before_month = 12
-        month_before_year -= 1
-    month_before_delivery_date = datetime(month_before_year, month_before_month, 1).date()
-    
-    # 交割月份第一个交易日：交割月的1号
-    delivery_month_start_date = datetime(year, month, 1).date()
-    
-    # 最后交易日前二个交易日：交割日前2个工作日
-    # 简化处理：交割日前2天（实际应该考虑工作日）
-    two_days_before_last_date = delivery_date - timedelta(days=2)
-    
-    return delivery_date, listing_date, month_before_delivery_date, delivery_month_start_date, two_days_before_last_date
-
-# 初始化session_state
-if 'last_contract_code' not in st.session_state:
-    st.session_state.last_contract_code = None
-
-# 解析合约代码
-delivery_date_default = None
-listing_date_default = None
-month_before_delivery_default = None
-delivery_month_start_default = None
-two_days_before_last_default = None
-
-if contract_code:
-    dates = calculate_contract_dates(contract_code)
-    if dates[0]:
-        delivery_date_default, listing_date_default, month_before_delivery_default, delivery_month_start_default, two_days_before_last_default = dates
-        
-        # 如果合约代码改变了，清除相关日期的session_state
-        if st.session_state.last_contract_code != contract_code:
-            # 清除日期相关的session_state
-            if 'listing_date_value' in st.session_state:
-                del st.session_state.listing_date_value
-            if 'month_before_delivery_value' in st.session_state:
-                del st.session_state.month_before_delivery_value
-            if 'delivery_month_start_value' in st.session_state:
-                del st.session_state.delivery_month_start_value
-            if 'two_days_before_last_value' in st.session_state:
-                del st.session_state.two_days_before_last_value
-            
-            st.session_state.last_contract_code = contract_code
-
 # 日期选择
-start_date = st.sidebar.date_input(
+st.sidebar.date_input(
     "开始日期（买入现货日期）",
     value=datetime.now().date(),
-    help="买入现货的日期"
+    help="买入现货的日期",
+    **declared_input("start_date")
 )
 
-delivery_date = st.sidebar.date_input(
-    "交割日期",
-    value=delivery_date_default if delivery_date_default else (datetime.now() + timedelta(days=30)).date(),
-    help="合约交割日（一般为合约月15日，法定假日顺延，可手动修改）"
-)
+# 交割日期和保证金时间点的初始值取自合约代码，之后随合约代码由 select_contract 更新
+for date_key, default_date in contract_date_defaults(
+    st.session_state.contract_code, st.session_state.start_date
+).items():
+    st.session_state.setdefault(date_key, default_date)
+
+
+# 随合约代码变化的日期输入放在各自的 fragment 中，修改合约代码时只重新绘制这些输入
+@declared_fragment("delivery_date_input", ("contract_code",))
+def delivery_date_input():
+    st.date_input(
+        "交割日期",
+        help="合约交割日（一般为合约月15日，法定假日顺延，可手动修改）",
+        **declared_input("delivery_date")
+    )
+
+with st.sidebar:
+    delivery_date_input()
 
 # 资金参数
 st.sidebar.subheader("资金参数")
-interest_rate_percent = st.sidebar.slider(
+st.sidebar.slider(
     "资金利率（年化）",
     min_value=0.0,
     max_value=20.0,
@@ -208,26 +450,53 @@ interest_rate_percent = st.sidebar.slider(
     step=0.1,
     format="%.1f%%",
     help="年化资金成本利率（同时用于现货和期货保证金）",
-    key="interest_rate_slider"
+    **declared_input("interest_rate_slider")
 )
-# 转换为小数形式用于计算
-interest_rate = interest_rate_percent / 100.0
 
-enterprise_margin_addon = st.sidebar.number_input(
+st.sidebar.number_input(
     "企业保证金加收比例",
     min_value=0.0,
     max_value=0.50,
     value=0.0,
     step=0.01,
     format="%.2f",
-    help="企业保证金加收比例（如0.05表示5%）"
+    help="企业保证金加收比例（如0.05表示5%）",
+    **declared_input("enterprise_margin_addon")
 )
 
+
+# 时间点设置（根据合约代码自动生成）
+@declared_fragment("margin_date_inputs", ("contract_code",))
+def margin_date_inputs():
+    st.date_input(
+        "合约挂牌日期",
+        help="合约挂牌日期（根据合约代码自动生成，可手动修改）",
+        **declared_input("listing_date")
+    )
+
+    st.date_input(
+        "交割月前第一月的第一个交易日",
+        help="交割月前第一月的第一个交易日（根据合约代码自动生成，可手动修改）",
+        **declared_input("month_before_delivery_date")
+    )
+
+    st.date_input(
+        "交割月份第一个交易日",
+        help="交割月份第一个交易日（根据合约代码自动生成，可手动修改）",
+        **declared_input("delivery_month_start_date")
+    )
+
+    st.date_input(
+        "最后交易日前二个交易日",
+        help="最后交易日前二个交易日（根据合约代码自动生成，可手动修改）",
+        **declared_input("two_days_before_last_date")
+    )
+
 # 保证金比例时间点设置
 st.sidebar.subheader("保证金比例时间点（可修改）")
 with st.sidebar.expander("保证金比例设置"):
     # 保证金比例值
-    rate_5_percent = st.number_input(
+    st.number_input(
         "第一阶段保证金比例（%）",
         min_value=0.0,
         max_value=100.0,
@@ -235,10 +504,10 @@ with st.sidebar.expander("保证金比例设置"):
         step=0.1,
         format="%.1f",
         help="合约挂牌之日起的保证金比例",
-        key="rate_5"
-    ) / 100
-    
-    rate_10_percent = st.number_input(
+        **declared_input("rate_5")
+    )
+
+    st.number_input(
         "第二阶段保证金比例（%）",
         min_value=0.0,
         max_value=100.0,
@@ -246,10 +515,10 @@ with st.sidebar.expander("保证金比例设置"):
         step=0.1,
         format="%.1f",
         help="交割月前第一月的第一个交易日起的保证金比例",
-        key="rate_10"
-    ) / 100
-    
-    rate_15_percent = st.number_input(
+        **declared_input("rate_10")
+    )
+
+    st.number_input(
         "第三阶段保证金比例（%）",
         min_value=0.0,
         max_value=100.0,
@@ -257,10 +526,10 @@ with st.sidebar.expander("保证金比例设置"):
         step=0.1,
         format="%.1f",
         help="交割月份第一个交易日起的保证金比例",
-        key="rate_15"
-    ) / 100
-    
-    rate_20_percent = st.number_input(
+        **declared_input("rate_15")
+    )
+
+    st.number_input(
         "第四阶段保证金比例（%）",
         min_value=0.0,
         max_value=100.0,
@@ -268,309 +537,195 @@ with st.sidebar.expander("保证金比例设置"):
         step=0.1,
         format="%.1f",
         help="最后交易日前二个交易日起的保证金比例",
-        key="rate_20"
-    ) / 100
-    
-    # 时间点设置（根据合约代码自动生成）
-    # 使用动态key，当合约代码改变时，key也会改变，从而重置日期值
-    listing_date_key = f"listing_date_{contract_code}"
-    month_before_delivery_key = f"month_before_delivery_{contract_code}"
-    delivery_month_start_key = f"delivery_month_start_{contract_code}"
-    two_days_before_last_key = f"two_days_before_last_{contract_code}"
-    
-    listing_date = st.date_input(
-        "合约挂牌日期",
-        value=listing_date_default if listing_date_default else start_date,
-        help="合约挂牌日期（根据合约代码自动生成，可手动修改）",
-        key=listing_date_key
-    )
-    
-    month_before_delivery_date = st.date_input(
-        "交割月前第一月的第一个交易日",
-        value=month_before_delivery_default if month_before_delivery_default else (delivery_date.replace(day=1) - timedelta(days=1)).replace(day=1),
-        help="交割月前第一月的第一个交易日（根据合约代码自动生成，可手动修改）",
-        key=month_before_delivery_key
-    )
-    
-    delivery_month_start_date = st.date_input(
-        "交割月份第一个交易日",
-        value=delivery_month_start_default if delivery_month_start_default else delivery_date.replace(day=1),
-        help="交割月份第一个交易日（根据合约代码自动生成，可手动修改）",
-        key=delivery_month_start_key
-    )
-    
-    two_days_before_last_date = st.date_input(
-        "最后交易日前二个交易日",
-        value=two_days_before_last_default if two_days_before_last_default else (delivery_date - timedelta(days=2)),
-        help="最后交易日前二个交易日（根据合约代码自动生成，可手动修改）",
-        key=two_days_before_last_key
+        **declared_input("rate_20")
     )
 
+    margin_date_inputs()
+
 # 入库/出库方式选择
 st.sidebar.subheader("入库/出库方式")
 
-inbound_method = st.sidebar.selectbox(
+st.sidebar.selectbox(
     "入库方式",
     ["不出入库", "专用线", "非箱式车辆自送", "箱式车自送（包括集装箱车辆）"],
-    help="选择入库方式（仓单交割选择'不出入库'）"
+    help="选择入库方式（仓单交割选择'不出入库'）",
+    **declared_input("inbound_method")
 )
 
-outbound_method = st.sidebar.selectbox(
+st.sidebar.selectbox(
     "出库方式",
     ["不出入库", "专用线", "非箱式车辆自提", "箱式车辆自提（包括集装箱车辆）"],
-    help="选择出库方式（仓单交割选择'不出入库'）"
+    help="选择出库方式（仓单交割选择'不出入库'）",
+    **declared_input("outbound_method")
 )
 
-# 入库费用映射
-inbound_fee_map = {
-    "不出入库": 0.0,
-    "专用线": 35.0,
-    "非箱式车辆自送": 30.0,
-    "箱式车自送（包括集装箱车辆）": 40.0
-}
-
-# 出库费用映射
-outbound_fee_map = {
-    "不出入库": 0.0,
-    "专用线": 35.0,
-    "非箱式车辆自提": 25.0,
-    "箱式车辆自提（包括集装箱车辆）": 35.0
-}
-
-inbound_fee_per_ton = inbound_fee_map[inbound_method]
-outbound_fee_per_ton = outbound_fee_map[outbound_method]
-
 # 代办费用
 st.sidebar.subheader("代办费用（可选）")
-use_train_application = st.sidebar.checkbox("代办车皮申请", value=False, help="5元/吨")
-use_transport = st.sidebar.checkbox("代办提运", value=False, help="2元/吨")
-
-train_application_fee_per_ton = 5.0 if use_train_application else 0.0
-transport_fee_per_ton = 2.0 if use_transport else 0.0
+st.sidebar.checkbox("代办车皮申请", value=False, help="5元/吨", **declared_input("use_train_application"))
+st.sidebar.checkbox("代办提运", value=False, help="2元/吨", **declared_input("use_transport"))
 
 # 其他交割参数
 st.sidebar.subheader("其他交割参数")
 with st.sidebar.expander("查看/修改其他交割参数"):
-    packing_fee = st.number_input(
+    st.number_input(
         "打包费（元/吨）",
         min_value=0.0,
-        value=calculator.packing_fee_per_ton,
+        value=DEFAULT_PARAMS.packing_fee_per_ton,
         step=1.0,
         format="%.2f",
-        key="packing_fee_input"
+        **declared_input("packing_fee_input")
     )
-    
-    transfer_fee = st.number_input(
+
+    st.number_input(
         "过户费（元/吨）",
         min_value=0.0,
-        value=calculator.transfer_fee_per_ton,
+        value=DEFAULT_PARAMS.transfer_fee_per_ton,
         step=0.1,
         format="%.2f",
-        key="transfer_fee_input"
+        **declared_input("transfer_fee_input")
     )
-    
-    delivery_fee = st.number_input(
+
+    st.number_input(
         "交割手续费（元/吨）",
         min_value=0.0,
-        value=calculator.delivery_fee_per_ton,
+        value=DEFAULT_PARAMS.delivery_fee_per_ton,
         step=0.1,
         format="%.2f",
-        key="delivery_fee_input"
+        **declared_input("delivery_fee_input")
     )
-    
-    vat_rate = st.number_input(
+
+    st.number_input(
         "增值税率",
         min_value=0.0,
         max_value=1.0,
-        value=calculator.vat_rate,
+        value=DEFAULT_PARAMS.vat_rate,
         step=0.01,
         format="%.2f",
         help="增值税率（如0.13表示13%）",
-        key="vat_rate_input"
+        **declared_input("vat_rate_input")
     )
-    
-    storage_fee = st.number_input(
+
+    st.number_input(
         "仓储费（元/吨·天）",
         min_value=0.0,
-        value=calculator.storage_fee_per_ton_per_day,
+        value=DEFAULT_PARAMS.storage_fee_per_ton_per_day,
         step=0.1,
         format="%.2f",
-        key="storage_fee_input"
+        **declared_input("storage_fee_input")
     )
-    
-    # 临时更新计算器参数
-    calculator.packing_fee_per_ton = packing_fee
-    calculator.transfer_fee_per_ton = transfer_fee
-    calculator.delivery_fee_per_ton = delivery_fee
-    calculator.vat_rate = vat_rate
-    calculator.storage_fee_per_ton_per_day = storage_fee
-
-# 计算动态保证金比例
-margin_rate, margin_info = calculator.calculate_margin_rate(
-    datetime.combine(start_date, datetime.min.time()),
-    datetime.combine(delivery_date, datetime.min.time()),
-    None,  # last_trading_date不再需要
-    enterprise_margin_addon,
-    datetime.combine(listing_date, datetime.min.time()),
-    datetime.combine(month_before_delivery_date, datetime.min.time()),
-    datetime.combine(delivery_month_start_date, datetime.min.time()),
-    datetime.combine(two_days_before_last_date, datetime.min.time()),
-    rate_5_percent,
-    rate_10_percent,
-    rate_15_percent,
-    rate_20_percent
-)
 
-# 计算套利
-try:
-    start_dt = datetime.combine(start_date, datetime.min.time())
-    end_dt = datetime.combine(delivery_date, datetime.min.time())
-    
-    result = calculator.check_arbitrage(
-        spot_price=spot_price,
-        futures_price=futures_price,
-        delivery_price=delivery_price,
-        quantity_ton=quantity_ton,
-        start_date=start_dt,
-        end_date=end_dt,
-        interest_rate=interest_rate,
-        margin_rate=margin_rate,
-        inbound_fee_per_ton=inbound_fee_per_ton,
-        outbound_fee_per_ton=outbound_fee_per_ton,
-        packing_fee_per_ton=packing_fee,
-        transfer_fee_per_ton=transfer_fee,
-        delivery_fee_per_ton=delivery_fee,
-        train_application_fee_per_ton=train_application_fee_per_ton,
-        transport_fee_per_ton=transport_fee_per_ton
-    )
-    
-    holding_days = result['input']['holding_days']
-    breakdown = result['cost_breakdown']
-    misc = breakdown['misc_fees']
-    
-    # ========== 第一部分：每吨各项成本 ==========
+# 性能调试
+st.sidebar.subheader("调试")
+if st.sidebar.checkbox("性能调试", key="show_profile", help="按阶段统计本次运行的计算耗时，显示在页面底部"):
+    st.sidebar.checkbox("同时采集 cProfile 数据", key="show_cprofile", help="开销较大，只在排查问题时开启")
+
+
+# 测算出错时在页面顶部显示错误，各部分不显示
+@declared_fragment("calculation_status", ALL_INPUTS)
+def calculation_status():
+    error = current_scenario().error
+    if error is not None:
+        st.error(f"计算错误: {str(error)}")
+        st.exception(error)
+
+
+# ========== 第一部分：每吨各项成本 ==========
+# 现货、交割杂费和仓储费与资金利率无关，资金成本和每吨总成本单独刷新
+@section("per_ton_costs", GOODS_COST_INPUTS)
+def per_ton_costs(scenario):
+    per_ton = scenario.cost.per_ton
     st.header("📊 第一部分：每吨各项成本")
-    
-    # 计算每吨成本
-    spot_cost_base_per_ton = spot_price  # 现货基价
-    # 增值税 = (交割价格 - 现货成本) × 增值税率
-    vat_per_ton = (delivery_price - spot_price) * vat_rate if delivery_price > spot_price else 0
-    spot_cost_per_ton = spot_price + vat_per_ton  # 现货成本（含增值税）
-    
-    # 交割杂费（每吨）
-    inbound_fee_per_ton_calc = inbound_fee_per_ton
-    outbound_fee_per_ton_calc = outbound_fee_per_ton
-    packing_fee_per_ton_calc = packing_fee
-    transfer_fee_per_ton_calc = transfer_fee
-    delivery_fee_per_ton_calc = delivery_fee
-    train_app_per_ton = train_application_fee_per_ton
-    transport_per_ton = transport_fee_per_ton
-    
-    misc_fees_per_ton = (
-        inbound_fee_per_ton_calc +
-        outbound_fee_per_ton_calc +
-        packing_fee_per_ton_calc +
-        transfer_fee_per_ton_calc +
-        delivery_fee_per_ton_calc +
-        train_app_per_ton +
-        transport_per_ton
-    )
-    
-    # 仓储费（每吨）
-    storage_cost_per_ton = storage_fee * holding_days
-    
-    # 资金成本（每吨）
-    # 现货资金成本（每吨）
-    spot_capital_amount_per_ton = spot_price * (1 + vat_rate)
-    spot_interest_per_ton = spot_capital_amount_per_ton * (interest_rate / 365) * holding_days
-    
-    # 期货保证金资金成本（每吨）
-    futures_capital_amount_per_ton = spot_price * margin_info['final_rate']
-    futures_interest_per_ton = futures_capital_amount_per_ton * (interest_rate / 365) * holding_days
-    
-    # 总资金成本（每吨）
-    total_interest_per_ton = spot_interest_per_ton + futures_interest_per_ton
-    
-    # 每吨总成本
-    total_cost_per_ton = (
-        spot_cost_per_ton +
-        misc_fees_per_ton +
-        storage_cost_per_ton +
-        total_interest_per_ton
-    )
-    
+
     # 显示每吨成本明细表
     cost_per_ton_data = {
         "成本项": [
             "现货基价",
             "增值税",
             "现货成本小计（含税）",
-            "入库费" if inbound_fee_per_ton_calc > 0 else None,
-            "出库费" if outbound_fee_per_ton_calc > 0 else None,
+            "入库费" if per_ton.inbound_fee > 0 else None,
+            "出库费" if per_ton.outbound_fee > 0 else None,
             "打包费",
             "过户费",
             "交割手续费",
-            "代办车皮申请" if train_app_per_ton > 0 else None,
-            "代办提运" if transport_per_ton > 0 else None,
+            "代办车皮申请" if per_ton.train_application_fee > 0 else None,
+            "代办提运" if per_ton.transport_fee > 0 else None,
             "交割杂费小计",
-            "仓储费",
-            "现货资金成本",
-            "期货保证金资金成本",
-            "总资金成本",
-            "**每吨总成本**"
+            "仓储费"
         ],
         "金额（元/吨）": [
-            spot_cost_base_per_ton,
-            vat_per_ton,
-            spot_cost_per_ton,
-            inbound_fee_per_ton_calc if inbound_fee_per_ton_calc > 0 else None,
-            outbound_fee_per_ton_calc if outbound_fee_per_ton_calc > 0 else None,
-            packing_fee_per_ton_calc,
-            transfer_fee_per_ton_calc,
-            delivery_fee_per_ton_calc,
-            train_app_per_ton if train_app_per_ton > 0 else None,
-            transport_per_ton if transport_per_ton > 0 else None,
-            misc_fees_per_ton,
-            storage_cost_per_ton,
-            spot_interest_per_ton,
-            futures_interest_per_ton,
-            total_interest_per_ton,
-            total_cost_per_ton
+            per_ton.spot_cost_base,
+            per_ton.vat_amount,
+            per_ton.spot_cost_with_vat,
+            per_ton.inbound_fee if per_ton.inbound_fee > 0 else None,
+            per_ton.outbound_fee if per_ton.outbound_fee > 0 else None,
+            per_ton.packing_fee,
+            per_ton.transfer_fee,
+            per_ton.delivery_fee,
+            per_ton.train_application_fee if per_ton.train_application_fee > 0 else None,
+            per_ton.transport_fee if per_ton.transport_fee > 0 else None,
+            per_ton.total_misc_fees,
+            per_ton.storage_cost
         ]
     }
-    
+
     # 过滤掉None值
     filtered_data = {
         "成本项": [item for item in cost_per_ton_data["成本项"] if item is not None],
         "金额（元/吨）": [val for val in cost_per_ton_data["金额（元/吨）"] if val is not None]
     }
-    
+
     cost_per_ton_df = pd.DataFrame(filtered_data)
     cost_per_ton_df['金额（元/吨）'] = cost_per_ton_df['金额（元/吨）'].apply(lambda x: f"{x:,.2f}")
-    
-    st.dataframe(cost_per_ton_df, use_container_width=True, hide_index=True)
-    
-    # ========== 第二部分：资金需求 ==========
+
+    st.dataframe(cost_per_ton_df, width="stretch", hide_index=True)
+
+
+@section("per_ton_capital", COST_INPUTS)
+def per_ton_capital(scenario):
+    per_ton = scenario.cost.per_ton
+    capital_per_ton_df = pd.DataFrame({
+        "成本项": ["现货资金成本", "期货保证金资金成本", "总资金成本", "**每吨总成本**"],
+        "金额（元/吨）": [
+            f"{value:,.2f}" for value in (
+                per_ton.spot_capital_cost,
+                per_ton.futures_capital_cost,
+                per_ton.capital_cost,
+                per_ton.total_cost
+            )
+        ]
+    })
+    st.dataframe(capital_per_ton_df, width="stretch", hide_index=True)
+
+
+# ========== 第二部分：资金需求 ==========
+# 资金占用不含利息，与资金利率、交割杂费无关
+@section(
+    "capital_needs",
+    ("spot_price", "delivery_price", "quantity_ton", "vat_rate_input", "enterprise_margin_addon")
+    + DATE_INPUTS + MARGIN_RATE_INPUTS
+)
+def capital_needs(scenario):
+    total = scenario.cost.total
+    margin_info = scenario.margin_info
     st.header("💰 第二部分：资金需求")
-    
-    # 计算资金需求
-    # 现货资金占用 = 现货成本 + 增值税
-    spot_capital_total = breakdown['spot_cost_with_vat']  # 购买现货需要资金（含增值税）
-    futures_margin_total = spot_price * quantity_ton * margin_info['final_rate']  # 购买期货需要资金（保证金）
+
+    # 资金需求：现货资金占用（含增值税）+ 期货保证金占用
+    spot_capital_total = total.spot_capital_amount  # 购买现货需要资金（含增值税）
+    futures_margin_total = total.futures_capital_amount  # 购买期货需要资金（保证金）
     total_capital_needed = spot_capital_total + futures_margin_total  # 总资金需求
-    
+
     capital_col1, capital_col2, capital_col3 = st.columns(3)
-    
+
     with capital_col1:
         st.metric(
             "购买现货需要资金",
             f"¥{spot_capital_total:,.2f}",
             help="现货成本 + 增值税"
         )
-        st.caption(f"现货基价: ¥{spot_price:,.2f}/吨")
-        st.caption(f"数量: {quantity_ton:.2f} 吨")
-        st.caption(f"增值税: ¥{breakdown['vat_amount']:,.2f}")
-    
+        st.caption(f"现货基价: ¥{scenario.spot_price:,.2f}/吨")
+        st.caption(f"数量: {scenario.quantity_ton:.2f} 吨")
+        st.caption(f"增值税: ¥{total.vat_amount:,.2f}")
+
     with capital_col2:
         st.metric(
             "购买期货需要资金（保证金）",
@@ -578,8 +733,8 @@ try:
             help="现货价格 × 数量 × 保证金比例"
         )
         st.caption(f"保证金比例: {margin_info['final_rate']*100:.2f}%")
-        st.caption(f"（平均: {margin_info['average_rate']*100:.2f}% + 企业加收: {enterprise_margin_addon*100:.2f}%）")
-    
+        st.caption(f"（平均: {margin_info['average_rate']*100:.2f}% + 企业加收: {scenario.enterprise_margin_addon*100:.2f}%）")
+
     with capital_col3:
         st.metric(
             "总资金需求",
@@ -587,32 +742,38 @@ try:
             help="现货资金 + 期货保证金"
         )
         st.caption("需要准备的总资金")
-    
-    # ========== 第三部分：按数量计算总成本 ==========
+
+
+# ========== 第三部分：按数量计算总成本 ==========
+# 套利结论依赖利润（期货价格），总成本明细只依赖成本
+@section("arbitrage_result", ALL_INPUTS)
+def arbitrage_result(scenario):
+    cost = scenario.cost
     st.header("📋 第三部分：按数量计算总成本")
-    
-    # 套利判断结果
-    arbitrage_result = result['arbitrage']
-    can_arbitrage = arbitrage_result['can_arbitrage']
-    
+
     # 显示套利结果
-    if can_arbitrage:
+    if cost.can_arbitrage:
         st.markdown(f"""
         <div class="arbitrage-yes">
             <h2>✅ 可以套利！</h2>
-            <p><strong>预期利润：</strong>¥{arbitrage_result['profit']:,.2f}（{arbitrage_result['profit_per_ton']:,.2f} 元/吨）</p>
-            <p><strong>利润率：</strong>{arbitrage_result['profit_rate']:.2f}%</p>
+            <p><strong>预期利润：</strong>¥{cost.profit:,.2f}（{cost.profit_per_ton:,.2f} 元/吨）</p>
+            <p><strong>利润率：</strong>{cost.profit_rate:.2f}%</p>
         </div>
         """, unsafe_allow_html=True)
     else:
         st.markdown(f"""
         <div class="arbitrage-no">
             <h2>❌ 无法套利</h2>
-            <p><strong>预期亏损：</strong>¥{abs(arbitrage_result['profit']):,.2f}（{abs(arbitrage_result['profit_per_ton']):,.2f} 元/吨）</p>
-            <p><strong>需要期货价格达到：</strong>¥{arbitrage_result['break_even_futures_price']:,.2f}/吨 才能保本</p>
+            <p><strong>预期亏损：</strong>¥{abs(cost.profit):,.2f}（{abs(cost.profit_per_ton):,.2f} 元/吨）</p>
+            <p><strong>需要期货价格达到：</strong>¥{cost.break_even_price:,.2f}/吨 才能保本</p>
         </div>
         """, unsafe_allow_html=True)
-    
+
+
+@section("total_costs", COST_INPUTS)
+def total_costs(scenario):
+    total = scenario.cost.total
+
     # 总成本明细
     total_cost_data = {
         "成本项": [
@@ -625,147 +786,172 @@ try:
             "**总成本**"
         ],
         "金额（元）": [
-            breakdown['spot_cost_with_vat'],
-            breakdown['misc_fees']['total_misc_fees'],
-            breakdown['storage_cost'],
-            breakdown['spot_capital_cost'],
-            breakdown['futures_capital_cost'],
-            breakdown['capital_cost'],
-            result['summary']['total_cost']
+            total.spot_cost_with_vat,
+            total.total_misc_fees,
+            total.storage_cost,
+            total.spot_capital_cost,
+            total.futures_capital_cost,
+            total.capital_cost,
+            total.total_cost
         ]
     }
-    
+
     total_cost_df = pd.DataFrame(total_cost_data)
-    total_cost_df['占比'] = (total_cost_df['金额（元）'] / result['summary']['total_cost'] * 100).round(2)
+    total_cost_df['占比'] = (total_cost_df['金额（元）'] / total.total_cost * 100).round(2)
     total_cost_df['金额（元）'] = total_cost_df['金额（元）'].apply(lambda x: f"{x:,.2f}")
     total_cost_df['占比'] = total_cost_df['占比'].apply(lambda x: f"{x:.2f}%")
-    
-    st.dataframe(total_cost_df, use_container_width=True, hide_index=True)
-    
-    # 交割杂费明细
+
+    st.dataframe(total_cost_df, width="stretch", hide_index=True)
+
+
+# 交割杂费明细：只与数量和各项费率有关
+@section("misc_fees", ("quantity_ton",) + FEE_INPUTS)
+def misc_fees(scenario):
+    total = scenario.cost.total
     st.subheader("交割杂费明细")
     misc_items = []
     misc_values = []
-    
-    if misc['inbound_fee'] > 0:
-        misc_items.append(f"入库费（{inbound_method}）")
-        misc_values.append(misc['inbound_fee'])
-    if misc['outbound_fee'] > 0:
-        misc_items.append(f"出库费（{outbound_method}）")
-        misc_values.append(misc['outbound_fee'])
-    if misc['packing_fee'] > 0:
+
+    if total.inbound_fee > 0:
+        misc_items.append(f"入库费（{scenario.inbound_method}）")
+        misc_values.append(total.inbound_fee)
+    if total.outbound_fee > 0:
+        misc_items.append(f"出库费（{scenario.outbound_method}）")
+        misc_values.append(total.outbound_fee)
+    if total.packing_fee > 0:
         misc_items.append("打包费")
-        misc_values.append(misc['packing_fee'])
-    if misc['transfer_fee'] > 0:
+        misc_values.append(total.packing_fee)
+    if total.transfer_fee > 0:
         misc_items.append("过户费")
-        misc_values.append(misc['transfer_fee'])
-    if misc['delivery_fee'] > 0:
+        misc_values.append(total.transfer_fee)
+    if total.delivery_fee > 0:
         misc_items.append("交割手续费")
-        misc_values.append(misc['delivery_fee'])
-    if misc['train_application_fee'] > 0:
+        misc_values.append(total.delivery_fee)
+    if total.train_application_fee > 0:
         misc_items.append("代办车皮申请")
-        misc_values.append(misc['train_application_fee'])
-    if misc['transport_fee'] > 0:
+        misc_values.append(total.train_application_fee)
+    if total.transport_fee > 0:
         misc_items.append("代办提运")
-        misc_values.append(misc['transport_fee'])
-    
+        misc_values.append(total.transport_fee)
+
     if misc_items:
         misc_df = pd.DataFrame({
             "费用项": misc_items,
             "金额（元）": [f"{v:,.2f}" for v in misc_values]
         })
-        st.dataframe(misc_df, use_container_width=True, hide_index=True)
-    
-    # 关键指标
+        st.dataframe(misc_df, width="stretch", hide_index=True)
+
+
+# 关键指标：总成本、单位成本和利润都含资金利息，利润还依赖期货价格，因此依赖全部输入
+@section("key_metrics", ALL_INPUTS)
+def key_metrics(scenario):
+    cost = scenario.cost
     st.subheader("关键指标")
     col1, col2, col3, col4 = st.columns(4)
-    
+
     with col1:
         st.metric(
             "总成本",
-            f"¥{result['summary']['total_cost']:,.2f}",
+            f"¥{cost.total.total_cost:,.2f}",
             help="期现套利总成本"
         )
-    
+
     with col2:
         st.metric(
             "单位成本",
-            f"¥{result['summary']['cost_per_ton']:,.2f}/吨",
+            f"¥{cost.cost_per_ton:,.2f}/吨",
             help="每吨成本"
         )
-    
+
     with col3:
         st.metric(
             "期货收入",
-            f"¥{arbitrage_result['futures_revenue']:,.2f}",
+            f"¥{cost.futures_revenue:,.2f}",
             help="期货交割收入"
         )
-    
+
     with col4:
-        delta_label = f"{arbitrage_result['profit_rate']:.2f}%"
+        delta_label = f"{cost.profit_rate:.2f}%"
         st.metric(
             "预期利润",
-            f"¥{arbitrage_result['profit']:,.2f}",
-            delta=delta_label if can_arbitrage else None,
-            delta_color="normal" if can_arbitrage else "inverse",
+            f"¥{cost.profit:,.2f}",
+            delta=delta_label if cost.can_arbitrage else None,
+            delta_color="normal" if cost.can_arbitrage else "inverse",
             help="预期利润（期货收入 - 总成本）"
         )
-    
-    # 详细说明
-    st.subheader("详细说明")
-    detail_col1, detail_col2 = st.columns(2)
-    
-    with detail_col1:
-        st.markdown("### 成本构成说明")
-        st.markdown(f"""
-        - **现货成本（含税）**: ¥{breakdown['spot_cost_with_vat']:,.2f}
-          - 现货基价: ¥{breakdown['spot_cost_base']:,.2f}
-          - 增值税 ({vat_rate*100:.0f}%): ¥{breakdown['vat_amount']:,.2f}
-          - 计算公式: (交割价格 {delivery_price:,.2f} - 现货价格 {spot_price:,.2f}) × {vat_rate*100:.0f}%
-        
-        - **交割杂费**: ¥{breakdown['misc_fees']['total_misc_fees']:,.2f}
-          {f"- 入库费: ¥{misc['inbound_fee']:,.2f}" if misc['inbound_fee'] > 0 else ""}
-          {f"- 出库费: ¥{misc['outbound_fee']:,.2f}" if misc['outbound_fee'] > 0 else ""}
-          - 打包费: ¥{misc['packing_fee']:,.2f}
-          - 过户费: ¥{misc['transfer_fee']:,.2f}
-          - 交割手续费: ¥{misc['delivery_fee']:,.2f}
-          {f"- 代办车皮申请: ¥{misc['train_application_fee']:,.2f}" if misc['train_application_fee'] > 0 else ""}
-          {f"- 代办提运: ¥{misc['transport_fee']:,.2f}" if misc['transport_fee'] > 0 else ""}
-        
-        - **仓储费**: ¥{breakdown['storage_cost']:,.2f}
-          - 费率: ¥{storage_fee:.2f}/吨·天 × {quantity_ton:.2f}吨 × {holding_days}天
-        """)
-    
-    with detail_col2:
-        st.markdown("### 资金成本说明")
-        st.markdown(f"""
-        - **现货资金成本**: ¥{breakdown['spot_capital_cost']:,.2f}
-          - 资金占用: ¥{spot_capital_total:,.2f}
-          - 利率: {interest_rate*100:.2f}% (年化)
-          - 持有天数: {holding_days} 天
-        
-        - **期货保证金资金成本**: ¥{breakdown['futures_capital_cost']:,.2f}
-          - 保证金占用: ¥{futures_margin_total:,.2f}
-          - 保证金比例: {margin_info['final_rate']*100:.2f}%
-          - 利率: {interest_rate*100:.2f}% (年化)
-          - 持有天数: {holding_days} 天
-        
-        - **总资金成本**: ¥{breakdown['capital_cost']:,.2f}
-        """)
-        
-        st.markdown("### 套利分析")
-        st.markdown(f"""
-        - **现货价格**: ¥{spot_price:,.2f}/吨
-        - **期货价格**: ¥{futures_price:,.2f}/吨
-        - **交割价格**: ¥{delivery_price:,.2f}/吨
-        - **盈亏平衡点**: ¥{arbitrage_result['break_even_futures_price']:,.2f}/吨
-        - **期货收入**: ¥{arbitrage_result['futures_revenue']:,.2f}
-        - **总成本（不含税）**: ¥{arbitrage_result['total_cost_excl_vat']:,.2f}
-        - **预期利润**: ¥{arbitrage_result['profit']:,.2f}
-        - **利润率**: {arbitrage_result['profit_rate']:.2f}%
-        """)
-    
-    # 保证金时间段明细
+
+
+# 详细说明：成本构成、资金成本、套利分析三段分别刷新
+@section("cost_notes", ("spot_price", "delivery_price", "quantity_ton") + DATE_INPUTS + FEE_INPUTS + PARAM_INPUTS)
+def cost_notes(scenario):
+    total = scenario.cost.total
+    params = scenario.params
+    st.markdown("### 成本构成说明")
+    st.markdown(f"""
+    - **现货成本（含税）**: ¥{total.spot_cost_with_vat:,.2f}
+      - 现货基价: ¥{total.spot_cost_base:,.2f}
+      - 增值税 ({params.vat_rate*100:.0f}%): ¥{total.vat_amount:,.2f}
+      - 计算公式: (交割价格 {scenario.delivery_price:,.2f} - 现货价格 {scenario.spot_price:,.2f}) × {params.vat_rate*100:.0f}%
+
+    - **交割杂费**: ¥{total.total_misc_fees:,.2f}
+      {f"- 入库费: ¥{total.inbound_fee:,.2f}" if total.inbound_fee > 0 else ""}
+      {f"- 出库费: ¥{total.outbound_fee:,.2f}" if total.outbound_fee > 0 else ""}
+      - 打包费: ¥{total.packing_fee:,.2f}
+      - 过户费: ¥{total.transfer_fee:,.2f}
+      - 交割手续费: ¥{total.delivery_fee:,.2f}
+      {f"- 代办车皮申请: ¥{total.train_application_fee:,.2f}" if total.train_application_fee > 0 else ""}
+      {f"- 代办提运: ¥{total.transport_fee:,.2f}" if total.transport_fee > 0 else ""}
+
+    - **仓储费**: ¥{total.storage_cost:,.2f}
+      - 费率: ¥{params.storage_fee_per_ton_per_day:.2f}/吨·天 × {scenario.quantity_ton:.2f}吨 × {scenario.cost.holding_days}天
+    """)
+
+
+@section(
+    "capital_notes",
+    ("spot_price", "delivery_price", "quantity_ton", "vat_rate_input") + DATE_INPUTS + MARGIN_RATE_INPUTS + CAPITAL_INPUTS
+)
+def capital_notes(scenario):
+    total = scenario.cost.total
+    holding_days = scenario.cost.holding_days
+    st.markdown("### 资金成本说明")
+    st.markdown(f"""
+    - **现货资金成本**: ¥{total.spot_capital_cost:,.2f}
+      - 资金占用: ¥{total.spot_capital_amount:,.2f}
+      - 利率: {scenario.interest_rate*100:.2f}% (年化)
+      - 持有天数: {holding_days} 天
+
+    - **期货保证金资金成本**: ¥{total.futures_capital_cost:,.2f}
+      - 保证金占用: ¥{total.futures_capital_amount:,.2f}
+      - 保证金比例: {scenario.margin_info['final_rate']*100:.2f}%
+      - 利率: {scenario.interest_rate*100:.2f}% (年化)
+      - 持有天数: {holding_days} 天
+
+    - **总资金成本**: ¥{total.capital_cost:,.2f}
+    """)
+
+
+# 盈亏平衡点、利润依赖全部输入
+@section("arbitrage_notes", ALL_INPUTS)
+def arbitrage_notes(scenario):
+    cost = scenario.cost
+    st.markdown("### 套利分析")
+    st.markdown(f"""
+    - **现货价格**: ¥{scenario.spot_price:,.2f}/吨
+    - **期货价格**: ¥{scenario.futures_price:,.2f}/吨
+    - **交割价格**: ¥{scenario.delivery_price:,.2f}/吨
+    - **盈亏平衡点**: ¥{cost.break_even_price:,.2f}/吨
+    - **期货收入**: ¥{cost.futures_revenue:,.2f}
+    - **总成本（不含税）**: ¥{cost.total_cost_excl_vat:,.2f}
+    - **预期利润**: ¥{cost.profit:,.2f}
+    - **利润率**: {cost.profit_rate:.2f}%
+    """)
+
+
+# 保证金时间段明细：只与日期和各阶段保证金比例有关
+@section("margin_periods", DATE_INPUTS + MARGIN_RATE_INPUTS)
+def margin_periods(scenario):
+    margin_info = scenario.margin_info
     if margin_info.get('periods'):
         st.subheader("保证金时间段明细")
         periods_data = []
@@ -779,24 +965,403 @@ try:
                 '保证金比例': f"{period['rate']*100:.1f}%"
             })
         periods_df = pd.DataFrame(periods_data)
-        st.dataframe(periods_df, use_container_width=True, hide_index=True)
-    
-    # 时间信息
+        st.dataframe(periods_df, width="stretch", hide_index=True)
+
+
+# 时间信息
+@section("time_info", DATE_INPUTS)
+def time_info(scenario):
     st.subheader("时间信息")
     time_col1, time_col2, time_col3 = st.columns(3)
-    
+
     with time_col1:
-        st.metric("开始日期", start_date.strftime("%Y-%m-%d"))
-    
+        st.metric("开始日期", scenario.start_date.strftime("%Y-%m-%d"))
+
     with time_col2:
-        st.metric("交割日期", delivery_date.strftime("%Y-%m-%d"))
-    
+        st.metric("交割日期", scenario.delivery_date.strftime("%Y-%m-%d"))
+
     with time_col3:
-        st.metric("持有天数", f"{holding_days} 天")
+        st.metric("持有天数", f"{scenario.cost.holding_days} 天")
+
+
+# ========== 第四部分：敏感性分析 ==========
+# 第四、五部分计算量大（网格计算、全部合约扫描）且依赖 plotly 等较重的模块，
+# 默认收起，打开开关后才计算；开关和部分内的坐标轴等只重新运行该部分。
+# 网格以当前全部输入为基准，依赖全部输入
+@section("sensitivity", ALL_INPUTS + ("show_sensitivity",))
+def sensitivity(scenario):
+    if not st.session_state.show_sensitivity:
+        return
+    from tin_sensitivity import SENSITIVITY_AXES, SENSITIVITY_METRICS
+
+    axis_names = list(SENSITIVITY_AXES)
+    sens_col1, sens_col2, sens_col3, sens_col4 = st.columns(4)
+    with sens_col1:
+        x_axis = st.selectbox(
+            "横轴", axis_names, index=0,
+            format_func=SENSITIVITY_AXES.get, key="sensitivity_x_axis"
+        )
+    with sens_col2:
+        y_axis = st.selectbox(
+            "纵轴", [axis for axis in axis_names if axis != x_axis], index=0,
+            format_func=SENSITIVITY_AXES.get, key="sensitivity_y_axis"
+        )
+    with sens_col3:
+        metric = st.selectbox(
+            "指标", list(SENSITIVITY_METRICS),
+            format_func=SENSITIVITY_METRICS.get, key="sensitivity_metric"
+        )
+    with sens_col4:
+        spread_percent = st.slider(
+            "价格浮动范围", min_value=1, max_value=20, value=5, step=1,
+            format="±%d%%", key="sensitivity_spread",
+            help="现货价格、期货价格坐标轴相对当前值的上下浮动比例"
+        )
+
+    # 基准输入：交割价格与期货价格相同时，交割价格随期货价格变化
+    sensitivity_base = {
+        "spot_price": scenario.spot_price,
+        "futures_price": scenario.futures_price,
+        "delivery_price": None if scenario.delivery_price == scenario.futures_price else scenario.delivery_price,
+        "quantity_ton": scenario.quantity_ton,
+        "start_date": scenario.start_date,
+        "holding_days": scenario.cost.holding_days,
+        "interest_rate": scenario.interest_rate,
+        "margin_rate": scenario.margin_info['average_rate'],
+        "margin_addon": scenario.enterprise_margin_addon,
+        "fees": scenario.fee_items
+    }
+    grid = get_sensitivity_grid(
+        scenario.params, tuple(sensitivity_base.items()), x_axis, y_axis, spread_percent / 100
+    )
+
+    import plotly.graph_objects as go
+
+    is_profit_metric = metric != "break_even_futures_price"
+    heatmap = go.Figure(go.Heatmap(
+        x=grid["x"],
+        y=grid["y"],
+        z=grid[metric],
+        colorscale="RdYlGn" if is_profit_metric else "Viridis",
+        zmid=0 if is_profit_metric else None,
+        colorbar=dict(title=SENSITIVITY_METRICS[metric])
+    ))
+    heatmap.add_trace(go.Scatter(
+        x=[sensitivity_base[x_axis]],
+        y=[sensitivity_base[y_axis]],
+        mode="markers",
+        marker=dict(symbol="x", size=12, color="black"),
+        name="当前输入",
+        showlegend=False
+    ))
+    percent_axes = ("interest_rate", "margin_addon")
+    heatmap.update_layout(
+        xaxis=dict(title=SENSITIVITY_AXES[x_axis], tickformat=".1%" if x_axis in percent_axes else None),
+        yaxis=dict(title=SENSITIVITY_AXES[y_axis], tickformat=".1%" if y_axis in percent_axes else None),
+        height=520,
+        margin=dict(l=60, r=20, t=30, b=60)
+    )
+    st.plotly_chart(heatmap, width="stretch")
+    if "holding_days" in (x_axis, y_axis):
+        st.caption(
+            f"持有天数坐标轴上保证金比例固定为当前持有期的平均比例 {sensitivity_base['margin_rate']*100:.2f}%"
+            f"（另加企业加收），不按各持有天数重算动态保证金阶梯"
+        )
+
+
+# ========== 第五部分：全曲线扫描 ==========
+# 各合约按自己的交割日期和保证金阶梯计算，与当前合约代码、交割日期无关
+@section(
+    "curve_scan",
+    PRICE_INPUTS + ("start_date",) + MARGIN_RATE_INPUTS + CAPITAL_INPUTS + FEE_INPUTS + PARAM_INPUTS
+    + ("show_curve_scan",)
+)
+def curve_scan(scenario):
+    if not st.session_state.show_curve_scan:
+        return
+    from tin_curve_scanner import scan_curve
+
+    start_date = scenario.start_date
+    listed_codes = [info.code for info in get_registry().listed_contracts(start_date)]
+    # 报价表随交易日重置；默认各合约都取当前期货价格，可逐个修改或清空
+    quotes = st.data_editor(
+        pd.DataFrame({"合约代码": listed_codes, "期货价格（元/吨）": [scenario.futures_price] * len(listed_codes)}),
+        disabled=["合约代码"],
+        hide_index=True,
+        key=f"curve_quotes_{start_date}"
+    )
+    scan = scan_curve(
+        scenario.spot_price,
+        dict(zip(quotes["合约代码"], quotes["期货价格（元/吨）"])),
+        start_date,
+        params=scenario.params,
+        quantity_ton=scenario.quantity_ton,
+        interest_rate=scenario.interest_rate,
+        enterprise_margin_addon=scenario.enterprise_margin_addon,
+        margin_rates=scenario.margin_rates,
+        fee_kwargs=dict(scenario.fee_items),
+        calculator=calculator
+    )
+
+    if scan.empty:
+        st.info("当前交易日没有可扫描的合约报价")
+        return
+    break_even_table = get_break_even_table(
+        scenario.params,
+        scenario.interest_rate,
+        scenario.enterprise_margin_addon,
+        scenario.margin_rates,
+        scenario.fee_items
+    )
+    required_futures_price = break_even_table.break_even_batch(
+        scan["contract_code"].to_numpy(), start_date, scenario.spot_price
+    )
+    best = scan.iloc[0]
+    best_col1, best_col2, best_col3 = st.columns(3)
+    with best_col1:
+        st.metric("年化收益率最高的合约", best["contract_code"])
+    with best_col2:
+        st.metric("年化收益率", f"{best['annualized_return']:.2f}%")
+    with best_col3:
+        st.metric("预期利润", f"{best['profit']:,.2f} 元")
+
+    st.dataframe(
+        pd.DataFrame({
+            "合约代码": scan["contract_code"],
+            "交割日期": scan["delivery_date"].dt.strftime("%Y-%m-%d"),
+            "持有天数": scan["holding_days"],
+            "期货价格（元/吨）": scan["futures_price"].map("{:,.2f}".format),
+            "升水（元/吨）": scan["premium"].map("{:,.2f}".format),
+            "平均保证金比例": scan["margin_rate"].map("{:.2%}".format),
+            "盈亏平衡期货价格（元/吨）": scan["break_even_futures_price"].map("{:,.2f}".format),
+            "保本期货价格（元/吨）": pd.Series(required_futures_price).map("{:,.2f}".format),
+            "预期利润（元）": scan["profit"].map("{:,.2f}".format),
+            "利润率": scan["profit_rate"].map("{:.2f}%".format),
+            "年化收益率": scan["annualized_return"].map("{:.2f}%".format),
+            "可以套利": scan["can_arbitrage"].map({True: "✅", False: "❌"})
+        }),
+        width="stretch",
+        hide_index=True
+    )
+    st.caption("年化收益率 = 预期利润 / 占用资金（含税现货 + 期货保证金）× 365 / 持有天数")
+    st.caption("保本期货价格：交割价格随期货价格变化时刚好不亏的期货价格（增值税同时变化），取自预先计算的盈亏平衡查找表；开始日期不是交易日时为 nan")
+
+
+# ========== 第六部分：仓单组合 ==========
+# 仓单组合保存在会话中：上传新的清单或修改利率、保证金、交割杂费、交割参数时重建，
+# 修改某个合约的期货价格时只重算该合约的仓单
+@section(
+    "lot_portfolio",
+    ("futures_price",) + MARGIN_RATE_INPUTS + CAPITAL_INPUTS + FEE_INPUTS + PARAM_INPUTS + ("show_lot_portfolio",)
+)
+def lot_portfolio(scenario):
+    if not st.session_state.show_lot_portfolio:
+        return
+    from tin_lot_portfolio import LotPortfolio
+
+    uploaded = st.file_uploader("仓单清单（CSV 或 Excel）", type=["csv", "xlsx", "xls"], key="lot_file")
+    if uploaded is None:
+        st.info(
+            "每行一笔仓单，列：contract_code（合约代码）、purchase_date（买入日期）、"
+            "spot_price（买入现货价格，元/吨），可选 lot_id（仓单编号）、"
+            "quantity_ton（数量，默认一个交割单位 2 吨）、futures_price（期货价格，缺省时使用侧边栏的期货价格）"
+        )
+        return
+
+    settings = (
+        uploaded.file_id, scenario.futures_price, scenario.params, scenario.interest_rate,
+        scenario.enterprise_margin_addon, scenario.margin_rates, scenario.fee_items
+    )
+    state = st.session_state.get("lot_portfolio_state")
+    if state is None or state["settings"] != settings:
+        portfolio = LotPortfolio(
+            scenario.params,
+            interest_rate=scenario.interest_rate,
+            enterprise_margin_addon=scenario.enterprise_margin_addon,
+            margin_rates=scenario.margin_rates,
+            fee_kwargs=dict(scenario.fee_items),
+            registry=get_registry(),
+            calculator=calculator
+        )
+        try:
+            lots = get_lot_list(uploaded.getvalue(), uploaded.name)
+            codes = pd.unique(lots["contract_code"].astype(str)) if "contract_code" in lots else []
+            portfolio.add_lots(lots, futures_prices={code: scenario.futures_price for code in codes})
+        except ValueError as e:
+            st.session_state.lot_portfolio_state = None
+            st.error(f"仓单清单有误: {e}")
+            return
+        # 各合约期货价格的默认值为清单中该合约仓单的平均期货价格（applied 为已应用的价格）
+        defaults = portfolio.lots().groupby("contract_code")["futures_price"].mean().to_dict()
+        state = st.session_state.lot_portfolio_state = {
+            "settings": settings,
+            "portfolio": portfolio,
+            "defaults": defaults,
+            "applied": dict(defaults),
+        }
+    portfolio = state["portfolio"]
+
+    # 价格表随上传的文件重置；重建组合后，表中修改过的价格与 applied 不同，重新应用
+    marks = st.data_editor(
+        pd.DataFrame({
+            "合约代码": list(state["defaults"]),
+            "期货价格（元/吨）": list(state["defaults"].values()),
+        }),
+        disabled=["合约代码"],
+        hide_index=True,
+        key=f"lot_marks_{uploaded.file_id}"
+    )
+    changed = {
+        code: price for code, price in zip(marks["合约代码"], marks["期货价格（元/吨）"])
+        if pd.notna(price) and price != state["applied"].get(code)
+    }
+    if changed:
+        portfolio.mark_to_market(changed)
+        state["applied"].update(changed)
+    st.caption("默认为清单中各合约仓单的平均期货价格；修改后该合约的全部仓单按新价格重算，其余仓单不变")
+
+    totals = portfolio.totals()
+    total_col1, total_col2, total_col3, total_col4 = st.columns(4)
+    with total_col1:
+        st.metric("仓单", f"{totals.lots:,} 笔", f"{totals.quantity_ton:,.0f} 吨", delta_color="off")
+    with total_col2:
+        st.metric("总成本", f"{totals.total_cost:,.2f} 元")
+    with total_col3:
+        st.metric("期货收入", f"{totals.futures_revenue:,.2f} 元")
+    with total_col4:
+        st.metric("利润", f"{totals.profit:,.2f} 元", f"{totals.profit_per_ton:,.2f} 元/吨")
+
+    st.dataframe(
+        pd.DataFrame({
+            "项目": ["仓储费", "资金利息", "期货保证金占用", "交割杂费", "增值税", "现货资金占用（含税）"],
+            "金额（元）": [
+                f"{value:,.2f}" for value in (
+                    totals.storage_cost, totals.capital_cost, totals.futures_capital_amount,
+                    totals.total_misc_fees, totals.vat_amount, totals.spot_capital_amount
+                )
+            ],
+        }),
+        width="stretch",
+        hide_index=True
+    )
+
+    by_contract = portfolio.by_contract()
+    st.subheader("按合约汇总")
+    st.dataframe(
+        pd.DataFrame({
+            "合约代码": by_contract.index,
+            "仓单笔数": by_contract["lots"].to_numpy(),
+            "数量（吨）": by_contract["quantity_ton"].to_numpy(),
+            "仓储费（元）": by_contract["storage_cost"].map("{:,.2f}".format).to_numpy(),
+            "资金利息（元）": by_contract["capital_cost"].map("{:,.2f}".format).to_numpy(),
+            "保证金占用（元）": by_contract["futures_capital_amount"].map("{:,.2f}".format).to_numpy(),
+            "交割杂费（元）": by_contract["total_misc_fees"].map("{:,.2f}".format).to_numpy(),
+            "总成本（元）": by_contract["total_cost"].map("{:,.2f}".format).to_numpy(),
+            "利润（元）": by_contract["profit"].map("{:,.2f}".format).to_numpy(),
+            "每吨利润（元/吨）": by_contract["profit_per_ton"].map("{:,.2f}".format).to_numpy(),
+        }),
+        width="stretch",
+        hide_index=True
+    )
+
+    lots = portfolio.lots()
+    st.subheader("每笔仓单")
+    st.dataframe(
+        pd.DataFrame({
+            "仓单编号": lots["lot_id"],
+            "合约代码": lots["contract_code"],
+            "买入日期": lots["purchase_date"].dt.strftime("%Y-%m-%d"),
+            "交割日期": lots["delivery_date"].dt.strftime("%Y-%m-%d"),
+            "持有天数": lots["holding_days"],
+            "数量（吨）": lots["quantity_ton"],
+            "现货价格（元/吨）": lots["spot_price"].map("{:,.2f}".format),
+            "期货价格（元/吨）": lots["futures_price"].map("{:,.2f}".format),
+            "平均保证金比例": lots["margin_rate"].map("{:.2%}".format),
+            "总成本（元）": lots["total_cost"].map("{:,.2f}".format),
+            "利润（元）": lots["profit"].map("{:,.2f}".format),
+            "每吨利润（元/吨）": lots["profit_per_ton"].map("{:,.2f}".format),
+            "可以套利": lots["can_arbitrage"].map({True: "✅", False: "❌"})
+        }),
+        width="stretch",
+        hide_index=True
+    )
+    st.caption("每笔仓单按买入日期买入、持有到对应合约交割日期计算；利润 = 期货收入 - 不含增值税的总成本")
+
+
+# 性能面板：各阶段的调用次数和耗时，其余为页面渲染等；任一输入变化都会刷新
+@declared_fragment("profile_panel", ALL_INPUTS + TOGGLE_INPUTS)
+def profile_panel():
+    st.session_state.profile_stack.close()
+    profile_report = st.session_state.profile_report
+    if profile_report is None:
+        return
+    with st.expander("性能", expanded=True):
+        stages = profile_report.stages()
+        st.dataframe(
+            pd.DataFrame({
+                "阶段": [stats.description for stats in stages] + ["其他（页面渲染等）"],
+                "调用次数": [stats.calls for stats in stages] + [None],
+                "耗时（毫秒）": [stats.seconds * 1e3 for stats in stages] + [profile_report.other_seconds * 1e3],
+                "每次（微秒）": [stats.seconds_per_call * 1e6 for stats in stages] + [None],
+            }),
+            width="stretch",
+            hide_index=True
+        )
+        st.caption(
+            f"本次运行共 {profile_report.elapsed * 1e3:,.1f} 毫秒；"
+            "命中结果缓存的计算不经过各阶段，调用次数为0；局部刷新时只统计重新运行的部分"
+        )
+        cache_stats = calculator.cache_stats()
+        st.dataframe(
+            pd.DataFrame({
+                "方法": list(cache_stats),
+                "命中": [stats["hits"] for stats in cache_stats.values()],
+                "未命中": [stats["misses"] for stats in cache_stats.values()],
+                "命中率": [f"{stats['hit_rate']:.1%}" for stats in cache_stats.values()],
+            }),
+            width="stretch",
+            hide_index=True
+        )
+        if profile_report.profiler is not None:
+            st.code(profile_report.stats_text(limit=25), language=None)
+
+
+calculation_status()
+per_ton_costs()
+per_ton_capital()
+capital_needs()
+arbitrage_result()
+total_costs()
+misc_fees()
+key_metrics()
+
+st.subheader("详细说明")
+detail_col1, detail_col2 = st.columns(2)
+with detail_col1:
+    cost_notes()
+with detail_col2:
+    capital_notes()
+    arbitrage_notes()
+
+margin_periods()
+time_info()
+
+st.header("🔥 第四部分：敏感性分析")
+st.caption("在两个输入构成的网格上计算套利结果，其余输入取当前值；✕ 标记当前输入所在位置")
+st.toggle("显示敏感性分析", value=False, **declared_input("show_sensitivity"))
+sensitivity()
+
+st.header("📈 第五部分：全曲线扫描")
+st.caption("以开始日期为交易日、当前现货价格买入，比较所有在交易合约持有到各自交割日的套利结果，按年化收益率排序")
+st.toggle("显示全曲线扫描", value=False, **declared_input("show_curve_scan"))
+curve_scan()
+
+st.header("📦 第六部分：仓单组合")
+st.caption("上传持有的仓单清单，按合约交割日期和动态保证金一次算出每笔仓单及整个组合的仓储费、资金利息、保证金占用、交割杂费和盈亏")
+st.toggle("显示仓单组合", value=False, **declared_input("show_lot_portfolio"))
+lot_portfolio()
 
-except Exception as e:
-    st.error(f"计算错误: {str(e)}")
-    st.exception(e)
+profile_panel()
 
 # 页脚
 st.markdown("---")